@@ -0,0 +1,303 @@
+import decimal
+import hashlib
+
+import numpy as np
+import pandas as pd
+from db_connector import DBConnector
+from pushdown_recon import PushdownQueryBuilder
+from logger_config import logger
+
+""" This module contains the aggregate checksum pre-check — per side row count, per column non-null count, min / max /
+sum and an order independent hash of (key, value) pairs. Identical datasets skip the detailed compare, otherwise the
+compare is narrowed to the columns whose checksums differ. For database sources the checksums are computed in SQL. """
+
+SQL_HASH_DB_TYPES = ['postgresql', 'oracle', 'mssql', 'mysql', 'sqlite']
+NULL_TEXT = '~null~'
+MAX_EXACT_FLOAT_INT = 2 ** 53
+SQL_VALUE_DTYPES = {int: 'int64', float: 'float64', bool: 'bool'}  # dtype shown for columns never fetched
+
+
+def sqlite_hash(text):
+    """recon_hash() registered on SQLite connections, SQLite has no built-in hash function — 4 bytes ( < 2**32 )
+    so SUM over the 64 bit integers SQLite keeps does not overflow below 2**31 rows"""
+    return int.from_bytes(hashlib.md5(str(text).encode('utf-8')).digest()[:4], 'big')
+
+
+class ChecksumPrecheck:
+    @staticmethod
+    def enabled(config):
+        return str(config.get('checksum_precheck', 'N')).strip().lower() in ('y', 'yes', 'true', '1')
+
+    @staticmethod
+    def sql_eligible(config):
+        """Both sides are queries on the same database type, so SQL hashes of both sides are comparable"""
+        db_types = {str(config.get(f"{side}_db_type", '')).lower() for side in ('source', 'target')}
+        return (all(str(config.get(f"{side}_type", '')).lower() == 'database' for side in ('source', 'target'))
+                and len(db_types) == 1 and db_types.pop() in SQL_HASH_DB_TYPES)
+
+    # ---- pandas profile ----
+
+    @staticmethod
+    def hashable(series):
+        """Numeric columns are hashed as float64 so int / float sides of the same values agree ( ints beyond float
+        precision keep their dtype ), other columns as python objects"""
+        if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+            return series.astype(object)
+        if pd.api.types.is_integer_dtype(series) and (series.abs() >= MAX_EXACT_FLOAT_INT).any():
+            return series
+        return series.astype('float64')
+
+    @staticmethod
+    def part_text(values):
+        """Length prefixed text of values ( 'abc' as '3:abc' ), NULLs as NULL_TEXT — the pandas twin of part_sql"""
+        text = values.astype(str)
+        return (text.str.len().astype(str) + ':' + text).where(values.notna(), NULL_TEXT)
+
+    @staticmethod
+    def frame_profile(data, key_columns, compared_columns):
+        """key_columns / compared_columns are (name, column) pairs, names as datacompy reports them. Key columns are
+        hashed column by column and the hashes combined, no joined key text to collide"""
+        keys = pd.DataFrame({name: ChecksumPrecheck.hashable(data[column]) for name, column in key_columns})
+        key_hashes = pd.util.hash_pandas_object(keys, index=False)
+        profile = {
+            'method': 'pandas',
+            'row_count': len(data),
+            'unique_keys': not keys.duplicated().any(),
+            'key_hash': int(key_hashes.to_numpy().sum(dtype=np.uint64)),
+            'columns': {}
+        }
+        for name, column in compared_columns:
+            values = data[column]
+            pair_hashes = pd.util.hash_pandas_object(
+                pd.DataFrame({'key': key_hashes.to_numpy(), 'value': ChecksumPrecheck.hashable(values).to_numpy()}), index=False)
+            numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+            profile['columns'][name] = {
+                'dtype': str(values.dtype),
+                'non_null': int(values.count()),
+                'min': values.min() if numeric else None,
+                'max': values.max() if numeric else None,
+                'sum': values.sum() if numeric else None,
+                'hash': int(pair_hashes.to_numpy().sum(dtype=np.uint64))  # uint64 sum wraps, order independent
+            }
+        return profile
+
+    # ---- SQL profile ----
+
+    @staticmethod
+    def cast_text_sql(db_type, expression):
+        cast_type = {'oracle': 'VARCHAR2(4000)', 'mssql': 'NVARCHAR(MAX)', 'mysql': 'CHAR'}.get(db_type, 'TEXT')
+        return f"CAST({expression} AS {cast_type})"
+
+    @staticmethod
+    def part_sql(db_type, expression):
+        """Length prefixed text of expression ( 'abc' as '3:abc' ), NULL as NULL_TEXT. Parts concatenated without a
+        separator still split one way only, so ('a|b', 'c') and ('a', 'b|c') keys give different texts"""
+        text = ChecksumPrecheck.cast_text_sql(db_type, expression)
+        if db_type == 'mssql':
+            length = f"(LEN({text} + '.') - 1)"  # LEN ignores trailing spaces
+        else:
+            length = f"{'CHAR_LENGTH' if db_type == 'mysql' else 'LENGTH'}({text})"
+        encoded = ChecksumPrecheck.concat_sql(db_type, [ChecksumPrecheck.cast_text_sql(db_type, length), "':'", text])
+        return f"CASE WHEN {expression} IS NULL THEN '{NULL_TEXT}' ELSE {encoded} END"
+
+    @staticmethod
+    def key_text_sql(db_type, columns):
+        """Key text of the quoted columns, parts as part_sql encodes them"""
+        return ChecksumPrecheck.concat_sql(db_type, [ChecksumPrecheck.part_sql(db_type, column) for column in columns])
+
+    @staticmethod
+    def concat_sql(db_type, parts):
+        if len(parts) == 1:
+            return parts[0]
+        if db_type in ('mssql', 'mysql'):
+            return f"CONCAT({', '.join(parts)})"
+        return "(" + " || ".join(parts) + ")"
+
+    @staticmethod
+    def hash_sum_sql(db_type, text):
+        """Order independent hash of a text expression, summed over all rows"""
+        if db_type == 'postgresql':
+            return f"SUM(hashtextextended({text}, 0))"
+        if db_type == 'oracle':
+            return f"SUM(ORA_HASH({text}))"
+        if db_type == 'mssql':
+            # HASHBYTES is case / accent sensitive unlike CHECKSUM, 6 bytes summed as DECIMAL never overflow
+            return f"SUM(CAST(CAST(SUBSTRING(HASHBYTES('SHA2_256', {text}), 1, 6) AS BIGINT) AS DECIMAL(38, 0)))"
+        if db_type == 'mysql':
+            return f"SUM(CONV(SUBSTRING(MD5({text}), 1, 12), 16, 10))"
+        return f"SUM(recon_hash({text}))"
+
+    @staticmethod
+    def sql_profile(conn, db_type, query, key_columns, compared_columns):
+        """Same profile as frame_profile computed in the database, 3 scans — aggregates / hashes, key uniqueness
+        and sums of the columns found numeric by the first scan"""
+        if db_type == 'sqlite':
+            conn.create_function('recon_hash', 1, sqlite_hash, deterministic=True)
+        quote = lambda column: PushdownQueryBuilder.quote_identifier(db_type, column)
+        query = PushdownQueryBuilder.strip_query(query)
+        key_text = ChecksumPrecheck.key_text_sql(db_type, [quote(column) for _, column in key_columns])
+
+        aggregates = ["COUNT(*) AS row_count", f"{ChecksumPrecheck.hash_sum_sql(db_type, key_text)} AS key_hash"]
+        for i, (_, column) in enumerate(compared_columns):
+            pair_text = ChecksumPrecheck.concat_sql(db_type, [key_text, ChecksumPrecheck.part_sql(db_type, quote(column))])
+            aggregates += [f"COUNT({quote(column)}) AS nn_{i}", f"MIN({quote(column)}) AS min_{i}",
+                           f"MAX({quote(column)}) AS max_{i}", f"{ChecksumPrecheck.hash_sum_sql(db_type, pair_text)} AS hash_{i}"]
+        row = DBConnector.fetch_row(conn, f"SELECT {', '.join(aggregates)} FROM ({query}) q")
+
+        key_list = ", ".join(quote(column) for _, column in key_columns)
+        key_groups = DBConnector.fetch_row(conn, f"SELECT COUNT(*) AS key_groups FROM (SELECT {key_list} FROM ({query}) q GROUP BY {key_list}) g")
+
+        numeric = [i for i in range(len(compared_columns)) if ChecksumPrecheck.is_number(row[f"min_{i}"])]
+        sums = {}
+        if numeric:
+            sums = DBConnector.fetch_row(conn, f"SELECT {', '.join(f'SUM({quote(compared_columns[i][1])}) AS sum_{i}' for i in numeric)} FROM ({query}) q")
+
+        row_count = int(row['row_count'] or 0)
+        profile = {
+            'method': f"sql:{db_type}",
+            'row_count': row_count,
+            'unique_keys': int(key_groups['key_groups'] or 0) == row_count,
+            'key_hash': int(row['key_hash'] or 0),
+            'columns': {}
+        }
+        for i, (name, _) in enumerate(compared_columns):
+            profile['columns'][name] = {
+                'dtype': SQL_VALUE_DTYPES.get(type(row[f"min_{i}"]), 'object'),
+                'non_null': int(row[f"nn_{i}"] or 0),
+                'min': row[f"min_{i}"] if i in numeric else None,
+                'max': row[f"max_{i}"] if i in numeric else None,
+                'sum': sums.get(f"sum_{i}"),
+                'hash': int(row[f"hash_{i}"] or 0)
+            }
+        return profile
+
+    @staticmethod
+    def is_number(value):
+        return isinstance(value, (int, float, decimal.Decimal, np.number)) and not isinstance(value, bool)
+
+    # ---- comparison ----
+
+    @staticmethod
+    def compare(source_profile, target_profile, keys, columns, source_only, target_only):
+        """Returns the pre-check outcome:
+        narrowable — same key set with unique keys on both sides, so matching (key, value) hashes prove a column equal
+        divergent_columns — compared columns whose checksums differ, the only ones the compare needs when narrowable
+        identical — narrowable, no divergent columns and no side only columns
+        """
+        details = ChecksumPrecheck.details(source_profile, target_profile, columns)
+        result = {'identical': False, 'narrowable': False, 'divergent_columns': [name for name, _, _ in columns],
+                  'identical_columns': [], 'details': details, 'source_profile': source_profile,
+                  'target_profile': target_profile, 'keys': keys, 'columns': columns,
+                  'source_only': source_only, 'target_only': target_only}
+        if source_profile['method'] != target_profile['method']:
+            logger.info("Checksum pre-check: source and target checksums are computed differently, not comparable.")
+            return result
+        if not (source_profile['unique_keys'] and target_profile['unique_keys']):
+            logger.info("Checksum pre-check: comparison keys are not unique, running full compare.")
+            return result
+        if source_profile['row_count'] != target_profile['row_count'] or source_profile['key_hash'] != target_profile['key_hash']:
+            logger.info("Checksum pre-check: row counts or key sets differ, running full compare.")
+            return result
+
+        divergent = [name for name, _, _ in columns
+                     if source_profile['columns'][name]['hash'] != target_profile['columns'][name]['hash']]
+        result.update(narrowable=True, divergent_columns=divergent,
+                      identical_columns=[name for name, _, _ in columns if name not in divergent],
+                      identical=not divergent and not source_only and not target_only)
+        if not divergent:
+            logger.info(f"Checksum pre-check: all {len(columns)} compared columns match on {source_profile['row_count']} rows"
+                        f"{'' if result['identical'] else ' ( side only columns differ )'}, skipping detailed compare.")
+        else:
+            logger.info(f"Checksum pre-check: {len(divergent)} of {len(columns)} compared columns differ, "
+                        f"narrowing compare to {divergent}.")
+        return result
+
+    @staticmethod
+    def details(source_profile, target_profile, columns):
+        """Per column checksum table for the log"""
+        rows = []
+        for name, _, _ in columns:
+            source_stats, target_stats = source_profile['columns'][name], target_profile['columns'][name]
+            rows.append({'column': name, **{f"{stat}_src": source_stats[stat] for stat in ('non_null', 'min', 'max', 'sum')},
+                         **{f"{stat}_tgt": target_stats[stat] for stat in ('non_null', 'min', 'max', 'sum')},
+                         'hash_match': source_stats['hash'] == target_stats['hash']})
+        details = pd.DataFrame(rows)
+        logger.info(f"Checksum pre-check details:\n{details.to_string(index=False) if rows else 'no compared columns'}")
+        return details
+
+    # ---- reporting ----
+
+    @staticmethod
+    def identical_column_stats(result, common_rows):
+        """datacompy shaped column stats for columns proven identical by the pre-check"""
+        source_columns = result['source_profile']['columns']
+        target_columns = result['target_profile']['columns']
+        return [{'column': name, 'match_column': f"{name}_match", 'match_cnt': common_rows, 'unequal_cnt': 0,
+                 'dtype1': source_columns[name]['dtype'], 'dtype2': target_columns[name]['dtype'],
+                 'all_match': source_columns[name]['dtype'] == target_columns[name]['dtype'],  # Like datacompy
+                 'max_diff': 0.0, 'null_diff': 0}
+                for name in result['identical_columns']]
+
+    @staticmethod
+    def column_counts(result):
+        """Column counts of the full datasets, side only columns are never part of a narrowed compare"""
+        common_count = len(result['keys']) + len(result['columns'])
+        return {
+            'src_col_count': common_count + len(result['source_only']),
+            'tgt_col_count': common_count + len(result['target_only']),
+            'common_cols_count': common_count,
+            'cols_in_src_only_count': len(result['source_only']),
+            'cols_in_tgt_only_count': len(result['target_only'])
+        }
+
+    @staticmethod
+    def apply_to_summary(summary, comparison, result):
+        """Adds the columns left out of a narrowed compare back to column stats and summary as matching columns"""
+        extra_stats = ChecksumPrecheck.identical_column_stats(result, summary['common_rows_count'])
+        comparison.column_stats.extend(extra_stats)
+        summary.update(ChecksumPrecheck.column_counts(result))
+        summary['cols_having_no_mismatch'] = sum(1 for col in comparison.column_stats if col['all_match'])
+        summary['cols_having_mismatch'] = sum(1 for col in comparison.column_stats if not col['all_match'])
+        return summary
+
+
+class ReconciledComparison:
+    """Comparison of datasets whose compared columns all match ( same keys, equal checksums ), exposes the attributes ReconReportGenerator consumes without a compare"""
+
+    def __init__(self, result):
+        self.result = result
+        self.join_columns = [name for name, _, _ in result['keys']]
+        self.abs_tol = 0
+        self.rel_tol = 0
+        self.ignore_spaces = False
+        row_count = result['source_profile']['row_count']
+        key_stats = [{'column': name, 'match_column': '', 'match_cnt': row_count, 'unequal_cnt': 0, 'dtype1': '',
+                      'dtype2': '', 'all_match': True, 'max_diff': 0.0, 'null_diff': 0} for name in self.join_columns]
+        self.column_stats = key_stats + ChecksumPrecheck.identical_column_stats(result, row_count)
+        names = self.join_columns + [name for name, _, _ in result['columns']]
+        self._all_mismatch = pd.DataFrame(columns=self.join_columns + [f"{name}_{side}" for name, _, _ in result['columns']
+                                                                        for side in ('df1', 'df2')])
+        self.df1_unq_rows = pd.DataFrame(columns=names)
+        self.df2_unq_rows = pd.DataFrame(columns=names)
+
+    def all_mismatch(self):
+        return self._all_mismatch
+
+    def summary(self):
+        row_count = self.result['source_profile']['row_count']
+        return {
+            "src_row_count": row_count,
+            "tgt_row_count": row_count,
+            "common_rows_count": row_count,
+            "rows_in_src_only": 0,
+            "rows_in_tgt_only": 0,
+            "rows_having_mismatch": 0,
+            "row_having_no_mismatch": row_count,
+            **ChecksumPrecheck.column_counts(self.result),
+            "cols_having_no_mismatch": sum(1 for col in self.column_stats if col['all_match']),
+            "cols_having_mismatch": sum(1 for col in self.column_stats if not col['all_match']),
+            "absolute_tole": str(self.abs_tol),
+            "relative_tole": str(self.rel_tol),
+            "matched_keys": str(self.join_columns),
+            "spaces_ignored": self.ignore_spaces
+        }
@@ -1,60 +1,285 @@
-from adlfs import AzureBlobFileSystem
-from azure.kusto.data import KustoClient, KustoConnectionStringBuilder
+import atexit
+import hashlib
+import itertools
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-from azure.kusto.data.helpers import dataframe_from_result_table
+from logger_config import logger
+from source_plugins import import_driver  # adlfs / azure-kusto-data are imported on first use
+
+ADX_PAGE_ROWS = 250000  # Rows per ADX partition query, below the default 500000 record result set limit
+ADX_MAX_WORKERS = 4
+_kusto_clients = {}  # (cluster, authority, client id, secret digest) -> KustoClient, shared by the use cases of a process
+_kusto_lock = threading.Lock()
 
 class CloudConnector:
     @staticmethod
     def read_all_files_from_adls_folder_with_connection_string(
-        connection_string, container_name, folder_path, file_type="csv"
+        connection_string, container_name, folder_path, file_type="csv", columns=None, filters=None, max_workers=8, fs=None
     ):
+        """Reads all non-empty files of file_type under the folder ( recursive ) into one DataFrame.
+
+        Listing and parsing run on a bounded thread pool, columns projects only the needed columns and for parquet
+        filters ( pyarrow DNF, e.g. [('region', '==', 'EU')] ) is pushed down to skip row groups. Any fsspec
+        filesystem can be passed as fs, e.g. LocalFileSystem as a stand-in for adlfs.
+        """
+        # Imported outside the try, a missing adlfs is raised instead of read as empty data
+        blob_file_system = import_driver('adlfs', 'adls').AzureBlobFileSystem if fs is None else None
         try:
             # Create the ADLS filesystem using connection string
-            fs = AzureBlobFileSystem(connection_string=connection_string)
+            fs = fs or blob_file_system(connection_string=connection_string)
 
             # Clean up the path and list matching files
             folder_path = folder_path.strip("/")
             full_path = f"{container_name}/{folder_path}"
-            file_list = fs.glob(f"{full_path}/**/*.{file_type}")  # recursive search
-
-            # Filter out zero-byte files
-            file_list = [f for f in file_list if fs.info(f)['size'] > 0]
+            file_list = CloudConnector.list_files(fs, full_path, file_type, max_workers)
 
             if not file_list:
-                print("No valid (non-empty) files found.")
+                logger.warning(f"No valid (non-empty) {file_type} files found under {full_path}.")
                 return pd.DataFrame()
 
-            # Read and combine files
-            dfs = []
-            for file in file_list:
-                with fs.open(file, "rb") as f:
-                    if file_type == "csv":
-                        df = pd.read_csv(f)
-                    elif file_type == "parquet":
-                        df = pd.read_parquet(f)
-                    else:
-                        raise ValueError("Unsupported file type")
-                    dfs.append(df)
+            logger.info(f"Reading {len(file_list)} {file_type} files from {full_path} with {max_workers} workers...")
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adls_read") as executor:
+                dfs = list(executor.map(lambda file: CloudConnector.read_file(fs, file, file_type, columns, filters), file_list))
 
             return pd.concat(dfs, ignore_index=True)
 
         except Exception as e:
-            print(f"Error reading files from ADLS: {e}")
+            logger.error(f"Error reading files from ADLS: {e}")
             return pd.DataFrame()
 
     @staticmethod
-    def fetch_adx_data(cluster_uri: str, database: str, query: str, client_id: str, client_secret: str, authority_id: str) -> pd.DataFrame:
-        try:
-            kcsb = KustoConnectionStringBuilder.with_aad_application_key_authentication(
-                cluster_uri, client_id, client_secret, authority_id
-            )
-            client = KustoClient(kcsb)
-            response = client.execute(database, query)
+    def list_files(fs, full_path, file_type, max_workers=8):
+        """Lists non-empty files recursively, sub folders are walked concurrently and sizes come with the listing"""
+        top_level = fs.ls(full_path, detail=True)
+        files = {entry['name']: entry for entry in top_level if entry['type'] == 'file'}
+        sub_folders = [entry['name'] for entry in top_level if entry['type'] == 'directory']
+        if sub_folders:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adls_list") as executor:
+                for listing in executor.map(lambda folder: fs.find(folder, detail=True), sub_folders):
+                    files.update(listing)
+
+        # Filter out zero-byte files
+        return sorted(name for name, info in files.items()
+                      if name.endswith(f".{file_type}") and (info.get('size') or 0) > 0)
 
-            # Convert using helper
-            df = dataframe_from_result_table(response.primary_results[0])
-            return df
+    @staticmethod
+    def adls_columns(connection_string, container_name, folder_path, file_type="csv", fs=None):
+        """Columns of the first file of the folder ( csv header / parquet schema ), None when the folder has no files"""
+        fs = fs or import_driver('adlfs', 'adls').AzureBlobFileSystem(connection_string=connection_string)
+        file_list = CloudConnector.list_files(fs, f"{container_name}/{folder_path.strip('/')}", file_type)
+        if not file_list:
+            return None
+        with fs.open(file_list[0], "rb") as f:
+            if file_type == "csv":
+                return list(pd.read_csv(f, nrows=0).columns)
+            if file_type == "parquet":
+                return import_driver('pyarrow.parquet', 'parquet').read_schema(f).names
+        raise ValueError("Unsupported file type")
+
+    @staticmethod
+    def read_file(fs, file, file_type, columns=None, filters=None):
+        if file_type == "csv":
+            with fs.open(file, "rb") as f:
+                return pd.read_csv(f, usecols=columns)
+        elif file_type == "parquet":
+            # Passing the filesystem lets pyarrow read the footer first and fetch only projected / filtered row groups
+            return pd.read_parquet(file, filesystem=fs, columns=columns, filters=filters)
+        raise ValueError("Unsupported file type")
+
+    @staticmethod
+    def kusto_client(cluster_uri, client_id, client_secret, authority_id):
+        """KustoClient of the cluster / credential, created once per process and reused ( the client is thread safe and
+        keeps its HTTP session and AAD token )"""
+        digest = hashlib.sha256(str(client_secret).encode()).hexdigest()
+        key = (cluster_uri.strip().rstrip('/').lower(), str(authority_id), str(client_id), digest)
+        with _kusto_lock:
+            client = _kusto_clients.get(key)
+            if client is None:
+                kusto_data = import_driver('azure.kusto.data', 'adx')
+                kcsb = kusto_data.KustoConnectionStringBuilder.with_aad_application_key_authentication(
+                    cluster_uri, client_id, client_secret, authority_id
+                )
+                client = _kusto_clients[key] = kusto_data.KustoClient(kcsb)
+                logger.info(f"Created Kusto client for {cluster_uri}.")
+            return client
+
+    @staticmethod
+    def close_kusto_clients():
+        with _kusto_lock:
+            clients = list(_kusto_clients.values())
+            _kusto_clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug(f"Error closing Kusto client: {e}")
+
+    @staticmethod
+    def reset_kusto_clients_after_fork():
+        """Forked children must not share the parent's HTTP sessions, they create their own clients"""
+        global _kusto_lock
+        _kusto_lock = threading.Lock()
+        _kusto_clients.clear()
+
+    @staticmethod
+    def fetch_adx_data(cluster_uri: str, database: str, query: str, client_id: str, client_secret: str, authority_id: str,
+                       page_rows=ADX_PAGE_ROWS, max_workers=ADX_MAX_WORKERS, partition_by=None, client=None) -> pd.DataFrame:
+        """Runs the ADX query into one DataFrame, large results are read in partitions ( see fetch_adx_chunks )"""
+        try:
+            chunks = CloudConnector.fetch_adx_chunks(cluster_uri, database, query, client_id, client_secret, authority_id,
+                                                     page_rows, page_rows, max_workers, partition_by, client)
+            return pd.concat(list(chunks), ignore_index=True)
 
         except Exception as e:
-            print(f"Error fetching data from ADX: {e}")
-            return pd.DataFrame()
\ No newline at end of file
+            logger.error(f"Error fetching data from ADX: {e}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def fetch_adx_chunks(cluster_uri, database, query, client_id, client_secret, authority_id, chunk_size=100000,
+                         page_rows=ADX_PAGE_ROWS, max_workers=ADX_MAX_WORKERS, partition_by=None, client=None):
+        """Yields the result of the ADX query as typed DataFrame chunks of up to chunk_size rows.
+
+        Rows are consumed from the streaming query response as they arrive. Results above page_rows rows are split into
+        partition queries run on a bounded thread pool — range partitions of a single datetime / numeric partition_by
+        column, hash partitions of the partition_by columns ( of the whole row when not set ) otherwise. Any object with
+        the KustoClient execute / execute_streaming_query methods can be passed as client, e.g. a local mock of the service.
+        """
+        client = client or CloudConnector.kusto_client(cluster_uri, client_id, client_secret, authority_id)
+        query = CloudConnector.adx_query_text(query)
+        queries = CloudConnector.adx_partition_queries(client, database, query, page_rows, partition_by)
+        if len(queries) == 1:
+            yield from CloudConnector.adx_frames(client, database, queries[0], chunk_size)
+            return
+
+        logger.info(f"Reading ADX result in {len(queries)} partitions with {max_workers} workers...")
+        read_partition = lambda partition_query: list(CloudConnector.adx_frames(client, database, partition_query, chunk_size))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="adx_read") as executor:
+            pending = deque()
+            try:
+                # At most max_workers partitions are read ahead of the consumer
+                for partition_query in queries:
+                    if len(pending) >= max_workers:
+                        yield from pending.popleft().result()
+                    pending.append(executor.submit(read_partition, partition_query))
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @staticmethod
+    def adx_query_text(query):
+        """Query text of the ADX detail field, which holds the query or the path of a query file"""
+        query = str(query).strip()
+        if os.path.isfile(query):
+            with open(query, 'r') as f:
+                query = f.read().strip()
+        return query.rstrip(';').strip()
+
+    @staticmethod
+    def adx_frames(client, database, query, chunk_size=100000):
+        """Yields the primary result of query as typed DataFrames of up to chunk_size rows, one empty typed frame when
+        it has no rows"""
+        if hasattr(client, 'execute_streaming_query'):
+            table = next(iter(client.execute_streaming_query(database, query).iter_primary_results()))
+        else:
+            table = client.execute(database, query).primary_results[0]
+        rows = iter(table.raw_rows)
+        yielded = False
+        while True:
+            batch = list(itertools.islice(rows, chunk_size))
+            if not batch and yielded:
+                return
+            yield CloudConnector.adx_typed_frame(table.columns, batch)
+            yielded = True
+            if len(batch) < chunk_size:
+                return
+
+    @staticmethod
+    def adx_typed_frame(columns, rows):
+        """DataFrame of raw Kusto rows typed by column type, with the converters of dataframe_from_result_table"""
+        converters = import_driver('azure.kusto.data.helpers', 'adx').default_dict()
+        frame = pd.DataFrame(rows, columns=[column.column_name for column in columns])
+        for column in columns:
+            converter = converters.get(column.column_type)
+            if converter is not None:
+                frame[column.column_name] = converter(column.column_name, frame)
+        return frame
+
+    @staticmethod
+    def adx_column(column):
+        return "['" + str(column).replace("'", "\\'") + "']"
+
+    @staticmethod
+    def adx_scalar_row(client, database, query):
+        return next(CloudConnector.adx_frames(client, database, query, 1)).iloc[0]
+
+    @staticmethod
+    def adx_partition_queries(client, database, query, page_rows=ADX_PAGE_ROWS, partition_by=None):
+        """Partition queries covering every row of query once, just query when its result fits in page_rows rows"""
+        row_count = int(CloudConnector.adx_scalar_row(client, database, f"{query}\n| count").iloc[0])
+        partition_count = math.ceil(row_count / page_rows) if page_rows and page_rows > 0 else 1
+        if partition_count <= 1:
+            return [query]
+        columns = [column.strip() for column in str(partition_by or '').split(',') if column.strip()]
+        logger.info(f"ADX result has {row_count} rows, splitting into {partition_count} partitions of about {page_rows} rows.")
+        if len(columns) == 1:
+            predicates = CloudConnector.adx_range_predicates(client, database, query, columns[0], partition_count)
+            if predicates:
+                return CloudConnector.adx_balanced_range_queries(client, database, query, predicates, page_rows)
+        names = [CloudConnector.adx_column(column) for column in columns]
+        hash_source = names[0] if len(names) == 1 else "strcat(" + ", '|', ".join(names) + ")" if names else "tostring(pack_all())"
+        return [f"{query}\n| where hash({hash_source}, {partition_count}) == {index}" for index in range(partition_count)]
+
+    @staticmethod
+    def adx_balanced_range_queries(client, database, query, predicates, page_rows):
+        """One query per range, a skewed range holding more than page_rows rows is split further into hash partitions"""
+        cases = ", ".join(f"{predicate}, {index}" for index, predicate in enumerate(predicates))
+        counts_query = (f"{query}\n| extend recon_range = case({cases}, -1)"
+                        f"\n| summarize row_count = count() by recon_range")
+        counts = pd.concat(CloudConnector.adx_frames(client, database, counts_query), ignore_index=True)
+        range_rows = dict(zip(counts['recon_range'].astype(int), counts['row_count'].astype(int)))
+        queries = []
+        for index, predicate in enumerate(predicates):
+            range_query = f"{query}\n| where {predicate}"
+            split_count = math.ceil(range_rows.get(index, 0) / page_rows)
+            if split_count <= 1:
+                queries.append(range_query)
+                continue
+            logger.info(f"ADX range partition {index} has {range_rows[index]} rows, splitting it into {split_count} hash partitions.")
+            queries += [f"{range_query}\n| where hash(tostring(pack_all()), {split_count}) == {split}" for split in range(split_count)]
+        return queries
+
+    @staticmethod
+    def adx_range_predicates(client, database, query, column, partition_count):
+        """Predicates cutting the min..max range of a datetime / numeric column into equal ranges ( nulls go to the first
+        one ), None for other column types"""
+        name = CloudConnector.adx_column(column)
+        bounds = CloudConnector.adx_scalar_row(
+            client, database, f"{query}\n| summarize min_value = min({name}), max_value = max({name})")
+        low, high = bounds['min_value'], bounds['max_value']
+        if pd.isna(low) or pd.isna(high) or low == high:
+            return None
+        if isinstance(low, pd.Timestamp):
+            utc = lambda value: value.tz_convert('UTC') if value.tzinfo is not None else value
+            literal = lambda value: f"datetime({utc(value).strftime('%Y-%m-%dT%H:%M:%S.%f')}Z)"
+        elif pd.api.types.is_number(low) and not isinstance(low, bool):
+            literal = repr
+            low, high = float(low), float(high)
+        else:
+            return None
+        cuts = [literal(low + (high - low) * index / partition_count) for index in range(1, partition_count)]
+        predicates = [f"isnull({name}) or {name} < {cuts[0]}"]
+        predicates += [f"{name} >= {lower} and {name} < {upper}" for lower, upper in zip(cuts, cuts[1:])]
+        predicates.append(f"{name} >= {cuts[-1]}")
+        return predicates
+
+
+atexit.register(CloudConnector.close_kusto_clients)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=CloudConnector.reset_kusto_clients_after_fork)
@@ -0,0 +1,279 @@
+import datacompy
+import numpy as np
+from datacompy.core import calculate_max_diff, columns_equal
+from logger_config import logger
+from source_plugins import import_driver
+
+pl = None  # Polars is imported on first use of the Polars backend, the pandas / datacompy backend works without it
+
+""" This module contains the pluggable compare backends of the recon engine. Every backend returns a comparison exposing
+what ReconReportGenerator consumes ( intersect_rows, df1_unq_rows, df2_unq_rows, all_mismatch(), column_stats and the
+tolerance settings ) — the pandas backend is datacompy itself, the Polars backend joins and compares columns on all cores. """
+
+DEFAULT_COMPARE_BACKEND = "pandas"
+ORDER_COLUMN = "__recon_order"
+IN_DF1 = "__recon_in_df1"
+IN_DF2 = "__recon_in_df2"
+
+
+class PandasCompareBackend:
+    @staticmethod
+    def available():
+        return True
+
+    @staticmethod
+    def compare(source_data, target_data, join_columns, abs_tol=0, rel_tol=0, ignore_spaces=False, ignore_case=False):
+        return datacompy.Compare(source_data, target_data, join_columns=join_columns, abs_tol=abs_tol, rel_tol=rel_tol,
+                                 ignore_spaces=ignore_spaces, ignore_case=ignore_case)
+
+
+class PolarsCompareBackend:
+    @staticmethod
+    def available():
+        try:
+            PolarsCompareBackend.load()
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def load():
+        global pl
+        if pl is None:
+            pl = import_driver('polars', 'polars compare')
+        return pl
+
+    @staticmethod
+    def compare(source_data, target_data, join_columns, abs_tol=0, rel_tol=0, ignore_spaces=False, ignore_case=False):
+        """Falls back to datacompy for data Polars can not represent ( mixed object columns, incompatible key types )"""
+        PolarsCompareBackend.load()
+        try:
+            return PolarsComparison(source_data, target_data, join_columns, abs_tol, rel_tol, ignore_spaces, ignore_case)
+        except (TypeError, ValueError, pl.exceptions.PolarsError, ImportError) as e:
+            logger.warning(f"Polars compare not possible for this data, using pandas / datacompy: {e}")
+            return PandasCompareBackend.compare(source_data, target_data, join_columns, abs_tol, rel_tol,
+                                                ignore_spaces, ignore_case)
+
+
+COMPARE_BACKENDS = {
+    "pandas": PandasCompareBackend,
+    "datacompy": PandasCompareBackend,
+    "polars": PolarsCompareBackend
+}
+
+
+def get_compare_backend(name=None):
+    """Backend registered under name ( 'Compare Backend' driver config column ), pandas when unknown or not installed"""
+    name = str(name or DEFAULT_COMPARE_BACKEND).strip().lower()
+    backend = COMPARE_BACKENDS.get(name)
+    if backend is None:
+        logger.warning(f"Unknown compare backend '{name}', using {DEFAULT_COMPARE_BACKEND}.")
+        return COMPARE_BACKENDS[DEFAULT_COMPARE_BACKEND]
+    if not backend.available():
+        logger.warning(f"Compare backend '{name}' is not installed, using {DEFAULT_COMPARE_BACKEND}.")
+        return COMPARE_BACKENDS[DEFAULT_COMPARE_BACKEND]
+    return backend
+
+
+class PolarsComparison:
+    """datacompy.Compare compatible result computed with Polars — same lower case column names, outer join on the
+    join columns ( duplicate keys matched in order of appearance ), np.isclose style tolerances and the same column stats.
+    Frames handed to the report are pandas, converted from Arrow memory."""
+
+    def __init__(self, df1, df2, join_columns, abs_tol=0, rel_tol=0, ignore_spaces=False, ignore_case=False):
+        self.join_columns = [str(column).lower() for column in join_columns]
+        self.abs_tol = abs_tol
+        self.rel_tol = rel_tol
+        self.ignore_spaces = ignore_spaces
+        self.ignore_case = ignore_case
+        self.df1_name = "df1"
+        self.df2_name = "df2"
+        self.df1_columns = self.validate(df1, "df1")
+        self.df2_columns = self.validate(df2, "df2")
+        self.df1_dtypes = dict(zip(self.df1_columns, (str(dtype) for dtype in df1.dtypes)))
+        self.df2_dtypes = dict(zip(self.df2_columns, (str(dtype) for dtype in df2.dtypes)))
+        self.shared_columns = [column for column in self.intersect_columns() if column not in self.join_columns]
+        self.column_stats = []
+        self._intersect_rows = None
+        self._all_mismatch = None
+
+        joined = self.join(pl.from_pandas(df1.set_axis(self.df1_columns, axis=1)),
+                           pl.from_pandas(df2.set_axis(self.df2_columns, axis=1)))
+        in_df1, in_df2 = pl.col(IN_DF1).is_not_null(), pl.col(IN_DF2).is_not_null()
+        self.df1_unq_rows = self.side_rows(joined.filter(in_df1 & ~in_df2), self.df1_columns, self.df1_name)
+        self.df2_unq_rows = self.side_rows(joined.filter(~in_df1 & in_df2), self.df2_columns, self.df2_name)
+        self._intersect = self.compare_columns(joined.filter(in_df1 & in_df2).drop(IN_DF1, IN_DF2))
+        logger.info(f"Polars compare: {len(self._intersect)} common rows, {len(self.df1_unq_rows)} rows only in df1, "
+                    f"{len(self.df2_unq_rows)} rows only in df2.")
+
+    def validate(self, df, name):
+        columns = [str(column).lower() for column in df.columns]
+        if len(set(columns)) < len(columns):
+            raise ValueError(f"{name} must have unique column names")
+        if not set(self.join_columns).issubset(columns):
+            raise ValueError(f"{name} must have all columns from join_columns")
+        return columns
+
+    def intersect_columns(self):
+        return [column for column in self.df1_columns if column in self.df2_columns]
+
+    def df1_unq_columns(self):
+        return [column for column in self.df1_columns if column not in self.df2_columns]
+
+    def df2_unq_columns(self):
+        return [column for column in self.df2_columns if column not in self.df1_columns]
+
+    def join(self, frame1, frame2):
+        """Full outer join on the join columns, sorted by key like the pandas outer merge datacompy runs"""
+        for key in self.join_columns:
+            type1, type2 = frame1.schema[key], frame2.schema[key]
+            if type1 != type2:
+                if type1 == pl.Null or type2 == pl.Null:
+                    key_type = type2 if type1 == pl.Null else type1
+                elif type1.is_numeric() and type2.is_numeric():
+                    key_type = pl.Float64
+                else:
+                    raise TypeError(f"Join column '{key}' has incompatible types {type1} / {type2}")
+                frame1, frame2 = frame1.with_columns(pl.col(key).cast(key_type)), frame2.with_columns(pl.col(key).cast(key_type))
+            if self.ignore_spaces and frame1.schema[key] == pl.String:
+                frame1, frame2 = frame1.with_columns(pl.col(key).str.strip_chars()), frame2.with_columns(pl.col(key).str.strip_chars())
+
+        join_on = list(self.join_columns)
+        if frame1.select(self.join_columns).is_duplicated().any() or frame2.select(self.join_columns).is_duplicated().any():
+            # Duplicate keys are matched by their order within the key group, like datacompy
+            frame1 = frame1.with_columns(pl.int_range(pl.len()).over(self.join_columns).alias(ORDER_COLUMN))
+            frame2 = frame2.with_columns(pl.int_range(pl.len()).over(self.join_columns).alias(ORDER_COLUMN))
+            join_on.append(ORDER_COLUMN)
+
+        frame1 = frame1.rename({column: f"{column}_{self.df1_name}" for column in self.shared_columns}).with_columns(pl.lit(True).alias(IN_DF1))
+        frame2 = frame2.rename({column: f"{column}_{self.df2_name}" for column in self.shared_columns}).with_columns(pl.lit(True).alias(IN_DF2))
+        joined = frame1.join(frame2, on=join_on, how="full", coalesce=True, join_nulls=True)
+        joined = joined.sort(join_on, nulls_last=True, maintain_order=True)
+        return joined.drop(ORDER_COLUMN) if ORDER_COLUMN in join_on else joined
+
+    def side_rows(self, rows, columns, side_name):
+        names = [f"{column}_{side_name}" if column in self.shared_columns else column for column in columns]
+        return rows.select(names).to_pandas().set_axis(columns, axis=1)
+
+    def compare_kind(self, rows, column):
+        """How the column pair is compared — the first datacompy columns_equal branch that applies to the data"""
+        col_1, col_2 = rows[f"{column}_{self.df1_name}"], rows[f"{column}_{self.df2_name}"]
+        if self.is_number(col_1.dtype) and self.is_number(col_2.dtype):
+            return "numeric"
+        text_or_number = all(self.is_number(col.dtype) or col.dtype == pl.String for col in (col_1, col_2))
+        if text_or_number and all(self.float_castable(col) for col in (col_1, col_2)):
+            return "numeric"
+        if col_1.dtype == pl.String and col_2.dtype == pl.String:
+            return "string"
+        if text_or_number or (col_1.dtype == col_2.dtype and col_1.dtype.is_temporal()):
+            return "equal"
+        return "pandas"
+
+    @staticmethod
+    def is_number(dtype):
+        return dtype.is_numeric() or dtype == pl.Boolean or dtype == pl.Null
+
+    @staticmethod
+    def float_castable(col):
+        if col.dtype != pl.String:
+            return True
+        head = col.drop_nulls().head(100)  # Cheap rejection of ordinary text before casting the whole column
+        if head.str.strip_chars().cast(pl.Float64, strict=False).null_count():
+            return False
+        return col.str.strip_chars().cast(pl.Float64, strict=False).null_count() == col.null_count()
+
+    def match_expression(self, kind, rows, column):
+        name_1, name_2 = f"{column}_{self.df1_name}", f"{column}_{self.df2_name}"
+        col_1, col_2 = pl.col(name_1), pl.col(name_2)
+        if kind == "numeric":
+            col_1, col_2 = (self.float_expression(rows, name) for name in (name_1, name_2))
+            within_tolerance = ((col_1 - col_2).abs() <= self.abs_tol + self.rel_tol * col_2.abs()) | (col_1 == col_2)
+            both_null = col_1.is_null() & col_2.is_null()
+        else:
+            both_null = col_1.is_null() & col_2.is_null()
+            if kind == "string":
+                if self.ignore_spaces:
+                    col_1, col_2 = col_1.str.strip_chars(), col_2.str.strip_chars()
+                if self.ignore_case:
+                    col_1, col_2 = col_1.str.to_uppercase(), col_2.str.to_uppercase()
+                within_tolerance = col_1 == col_2
+            elif rows[name_1].dtype == rows[name_2].dtype:
+                within_tolerance = col_1 == col_2
+            else:
+                within_tolerance = pl.lit(False)  # Text vs number that is not numeric text never matches
+        return (within_tolerance.fill_null(False) | both_null).alias(f"{column}_match")
+
+    @staticmethod
+    def float_expression(rows, name):
+        expr = pl.col(name)
+        if rows[name].dtype == pl.String:
+            expr = expr.str.strip_chars()
+        return expr.cast(pl.Float64).fill_nan(None)  # NaN is null like in pandas, np.isclose treats two NaN as equal
+
+    def compare_columns(self, intersect):
+        """Adds <column>_match flags ( all columns in one multi-threaded pass ) and collects column stats"""
+        kinds = {column: self.compare_kind(intersect, column) for column in self.shared_columns}
+        intersect = intersect.with_columns([self.match_expression(kind, intersect, column)
+                                            for column, kind in kinds.items() if kind != "pandas"])
+        for column, kind in kinds.items():
+            if kind == "pandas":
+                # Types Polars has no equivalent comparison for ( e.g. categoricals, dates vs text ) use datacompy's
+                col_1 = intersect[f"{column}_{self.df1_name}"].to_pandas()
+                col_2 = intersect[f"{column}_{self.df2_name}"].to_pandas()
+                match = columns_equal(col_1, col_2, self.rel_tol, self.abs_tol, self.ignore_spaces, self.ignore_case)
+                intersect = intersect.with_columns(pl.Series(f"{column}_match", match.to_numpy(), dtype=pl.Boolean))
+
+        numeric_diffs = intersect.select([
+            (self.float_expression(intersect, f"{column}_{self.df1_name}") -
+             self.float_expression(intersect, f"{column}_{self.df2_name}")).abs().max().alias(column)
+            for column, kind in kinds.items() if kind == "numeric"])
+        null_diffs = intersect.select([
+            (pl.col(f"{column}_{self.df1_name}").is_null() ^ pl.col(f"{column}_{self.df2_name}").is_null()).sum().alias(column)
+            for column in kinds])
+        match_counts = intersect.select([pl.col(f"{column}_match").sum().alias(column) for column in kinds])
+
+        row_count = len(intersect)
+        for column in self.intersect_columns():
+            if column in self.join_columns:
+                match_cnt, match_column, max_diff, null_diff = row_count, "", 0.0, 0
+            else:
+                match_cnt, match_column = int(match_counts[column][0]), f"{column}_match"
+                null_diff = int(null_diffs[column][0])
+                if kinds[column] == "numeric":
+                    max_diff = numeric_diffs[column][0]
+                    max_diff = np.nan if max_diff is None else float(max_diff)
+                elif kinds[column] == "pandas":
+                    max_diff = calculate_max_diff(intersect[f"{column}_{self.df1_name}"].to_pandas(),
+                                                  intersect[f"{column}_{self.df2_name}"].to_pandas())
+                else:
+                    max_diff = 0.0
+            self.add_column_stats(column, match_column, match_cnt, row_count, max_diff, null_diff)
+        return intersect
+
+    def add_column_stats(self, column, match_column, match_cnt, row_count, max_diff, null_diff):
+        self.column_stats.append({
+            "column": column,
+            "match_column": match_column,
+            "match_cnt": match_cnt,
+            "unequal_cnt": row_count - match_cnt,
+            "dtype1": self.df1_dtypes[column],
+            "dtype2": self.df2_dtypes[column],
+            "all_match": self.df1_dtypes[column] == self.df2_dtypes[column] and row_count == match_cnt,
+            "max_diff": max_diff,
+            "null_diff": null_diff
+        })
+
+    @property
+    def intersect_rows(self):
+        """Common rows with both sides' values and <column>_match flags, converted to pandas on first use"""
+        if self._intersect_rows is None:
+            self._intersect_rows = self._intersect.to_pandas()
+        return self._intersect_rows
+
+    def all_mismatch(self):
+        if self._all_mismatch is None:
+            match_columns = [f"{column}_match" for column in self.shared_columns]
+            value_columns = [f"{column}_{side}" for column in self.shared_columns for side in (self.df1_name, self.df2_name)]
+            mismatch = self._intersect.filter(~pl.all_horizontal(match_columns)) if match_columns else self._intersect.clear()
+            self._all_mismatch = mismatch.select(self.join_columns + value_columns).to_pandas()
+        return self._all_mismatch
@@ -1,15 +1,77 @@
+import os
+import threading
+
 import pandas as pd
 from logger_config import logger  # Using Central logger config, instead of module level logger config
 
+DRIVER_REQUIRED_COLUMNS = [
+    'Use Case', 'Source Name', 'Source Type', 'Source Detail', 'Source DB Type', 'Source Host', 'Source Port',
+    'Source Database', 'Source User ID', 'Source Password', 'Source Query File', 'Target Name', 'Target Type',
+    'Target Detail', 'Target DB Type', 'Target Host', 'Target Port', 'Target Database', 'Target User ID',
+    'Target Password', 'Target Query File', 'Comparison Keys'
+]
+MAPPING_COLUMNS = {'Source_Column', 'Target_Column'}
+
+
+class DriverConfig:
+    """All sheets of the driver config workbook, parsed once — the first sheet holds the use cases, sheets named after
+    a use case hold its column mapping"""
+
+    def __init__(self, config_path, sheets, stat):
+        self.config_path = config_path
+        self.sheets = sheets
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.driver_df = next(iter(sheets.values())) if sheets else pd.DataFrame()
+        self._mappings = {}
+        self.validate()
+
+    def validate(self):
+        if self.driver_df.empty:
+            logger.warning("Warning: The configuration file is empty!")
+            return
+        missing = [column for column in DRIVER_REQUIRED_COLUMNS if column not in self.driver_df.columns]
+        if missing:
+            raise ValueError(f"Driver config sheet is missing required columns: {missing}")
+
+    def is_current(self, stat):
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def mapping(self, sheet_name):
+        """{source column: target column} of a mapping sheet, None when there is no such sheet"""
+        if sheet_name not in self.sheets:
+            return None
+        if sheet_name not in self._mappings:
+            mapping_df = self.sheets[sheet_name].fillna('')
+            if not MAPPING_COLUMNS.issubset(mapping_df.columns):
+                raise ValueError(f"The '{sheet_name}' sheet must contain 'Source_Column' and 'Target_Column' columns.")
+            self._mappings[sheet_name] = dict(zip(mapping_df['Source_Column'], mapping_df['Target_Column']))
+        return dict(self._mappings[sheet_name])
+
+
 class ConfigLoader:
+    _cache = {}  # absolute path -> DriverConfig, per process ( forked workers inherit the parsed workbook )
+    _lock = threading.Lock()
+
+    @staticmethod
+    def load(config_path):
+        """Parsed driver config workbook, re-read only when the file's mtime or size changed"""
+        path = os.path.abspath(config_path)
+        stat = os.stat(path)
+        with ConfigLoader._lock:
+            cached = ConfigLoader._cache.get(path)
+            if cached is not None and cached.is_current(stat):
+                return cached
+            logger.info(f"Parsing driver config workbook {config_path}...")
+            driver_config = DriverConfig(config_path, pd.read_excel(path, sheet_name=None), stat)
+            ConfigLoader._cache[path] = driver_config
+            return driver_config
+
     @staticmethod
     def read_config(config_path):
         try:
             logger.info(f"Loading configuration from {config_path}...")
-            config_df = pd.read_excel(config_path)
-
-            if config_df.empty:
-                logger.warning("Warning: The configuration file is empty!")
+            config_df = ConfigLoader.load(config_path).driver_df
 
             logger.info(f"Successfully loaded {len(config_df)} configuration rows.")
             return config_df
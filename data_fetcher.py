@@ -1,132 +1,489 @@
+import operator
 import os
+import re
+import time
 import xml.etree.ElementTree as ET
 
 import pandas as pd
 
-from cloud_connector import CloudConnector
+from cloud_connector import ADX_MAX_WORKERS, ADX_PAGE_ROWS, CloudConnector
 from db_connector import DBConnector
+from db_pool import DBConnectionPool, POOL_IDLE_SECONDS, POOL_MAX_SIZE
+from pushdown_recon import PushdownQueryBuilder
+from sample_recon import KeyHashSampler
 from logger_config import logger
+from resource_usage import current_rss_mb, frame_memory_mb, peak_rss_mb
+from snapshot_cache import SnapshotCache
+from source_plugins import DataLoadError, SourcePlugin, SOURCE_PLUGINS, get_source_plugin, import_driver, register_source_plugin
+
+try:
+    import pyarrow as pa  # Optional, enables the pyarrow csv engine and Arrow backed strings
+except ImportError:
+    pa = None
+
+FILTER_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
 
 class DataFetcher:
     @staticmethod
     def fetch_data(config, is_source=True):
         system_type = "source" if is_source else "target"
-
         system_type_key = f"{system_type}_type"
-        file_path = config.get(f"{system_type}_detail")
-        db_type = config.get(f"{system_type}_db_type", "").lower()
-        host = config.get(f"{system_type}_host")
-        port = config.get(f"{system_type}_port")
-        database = config.get(f"{system_type}_database")
-        user = config.get(f"{system_type}_user")
-        password = config.get(f"{system_type}_password")
-        query_file = config.get(f"{system_type}_query_file")
 
         if not config.get(system_type_key):
             raise DataLoadError(f"Missing '{system_type_key}' in configuration")
 
-        data = None
-        system_source = config[system_type_key].lower()
+        snapshot_cache, fingerprint = None, None
+        if SnapshotCache.enabled(config):
+            snapshot_cache = SnapshotCache.from_config(config)
+            fingerprint = SnapshotCache.fingerprint(config, system_type)
+            cached_data = snapshot_cache.load(fingerprint) if fingerprint else None
+            if cached_data is not None:
+                return cached_data
 
-        if system_source == 'file':
-            if not file_path or not os.path.exists(file_path):
-                logger.error(f"File not found: {file_path}")
-                return None
+        plugin = get_source_plugin(config[system_type_key])
+        if plugin is None:
+            logger.error(f"Unsupported {system_type_key} '{config[system_type_key]}', registered types: {sorted(SOURCE_PLUGINS)}")
+            return None
+        data = plugin.fetch(config, system_type)
 
-            file_ext = os.path.splitext(file_path)[1].lower()
-            logger.info(f"Loading file {file_path} with extension {file_ext}...")
-
-            try:
-                if file_ext == '.csv':
-                    data = pd.read_csv(file_path)
-                elif file_ext in ['.xls', '.xlsx']:
-                    data = pd.read_excel(file_path)
-                elif file_ext == '.txt':
-                    data = pd.read_csv(file_path, delimiter=",")
-                elif file_ext == '.json':
-                    data = pd.read_json(file_path)
-                elif file_ext == '.xml':
-                    data = DataFetcher.load_xml(file_path)
-                elif file_ext == '.fwf':
-                    data = pd.read_fwf(file_path)
-                else:
-                    logger.warning(f"Unsupported file type: {file_ext}. Attempting to load as CSV.")
-                    data = pd.read_csv(file_path)
-
-                logger.info(f"Successfully loaded file: {file_path}")
-            except Exception as e:
-                logger.error(f"Error loading file {file_path}: {e}")
-                return None
+        if fingerprint and data is not None:
+            snapshot_cache.store(fingerprint, data)
 
-        elif system_source == 'database':
-            if not query_file or not os.path.exists(query_file):
-                logger.error(f"Query file not found: {query_file}")
-                return None
+        return data
 
-            conn = None
-            try:
-                if db_type == 'oracle':
-                    conn = DBConnector.connect_to_oracle(user, password, host, port, database)
-                elif db_type == 'mssql':
-                    conn = DBConnector.connect_to_mssql(user, password, host, port, database)
-                elif db_type == 'mysql':
-                    conn = DBConnector.connect_to_mysql(user, password, host, port, database)
-                elif db_type == 'postgresql':
-                    conn = DBConnector.connect_to_postgresql(user, password, host, port, database)
-                else:
-                    logger.error(f"Unsupported database type: {db_type}")
-                    return None
+    @staticmethod
+    def fetch_data_chunks(config, is_source=True, chunk_size=100000):
+        """Yields source / target data in chunks of chunk_size rows, used by the partitioned recon mode.
+
+        CSV / TXT / XML files, database queries and ADX queries are streamed, other source types are loaded once and sliced.
+        """
+        system_type = "source" if is_source else "target"
+        system_source = str(config.get(f"{system_type}_type", ""))
+        plugin = get_source_plugin(system_source)
+        chunks = plugin.fetch_chunks(config, system_type, chunk_size) if plugin is not None else None
+        if chunks is not None:
+            yield from chunks
+            return
 
-                if conn:
-                    with open(query_file, 'r') as f:
-                        query = f.read()
-                    logger.info(f"Executing query from {query_file} on {db_type} database...")
-                    data = pd.read_sql(query, conn)
-                    logger.info(f"Query execution successful for {system_type} system.")
+        logger.warning(f"Chunked read not supported for {system_type} type '{system_source}', loading fully and slicing.")
+        data = DataFetcher.fetch_data(config, is_source)
+        if data is None:
+            raise DataLoadError(f"{system_type.capitalize()} data could not be loaded.")
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
 
-            except Exception as e:
-                logger.error(f"Error executing query for {system_type} system: {e}")
-                return None
-            finally:
-                if conn:
-                    conn.close()
-
-        elif system_source == 'adls':
-            try:
-                conn_str, container, folder_path, file_type = file_path.split('|')
-                logger.info(f"Reading ADLS for {system_type}: container={container}, path={folder_path}, type={file_type}")
-                CloudConnector.read_all_files_from_adls_folder_with_connection_string(conn_str,container,folder_path,file_type)
-                logger.info(f"ADLS load successful for {system_type}")
-            except Exception as e:
-                raise DataLoadError(f"Failed to load from ADLS for {system_type}: {e}")
-
-        elif system_source == 'adx':
-            try:
-                cluster_uri, db, query_file_path, client_id, client_secret, authority_id = file_path.split('|')
-                CloudConnector.fetch_adx_data(cluster_uri,db,query_file_path,client_id,client_secret,authority_id)
-                logger.info(f"ADX query executed successfully for {system_type}")
-            except Exception as e:
-                raise DataLoadError(f"Failed to load from ADX for {system_type}: {e}")
+    @staticmethod
+    def source_columns(config, system_type):
+        """Column names of a side read without loading its data ( file header / schema, query columns ), None when its
+        source type can not tell them up front"""
+        plugin = get_source_plugin(config.get(f"{system_type}_type"))
+        try:
+            return plugin.columns(config, system_type) if plugin is not None else None
+        except Exception as e:
+            logger.warning(f"Could not read {system_type} columns: {e}")
+            return None
+
+    @staticmethod
+    def connect(db_type, user, password, host, port, database):
+        """Opens a connection for the given db_type, returns None for unsupported types or failed connects"""
+        return DBConnector.connect(db_type, user, password, host, port, database)
+
+    @staticmethod
+    def read_query(query_file, db_type, columns=None, order_by=None):
+        """Reads the query file, a configured column projection is applied by wrapping the query ( only those columns
+        are sent over the wire ), order_by columns ( streaming recon ) add an ORDER BY with NULLs first"""
+        with open(query_file, 'r') as f:
+            query = f.read()
+        columns = DataFetcher.parse_columns(columns)
+        order_by = DataFetcher.parse_columns(order_by)
+        if not columns and not order_by:
+            return query
+        projection = ", ".join(PushdownQueryBuilder.quote_identifier(db_type, column) for column in columns) if columns else "*"
+        query = f"SELECT {projection} FROM ({PushdownQueryBuilder.strip_query(query)}) q"
+        if order_by:
+            query += f" {PushdownQueryBuilder.order_by_clause(db_type, order_by)}"
+        return query
+
+    @staticmethod
+    def pooled_connection(config, system_type):
+        """Connection for the source / target database from the process-wide pool, released when the block ends"""
+        return DBConnectionPool.connection(
+            config.get(f"{system_type}_db_type", "").lower(),
+            config.get(f"{system_type}_user"), config.get(f"{system_type}_password"),
+            config.get(f"{system_type}_host"), config.get(f"{system_type}_port"), config.get(f"{system_type}_database"),
+            max_size=int(float(config.get('db_pool_size') or POOL_MAX_SIZE)),
+            idle_seconds=float(config.get('db_pool_idle_seconds') or POOL_IDLE_SECONDS))
+
+    @staticmethod
+    def schema_hints(config, system_type):
+        """Per use case schema hints for file loads — usecols, dtypes, categorical columns, date formats, arrow ingest"""
+        return {
+            'usecols': DataFetcher.parse_columns(config.get(f"{system_type}_columns")),
+            'dtypes': DataFetcher.parse_mapping(config.get(f"{system_type}_dtypes")),
+            'categoricals': DataFetcher.parse_columns(config.get(f"{system_type}_categoricals")) or [],
+            'date_formats': DataFetcher.parse_mapping(config.get(f"{system_type}_date_formats")),
+            'filters': DataFetcher.parse_filters(config.get(f"{system_type}_filter")),
+            'arrow': DataFetcher.is_enabled(config.get('arrow_ingest')) and pa is not None
+        }
 
+    @staticmethod
+    def csv_read_options(hints):
+        """read_csv options for the hints, dtypes and categoricals are applied while parsing"""
+        dtypes = {**hints['dtypes'], **{column: 'category' for column in hints['categoricals']}}
+        options = {'usecols': DataFetcher.read_columns(hints), 'dtype': dtypes or None}
+        if hints['arrow']:
+            options['engine'] = 'pyarrow'
+        return options
+
+    @staticmethod
+    def read_columns(hints):
+        """usecols plus the filter columns, which are read to filter rows after parsing and dropped afterwards"""
+        if not hints['usecols']:
+            return None
+        return hints['usecols'] + [column for column, _, _ in hints.get('filters') or [] if column not in hints['usecols']]
+
+    @staticmethod
+    def apply_schema_hints(data, hints):
+        """Applies hints that the reader could not, row filters, date formats and ( optionally ) Arrow backed strings"""
+        data = DataFetcher.filter_frame(data, hints.get('filters'))
+        if hints['usecols']:
+            data = data[[column for column in hints['usecols'] if column in data.columns]]
+        for column, dtype in hints['dtypes'].items():
+            if column in data.columns and str(data[column].dtype) != dtype:
+                data[column] = data[column].astype(dtype)
+        for column in hints['categoricals']:
+            if column in data.columns and not isinstance(data[column].dtype, pd.CategoricalDtype):
+                data[column] = data[column].astype('category')
+        for column, date_format in hints['date_formats'].items():
+            if column in data.columns:
+                parsed = pd.to_datetime(data[column], format=date_format, errors='coerce')
+                coerced = int((parsed.isna() & data[column].notna()).sum())
+                if coerced:
+                    logger.warning(f"{coerced} values of column '{column}' do not match date format '{date_format}' "
+                                   f"and are read as null ( NaT ).")
+                data[column] = parsed
+        if hints['arrow']:
+            for column in data.select_dtypes(include='object').columns:
+                data[column] = data[column].astype('string[pyarrow]')
         return data
 
     @staticmethod
-    def load_xml(file_path):
-        """Load XML file and convert it to DataFrame"""
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+    def parse_mapping(value):
+        """'col1:int64, col2:%Y-%m-%d' -> {'col1': 'int64', 'col2': '%Y-%m-%d'}"""
+        mapping = {}
+        for item in str(value or '').split(','):
+            if ':' in item:
+                column, hint = item.split(':', 1)
+                mapping[column.strip()] = hint.strip()
+        return mapping
 
-            data = []
-            for elem in root:
-                row_data = {child.tag: child.text for child in elem}
-                data.append(row_data)
+    @staticmethod
+    def is_enabled(value):
+        return str(value or '').strip().lower() in ('y', 'yes', 'true', '1')
+
+    @staticmethod
+    def parse_columns(value):
+        """'col1, col2' -> ['col1', 'col2'], None when no projection is configured"""
+        columns = [column.strip() for column in str(value or '').split(',') if column.strip()]
+        return columns or None
+
+    @staticmethod
+    def parse_filters(value):
+        """'region == EU; amount > 100' -> [('region', '==', 'EU'), ('amount', '>', 100)] ( pyarrow DNF filters )"""
+        filters = []
+        for condition in str(value or '').split(';'):
+            if not condition.strip():
+                continue
+            match = re.match(r"^\s*([^\s=!<>]+)\s*(==|!=|<=|>=|=|<|>)\s*(.+?)\s*$", condition)
+            if not match:
+                raise ValueError(f"Invalid filter condition: {condition}")
+            column, operator, raw_value = match.groups()
+            raw_value = raw_value.strip("'\"")
+            filter_value = pd.to_numeric(raw_value, errors='coerce')
+            filters.append((column, '==' if operator == '=' else operator, raw_value if pd.isna(filter_value) else filter_value))
+        return filters or None
+
+    @staticmethod
+    def filter_frame(data, filters):
+        """Rows of data matching all filters ( parse_filters conditions ), for readers without predicate pushdown"""
+        if not filters or data is None or data.empty:
+            return data
+        mask = pd.Series(True, index=data.index)
+        for column, filter_operator, value in filters:
+            if column not in data.columns:
+                raise ValueError(f"Filter column not found: {column}")
+            mask &= FILTER_OPERATORS[filter_operator](data[column], value).fillna(False).astype(bool)
+        return data[mask]
 
-            df = pd.DataFrame(data)
+    @staticmethod
+    def load_xml(file_path, row_path=None, include_attributes=False):
+        """Load XML file and convert it to DataFrame ( streamed with iterparse, values stay text unless typed by the
+        Source / Target Dtypes hints )"""
+        try:
+            df = pd.concat(DataFetcher.iter_xml_chunks(file_path, row_path, include_attributes), ignore_index=True)
             logger.info(f"Successfully loaded XML file: {file_path}")
             return df
         except Exception as e:
             logger.error(f"Error loading XML file {file_path}: {e}")
             return None
-class DataLoadError(Exception):
-    pass
\ No newline at end of file
+
+    @staticmethod
+    def iter_xml_chunks(file_path, row_path=None, include_attributes=False, chunk_size=100000):
+        """Streams XML rows as DataFrame chunks without building the whole tree.
+
+        row_path selects row elements by their trailing tag path ( e.g. 'Orders/Order' ), by default every child of
+        the root is a row. Child element texts become columns, row attributes too when include_attributes is set.
+        Processed rows are cleared and detached, so memory holds one chunk of column arrays at most. Values are kept as
+        text ( e.g. '00123' keeps its zeros ), so every chunk has the same types.
+        """
+        row_tags = [tag for tag in str(row_path or '').strip('/').split('/') if tag]
+        columns, row_count, tag_path, elements = {}, 0, [], []
+
+        for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+            if event == 'start':
+                tag_path.append(elem.tag.rsplit('}', 1)[-1])  # Drop namespace
+                elements.append(elem)
+                continue
+
+            is_row = tag_path[-len(row_tags):] == row_tags if row_tags else len(tag_path) == 2
+            if is_row:
+                row = {child.tag.rsplit('}', 1)[-1]: child.text for child in elem}
+                if include_attributes:
+                    row = {**elem.attrib, **row}
+                for name in row:
+                    if name not in columns:
+                        columns[name] = [None] * row_count  # Column first seen in this row, back-fill earlier rows
+                for name, values in columns.items():
+                    values.append(row.get(name))
+                row_count += 1
+
+                elem.clear()
+                if len(elements) > 1:
+                    elements[-2].remove(elem)  # Detach from parent so processed rows do not pile up under it
+
+                if row_count >= chunk_size:
+                    yield pd.DataFrame(columns)
+                    columns, row_count = {name: [] for name in columns}, 0
+            tag_path.pop()
+            elements.pop()
+
+        if row_count or not columns:
+            yield pd.DataFrame(columns)
+
+
+class FileSource(SourcePlugin):
+    """csv / txt, xls / xlsx, json, xml, fwf and parquet files ( 'Source Detail' is the file path )"""
+
+    @classmethod
+    def fetch(cls, config, system_type):
+        file_path = config.get(f"{system_type}_detail")
+        if not file_path or not os.path.exists(file_path):
+            logger.error(f"File not found: {file_path}")
+            return None
+
+        file_ext = os.path.splitext(file_path)[1].lower()
+        logger.info(f"Loading file {file_path} with extension {file_ext}...")
+
+        try:
+            hints = DataFetcher.schema_hints(config, system_type)
+            start_rss, start_time = current_rss_mb(), time.time()
+            if file_ext in ['.csv', '.txt']:
+                data = pd.read_csv(file_path, delimiter=",", **DataFetcher.csv_read_options(hints))
+            elif file_ext in ['.xls', '.xlsx']:
+                data = pd.read_excel(file_path, usecols=DataFetcher.read_columns(hints), dtype=hints['dtypes'] or None)
+            elif file_ext == '.json':
+                data = pd.read_json(file_path, dtype=hints['dtypes'] or True)
+            elif file_ext == '.xml':
+                data = DataFetcher.load_xml(file_path, config.get(f"{system_type}_xml_row_path"),
+                                            DataFetcher.is_enabled(config.get(f"{system_type}_xml_attributes")))
+            elif file_ext == '.fwf':
+                data = pd.read_fwf(file_path, usecols=DataFetcher.read_columns(hints), dtype=hints['dtypes'] or None)
+            elif file_ext == '.parquet':
+                data = pd.read_parquet(file_path, columns=hints['usecols'], filters=hints['filters'])
+                hints = dict(hints, filters=None)  # Pushed down to the row groups
+            else:
+                logger.warning(f"Unsupported file type: {file_ext}. Attempting to load as CSV.")
+                data = pd.read_csv(file_path, **DataFetcher.csv_read_options(hints))
+
+            data = DataFetcher.apply_schema_hints(data, hints)
+            logger.info(f"Successfully loaded file: {file_path} ( {len(data)} rows in {round((time.time() - start_time) * 1000, 2)} ms, "
+                        f"frame {frame_memory_mb(data)} MB, RSS {start_rss} -> {current_rss_mb()} MB, peak RSS {peak_rss_mb()} MB )")
+            return data
+        except Exception as e:
+            logger.error(f"Error loading file {file_path}: {e}")
+            return None
+
+    @classmethod
+    def fetch_chunks(cls, config, system_type, chunk_size):
+        """CSV / TXT and XML files are streamed"""
+        file_path = config.get(f"{system_type}_detail")
+        file_ext = os.path.splitext(str(file_path))[1].lower()
+        if file_ext not in ['.csv', '.txt', '.xml']:
+            return None
+        if not file_path or not os.path.exists(file_path):
+            raise DataLoadError(f"File not found: {file_path}")
+        if file_ext == '.xml':
+            logger.info(f"Streaming XML file {file_path} in chunks of {chunk_size} rows...")
+            hints = DataFetcher.schema_hints(config, system_type)
+            chunks = DataFetcher.iter_xml_chunks(file_path, config.get(f"{system_type}_xml_row_path"),
+                                                 DataFetcher.is_enabled(config.get(f"{system_type}_xml_attributes")),
+                                                 chunk_size)
+            return (DataFetcher.apply_schema_hints(chunk, hints) for chunk in chunks)
+        logger.info(f"Streaming file {file_path} in chunks of {chunk_size} rows...")
+        return cls.iter_csv_chunks(file_path, DataFetcher.schema_hints(config, system_type), chunk_size)
+
+    @classmethod
+    def columns(cls, config, system_type):
+        """Header / schema columns of csv / txt, xls / xlsx and parquet files"""
+        file_path = config.get(f"{system_type}_detail")
+        file_ext = os.path.splitext(str(file_path))[1].lower()
+        if not file_path or not os.path.exists(file_path):
+            return None
+        if file_ext in ['.csv', '.txt']:
+            return list(pd.read_csv(file_path, nrows=0).columns)
+        if file_ext in ['.xls', '.xlsx']:
+            return list(pd.read_excel(file_path, nrows=0).columns)
+        if file_ext == '.parquet':
+            return import_driver('pyarrow.parquet', 'parquet').read_schema(file_path).names
+        return None
+
+    @staticmethod
+    def iter_csv_chunks(file_path, hints, chunk_size):
+        read_options = DataFetcher.csv_read_options(dict(hints, arrow=False))  # pyarrow engine can not read in chunks
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, **read_options):
+            yield DataFetcher.apply_schema_hints(chunk, hints)
+
+
+class DatabaseSource(SourcePlugin):
+    """Query file run on the configured database, the driver of the DB type is imported on first connect"""
+
+    @classmethod
+    def fetch(cls, config, system_type):
+        query_file = config.get(f"{system_type}_query_file")
+        db_type = config.get(f"{system_type}_db_type", "").lower()
+        if not query_file or not os.path.exists(query_file):
+            logger.error(f"Query file not found: {query_file}")
+            return None
+
+        try:
+            with DataFetcher.pooled_connection(config, system_type) as conn:
+                if not conn:
+                    return None
+                query = DataFetcher.read_query(query_file, db_type, config.get(f"{system_type}_columns"),
+                                               config.get(f"{system_type}_order_by"))
+                sample_keys = DataFetcher.parse_columns(config.get(f"{system_type}_sample_keys"))
+                if sample_keys:
+                    sampler = KeyHashSampler.from_config(config)
+                    query = sampler.sample_query(conn, db_type, query, sample_keys)
+                    logger.info(f"Sampling {sampler.fraction * 100:g} % of {system_type} keys in the database.")
+                fetch_size = int(float(config.get('db_fetch_size') or 50000))
+                logger.info(f"Executing query from {query_file} on {db_type} database ( fetch size {fetch_size} )...")
+                data = pd.concat(DBConnector.stream_query(conn, db_type, query, fetch_size), ignore_index=True)
+                logger.info(f"Query execution successful for {system_type} system.")
+                return data
+
+        except Exception as e:
+            logger.error(f"Error executing query for {system_type} system: {e}")
+            return None
+
+    @classmethod
+    def fetch_chunks(cls, config, system_type, chunk_size):
+        query_file = config.get(f"{system_type}_query_file")
+        if not query_file or not os.path.exists(query_file):
+            raise DataLoadError(f"Query file not found: {query_file}")
+        return cls.iter_query_chunks(config, system_type, query_file, chunk_size)
+
+    @staticmethod
+    def iter_query_chunks(config, system_type, query_file, chunk_size):
+        db_type = config.get(f"{system_type}_db_type", "").lower()
+        with DataFetcher.pooled_connection(config, system_type) as conn:
+            if conn is None:
+                raise DataLoadError(f"Could not connect to {db_type} database for {system_type} system")
+            query = DataFetcher.read_query(query_file, db_type, config.get(f"{system_type}_columns"),
+                                           config.get(f"{system_type}_order_by"))
+            logger.info(f"Streaming query from {query_file} on {db_type} database in chunks of {chunk_size} rows...")
+            yield from DBConnector.stream_query(conn, db_type, query, chunk_size)
+
+    @classmethod
+    def columns(cls, config, system_type):
+        query_file = config.get(f"{system_type}_query_file")
+        if not query_file or not os.path.exists(query_file):
+            return None
+        db_type = config.get(f"{system_type}_db_type", "").lower()
+        with DataFetcher.pooled_connection(config, system_type) as conn:
+            if conn is None:
+                return None
+            return DBConnector.query_columns(conn, PushdownQueryBuilder.strip_query(DataFetcher.read_query(query_file, db_type)))
+
+
+class AdlsSource(SourcePlugin):
+    """ADLS folder, 'Source Detail' is 'connection string|container|folder path|file type' ( needs adlfs )"""
+
+    @classmethod
+    def fetch(cls, config, system_type):
+        try:
+            conn_str, container, folder_path, file_type = config.get(f"{system_type}_detail").split('|')
+            logger.info(f"Reading ADLS for {system_type}: container={container}, path={folder_path}, type={file_type}")
+            columns = DataFetcher.parse_columns(config.get(f"{system_type}_columns"))
+            filters = DataFetcher.parse_filters(config.get(f"{system_type}_filter"))
+            # Parquet reads push the filters down, CSV files are filtered once read
+            pushed_down = file_type == 'parquet'
+            data = CloudConnector.read_all_files_from_adls_folder_with_connection_string(
+                conn_str, container, folder_path, file_type,
+                columns=columns if pushed_down else DataFetcher.read_columns({'usecols': columns, 'filters': filters}),
+                filters=filters,
+                max_workers=int(float(config.get('io_workers') or 8)))
+            if not pushed_down:
+                data = DataFetcher.filter_frame(data, filters)
+                if columns and not data.empty:
+                    data = data[columns]
+            logger.info(f"ADLS load successful for {system_type}")
+            return data
+        except Exception as e:
+            raise DataLoadError(f"Failed to load from ADLS for {system_type}: {e}")
+
+    @classmethod
+    def columns(cls, config, system_type):
+        conn_str, container, folder_path, file_type = config.get(f"{system_type}_detail").split('|')
+        return CloudConnector.adls_columns(conn_str, container, folder_path, file_type)
+
+
+class AdxSource(SourcePlugin):
+    """Azure Data Explorer query, 'Source Detail' is 'cluster uri|database|query ( or query file )|client id|client secret|
+    authority id' ( needs azure-kusto-data ). Clients are cached per cluster / credential and large results are read in
+    concurrent partition queries."""
+
+    @staticmethod
+    def adx_arguments(config, system_type):
+        cluster_uri, db, query, client_id, client_secret, authority_id = config.get(f"{system_type}_detail").split('|')
+        options = {
+            'page_rows': int(float(config.get('adx_page_rows') or ADX_PAGE_ROWS)),
+            'max_workers': int(float(config.get('io_workers') or ADX_MAX_WORKERS)),
+            'partition_by': config.get(f"{system_type}_partition_by") or None,
+        }
+        return (cluster_uri, db, query, client_id, client_secret, authority_id), options
+
+    @classmethod
+    def fetch(cls, config, system_type):
+        try:
+            arguments, options = cls.adx_arguments(config, system_type)
+            data = CloudConnector.fetch_adx_data(*arguments, **options)
+            logger.info(f"ADX query executed successfully for {system_type}")
+            return data
+        except Exception as e:
+            raise DataLoadError(f"Failed to load from ADX for {system_type}: {e}")
+
+    @classmethod
+    def fetch_chunks(cls, config, system_type, chunk_size):
+        try:
+            arguments, options = cls.adx_arguments(config, system_type)
+        except Exception as e:
+            raise DataLoadError(f"Invalid ADX detail for {system_type}: {e}")
+        logger.info(f"Streaming ADX query for {system_type} in chunks of {chunk_size} rows...")
+        return CloudConnector.fetch_adx_chunks(*arguments, chunk_size=chunk_size, **options)
+
+
+register_source_plugin('file', FileSource)
+register_source_plugin('database', DatabaseSource)
+register_source_plugin('adls', AdlsSource)
+register_source_plugin('adx', AdxSource)
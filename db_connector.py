@@ -1,24 +1,74 @@
-import pymysql
-import psycopg2
-import oracledb  # Replaces cx_Oracle
-import pyodbc
+import sqlite3
+import threading
+import time
+
+import pandas as pd
 from logger_config import logger
 from crypto_util import CryptoUtil
+from source_plugins import import_driver  # Drivers are imported on first connect of their DB type
 
 
 class DBConnector:
+    _oracle_client_lock = threading.Lock()
+    _oracle_client_initialised = False
+
+    @staticmethod
+    def connect(db_type, user, password, host, port, database):
+        """Opens a connection for the given db_type, returns None for unsupported types or failed connects"""
+        connector = DB_CONNECTORS.get(db_type)
+        if connector is None:
+            logger.error(f"Unsupported database type: {db_type}")
+            return None
+        return connector(user, password, host, port, database)
+
+    @staticmethod
+    def register(db_type, connector):
+        """Registers connector( user, password, host, port, database ) -> DB-API connection for a new DB type"""
+        DB_CONNECTORS[str(db_type).strip().lower()] = connector
+
+    @staticmethod
+    def is_alive(conn, db_type):
+        """Cheap round trip to check a pooled connection before it is handed out again"""
+        try:
+            if db_type == 'mysql':
+                conn.ping(reconnect=False)
+                return True
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1 FROM DUAL" if db_type == 'oracle' else "SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            conn.rollback()  # Do not leave the health check transaction open
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled {db_type} connection failed health check: {e}")
+            return False
+
+    @staticmethod
+    def init_oracle_client():
+        """Thick mode client is initialised once per process, oracledb raises if it is initialised again"""
+        with DBConnector._oracle_client_lock:
+            if DBConnector._oracle_client_initialised:
+                return
+            DBConnector._oracle_client_initialised = True
+            try:
+                import_driver('oracledb', 'oracle').init_oracle_client()  # Optional, needed for thick mode
+                logger.info("Oracle client initialised ( thick mode ).")
+            except Exception as e:
+                logger.warning(f"Oracle client could not be initialised, using thin mode: {e}")
+
     @staticmethod
     def connect_to_mysql(user, encrypted_password, host, port, database):
         """Connect to MySQL using PyMySQL with decrypted password"""
         try:
             password = CryptoUtil.decrypt_password(encrypted_password)
-            conn = pymysql.connect(
+            conn = import_driver('pymysql', 'mysql').connect(
                 host=host,
                 user=user,
                 password=password,
                 database=database,
-                port=int(port),
-                cursorclass=pymysql.cursors.DictCursor  # Returns query results as dictionaries
+                port=int(port)  # Default tuple cursor, DictCursor builds a dict per row which is slow on big extracts
             )
             logger.info(f"Connected to MySQL at {host}:{port}")
             return conn
@@ -31,7 +81,7 @@ class DBConnector:
         """Connect to PostgreSQL Database"""
         try:
             password = CryptoUtil.decrypt_password(password)
-            conn = psycopg2.connect(
+            conn = import_driver('psycopg2', 'postgresql').connect(
                 user=user, password=password, host=host, port=port, dbname=database
             )
             logger.info(f"Connected to PostgreSQL database: {database} at {host}:{port}")
@@ -46,8 +96,8 @@ class DBConnector:
         try:
             password = CryptoUtil.decrypt_password(password)
             dsn = f"{host}:{port}/{database}"
-            oracledb.init_oracle_client()  # Optional, needed for thick mode
-            conn = oracledb.connect(user=user, password=password, dsn=dsn)
+            DBConnector.init_oracle_client()
+            conn = import_driver('oracledb', 'oracle').connect(user=user, password=password, dsn=dsn)
             logger.info(f"Connected to Oracle database: {database} at {host}:{port}")
             return conn
         except Exception as e:
@@ -60,9 +110,127 @@ class DBConnector:
         try:
             password = CryptoUtil.decrypt_password(password)
             conn_str = f"DRIVER={{SQL Server}};SERVER={host},{port};DATABASE={database};UID={user};PWD={password}"
-            conn = pyodbc.connect(conn_str)
+            conn = import_driver('pyodbc', 'mssql').connect(conn_str)
             logger.info(f"Connected to MSSQL database: {database}")
             return conn
         except Exception as e:
             logger.error(f"Failed to connect to MSSQL: {e}")
             return None
+
+    @staticmethod
+    def connect_to_sqlite(user, password, host, port, database):
+        """Connect to a SQLite database file ( local stand-in for push-down / database recon tests )"""
+        try:
+            # Pooled connections are used from the fetch threads, not only the thread that opened them
+            conn = sqlite3.connect(database, check_same_thread=False)
+            logger.info(f"Connected to SQLite database: {database}")
+            return conn
+        except Exception as e:
+            logger.error(f"Failed to connect to SQLite: {e}")
+            return None
+
+    @staticmethod
+    def query_columns(conn, query):
+        """Column names of a query's result without fetching any rows"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM ({query}) q WHERE 1 = 0")
+            columns = [col[0] for col in cursor.description]
+            cursor.fetchall()
+            return columns
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def fetch_row(conn, query):
+        """Executes a single row query ( e.g. aggregates ), returns {column: value}"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query)
+            row = cursor.fetchone()
+            return dict(zip([col[0].lower() for col in cursor.description], row or []))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def open_streaming_cursor(conn, db_type, fetch_size):
+        """Opens a cursor that streams rows from the server in batches instead of buffering the whole result"""
+        if db_type == 'postgresql':
+            cursor = conn.cursor(name="recon_stream_cursor")  # Named cursor = server-side cursor in psycopg2
+            cursor.itersize = fetch_size
+        elif db_type == 'mysql':
+            cursor = conn.cursor(import_driver('pymysql.cursors', 'mysql').SSCursor)  # Unbuffered cursor, rows are read from the socket on fetch
+        elif db_type == 'oracle':
+            cursor = conn.cursor()
+            cursor.arraysize = fetch_size
+            cursor.prefetchrows = fetch_size + 1
+        else:
+            cursor = conn.cursor()  # pyodbc cursors are forward-only server cursors already
+            cursor.arraysize = fetch_size
+        return cursor
+
+    @staticmethod
+    def stream_query(conn, db_type, query, fetch_size=50000):
+        """Executes query on a server-side cursor and yields DataFrame chunks of up to fetch_size rows.
+
+        Column dtypes are fixed by the first chunk and later chunks are cast to them, so every chunk has the same schema.
+        """
+        dtypes = None
+        for columns, rows in DBConnector.stream_rows(conn, db_type, query, fetch_size):
+            if not rows:
+                yield pd.DataFrame(columns=columns)
+                break
+            chunk = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            if dtypes is None:
+                dtypes = chunk.dtypes
+            else:
+                chunk = DBConnector.align_dtypes(chunk, dtypes)
+            yield chunk
+
+    @staticmethod
+    def stream_rows(conn, db_type, query, fetch_size=50000):
+        """Executes query on a server-side cursor and yields (column names, list of row tuples) batches of up to
+        fetch_size rows. A query without rows yields one empty batch so the column names are still known."""
+        cursor = DBConnector.open_streaming_cursor(conn, db_type, fetch_size)
+        try:
+            cursor.execute(query)
+            columns, batch_no = None, 0
+            while True:
+                start_time = time.time()
+                rows = cursor.fetchmany(fetch_size)
+                if columns is None:
+                    # psycopg2 named cursors only expose description after the first fetch
+                    columns = [col[0] for col in cursor.description]
+                if not rows:
+                    if batch_no == 0:
+                        yield columns, []
+                    break
+
+                if not isinstance(rows[0], tuple):
+                    rows = [tuple(row) for row in rows]  # pyodbc.Row
+                batch_no += 1
+                elapsed = max(time.time() - start_time, 1e-9)
+                logger.info(f"Fetched chunk {batch_no} from {db_type}: {len(rows)} rows at {round(len(rows) / elapsed)} rows/sec")
+                yield columns, rows
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def align_dtypes(chunk, dtypes):
+        """Casts chunk columns to the dtypes of the first chunk, columns that can not be cast keep their own dtype"""
+        for column, dtype in dtypes.items():
+            if chunk[column].dtype != dtype:
+                try:
+                    chunk[column] = chunk[column].astype(dtype)
+                except (TypeError, ValueError):
+                    logger.debug(f"Column {column} could not be cast to {dtype}, keeping {chunk[column].dtype}")
+        return chunk
+
+
+DB_CONNECTORS = {
+    'oracle': DBConnector.connect_to_oracle,
+    'mssql': DBConnector.connect_to_mssql,
+    'mysql': DBConnector.connect_to_mysql,
+    'postgresql': DBConnector.connect_to_postgresql,
+    'sqlite': DBConnector.connect_to_sqlite
+}
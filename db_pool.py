@@ -0,0 +1,147 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from db_connector import DBConnector
+from logger_config import logger
+
+""" This module contains the process-wide database connection pool — connections are reused across use cases ( and
+source / target sides ) hitting the same database, instead of paying connect + auth on every fetch. Every worker
+process of the use case scheduler has its own pool. """
+
+POOL_MAX_SIZE = 4  # Connections per (db_type, host, port, database, user), checked out + idle
+POOL_IDLE_SECONDS = 300  # Idle connections older than this are closed
+HEALTH_CHECK_SECONDS = 30  # Connections idle longer than this are pinged before reuse
+ACQUIRE_TIMEOUT_SECONDS = 600  # Wait for a free connection when the pool of a key is full
+
+
+class DBConnectionPool:
+    _condition = threading.Condition()
+    _idle = {}  # key -> [(connection, last used time)], most recently used last
+    _in_use = {}  # key -> checked out connection count
+    _inherited = []  # Idle connections of the parent process after fork, kept referenced but never used or closed
+
+    @staticmethod
+    def pool_key(db_type, host, port, database, user):
+        return db_type, str(host), str(port), str(database), str(user)
+
+    @classmethod
+    @contextmanager
+    def connection(cls, db_type, user, password, host, port, database, max_size=POOL_MAX_SIZE, idle_seconds=POOL_IDLE_SECONDS):
+        """Yields a pooled connection ( None when connect failed ). It goes back to the pool when the block ends
+        normally and is closed when the block raises, as the session state is unknown then.
+        max_size 0 disables pooling, a fresh connection is opened and closed like before."""
+        if max_size <= 0:
+            conn = DBConnector.connect(db_type, user, password, host, port, database)
+            try:
+                yield conn
+            finally:
+                cls.close(conn)
+            return
+
+        key = cls.pool_key(db_type, host, port, database, user)
+        conn = cls.acquire(key, password, max_size, idle_seconds)
+        reusable = False
+        try:
+            yield conn
+            reusable = conn is not None
+        finally:
+            if conn is not None:
+                cls.release(key, conn, reusable)
+
+    @classmethod
+    def acquire(cls, key, password, max_size, idle_seconds):
+        db_type, host, port, database, user = key
+        deadline = time.time() + ACQUIRE_TIMEOUT_SECONDS
+        conn, last_used = None, None
+        with cls._condition:
+            expired = cls.evict_idle(idle_seconds)
+            while True:
+                if cls._idle.get(key):
+                    conn, last_used = cls._idle[key].pop()
+                    break
+                if cls._in_use.get(key, 0) + len(cls._idle.get(key, [])) < max_size:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.error(f"Timed out waiting for a pooled {db_type} connection to {host}:{port}/{database} ( max {max_size} )")
+                    return None
+                cls._condition.wait(remaining)
+            cls._in_use[key] = cls._in_use.get(key, 0) + 1
+
+        for expired_conn in expired:
+            cls.close(expired_conn)
+
+        if conn is not None and time.time() - last_used > HEALTH_CHECK_SECONDS and not DBConnector.is_alive(conn, db_type):
+            cls.close(conn)
+            conn = None
+        if conn is not None:
+            logger.info(f"Reusing pooled {db_type} connection to {host}:{port}/{database}")
+            return conn
+
+        conn = DBConnector.connect(db_type, user, password, host, port, database)
+        if conn is None:
+            with cls._condition:
+                cls._in_use[key] -= 1
+                cls._condition.notify_all()
+        return conn
+
+    @classmethod
+    def release(cls, key, conn, reusable):
+        if reusable:
+            try:
+                conn.rollback()  # End the read transaction ( and server-side cursor snapshot ) before reuse
+            except Exception as e:
+                logger.warning(f"Could not reset pooled {key[0]} connection, closing it: {e}")
+                reusable = False
+        with cls._condition:
+            cls._in_use[key] = max(0, cls._in_use.get(key, 0) - 1)
+            if reusable:
+                cls._idle.setdefault(key, []).append((conn, time.time()))
+            cls._condition.notify_all()
+        if not reusable:
+            cls.close(conn)
+
+    @classmethod
+    def evict_idle(cls, idle_seconds):
+        """Removes connections idle longer than idle_seconds, returns them to be closed outside the lock"""
+        cutoff = time.time() - idle_seconds
+        expired = []
+        for key, idle in cls._idle.items():
+            expired += [conn for conn, last_used in idle if last_used < cutoff]
+            idle[:] = [(conn, last_used) for conn, last_used in idle if last_used >= cutoff]
+        if expired:
+            logger.info(f"Closing {len(expired)} idle pooled database connection(s).")
+        return expired
+
+    @classmethod
+    def close_all(cls):
+        with cls._condition:
+            idle = [conn for connections in cls._idle.values() for conn, _ in connections]
+            cls._idle = {}
+        for conn in idle:
+            cls.close(conn)
+
+    @classmethod
+    def reset_after_fork(cls):
+        """Forked children must not use ( or close ) sockets shared with the parent, they start with an empty pool"""
+        cls._inherited.append(cls._idle)
+        cls._condition = threading.Condition()
+        cls._idle = {}
+        cls._in_use = {}
+
+    @staticmethod
+    def close(conn):
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing database connection: {e}")
+
+
+atexit.register(DBConnectionPool.close_all)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=DBConnectionPool.reset_after_fork)
@@ -0,0 +1,279 @@
+import argparse
+import datetime
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+from logger_config import logger
+
+try:
+    import pyarrow as pa  # Needed to write / query the diff store
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+""" This module contains the columnar diff store — every recon run persists its artefacts ( mismatched rows, per column
+mismatch masks, side only rows and column stats ) as Parquet under use_case=<id>/run_ts=<timestamp>/<artefact>/, and
+the query API / CLI below filters, pages and aggregates them without loading a whole run. The html report embeds only
+the first page of each table and asks the page server ( python diff_store.py serve ) for the others. """
+
+DIFF_STORE_DIR = "./resources/recon_reports/diff_store"
+ARTIFACTS = ['mismatches', 'mismatch_mask', 'source_only', 'target_only', 'column_stats']
+RUN_FILE = "run.json"
+PAGE_ROWS = 500
+ROW_GROUP_ROWS = 100000  # Rows per Parquet row group, pages only read the row groups they cover
+SERVER_PORT = 8765
+HIGHLIGHT_STYLE = 'background-color: #FF6347'
+
+
+class DiffStore:
+    @staticmethod
+    def available():
+        return pa is not None
+
+    @staticmethod
+    def root(config):
+        return config.get('diff_store_dir') or DIFF_STORE_DIR
+
+    @staticmethod
+    def partition_value(value):
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value))
+
+    @staticmethod
+    def run_dir(root, use_case, run_ts):
+        return os.path.join(root, f"use_case={DiffStore.partition_value(use_case)}", f"run_ts={run_ts}")
+
+    @staticmethod
+    def new_run_ts(root, use_case, run_time=None):
+        """Run timestamp of a new run, suffixed when a run of the use case already has it"""
+        run_ts = (run_time or datetime.datetime.now()).strftime('%Y%m%dT%H%M%S')
+        candidate, suffix = run_ts, 1
+        while os.path.exists(DiffStore.run_dir(root, use_case, candidate)):
+            candidate, suffix = f"{run_ts}_{suffix}", suffix + 1
+        return candidate
+
+    @staticmethod
+    def arrow_table(frame):
+        """Arrow table of frame, object columns mixing types are written as text"""
+        frame = frame.rename(columns=str)
+        try:
+            return pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            text_columns = {column: frame[column].map(lambda value: value if pd.isna(value) else str(value))
+                            for column in frame.columns if frame[column].dtype == object}
+            return pa.Table.from_pandas(frame.assign(**text_columns), preserve_index=False)
+
+    @staticmethod
+    def write_run(root, use_case, run_ts, artifacts, run_info):
+        """Writes artifacts ( name -> DataFrame ) and the run info json of one run, returns the run directory"""
+        run_dir = DiffStore.run_dir(root, use_case, run_ts)
+        rows = {}
+        for name, frame in artifacts.items():
+            if frame is None:
+                continue
+            artifact_dir = os.path.join(run_dir, name)
+            os.makedirs(artifact_dir, exist_ok=True)
+            pq.write_table(DiffStore.arrow_table(frame), os.path.join(artifact_dir, "part-00000.parquet"),
+                           row_group_size=ROW_GROUP_ROWS)
+            rows[name] = len(frame)
+        with open(os.path.join(run_dir, RUN_FILE), 'w') as f:
+            json.dump({'use_case': str(use_case), 'run_ts': run_ts, 'rows': rows, **run_info}, f, indent=2,
+                      default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+        return run_dir
+
+    @staticmethod
+    def runs(root=DIFF_STORE_DIR, use_case=None):
+        """Run infos of the store ( of one use case ), oldest first"""
+        runs = []
+        if not os.path.isdir(root):
+            return runs
+        for use_case_dir in sorted(os.listdir(root)):
+            if use_case is not None and use_case_dir != f"use_case={DiffStore.partition_value(use_case)}":
+                continue
+            for run_dir in sorted(os.listdir(os.path.join(root, use_case_dir))):
+                run_file = os.path.join(root, use_case_dir, run_dir, RUN_FILE)
+                if os.path.exists(run_file):
+                    with open(run_file) as f:
+                        runs.append(json.load(f))
+        return sorted(runs, key=lambda run: run['run_ts'])
+
+    @staticmethod
+    def run_info(root, use_case, run_ts=None):
+        """Run info of run_ts, the latest run of the use case when run_ts is None"""
+        runs = DiffStore.runs(root, use_case)
+        if run_ts is not None:
+            runs = [run for run in runs if run['run_ts'] == run_ts]
+        if not runs:
+            raise FileNotFoundError(f"No diff store run found for use case '{use_case}'" + (f" at {run_ts}" if run_ts else ""))
+        return runs[-1]
+
+    @staticmethod
+    def dataset(root, use_case, run_ts, artifact):
+        if artifact not in ARTIFACTS:
+            raise ValueError(f"Unknown artifact '{artifact}', use one of {ARTIFACTS}")
+        path = os.path.join(DiffStore.run_dir(root, use_case, run_ts), artifact)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Artifact '{artifact}' not stored for run {run_ts} of use case '{use_case}'")
+        return ds.dataset(path, format='parquet')
+
+    @staticmethod
+    def filter_expression(filters):
+        """pyarrow DNF filters ( e.g. DataFetcher.parse_filters ) as a dataset expression, None for no filter"""
+        return pq.filters_to_expression(filters) if filters else None
+
+    @staticmethod
+    def query(root, use_case, artifact, run_ts=None, filters=None, columns=None, page=1, page_rows=PAGE_ROWS):
+        """(rows of the page, matching row count) — only the record batches up to the page are read, run_ts must be a
+        stored run of the use case"""
+        run_ts = DiffStore.run_info(root, use_case, run_ts)['run_ts']
+        dataset = DiffStore.dataset(root, use_case, run_ts, artifact)
+        expression = DiffStore.filter_expression(filters)
+        total = dataset.count_rows(filter=expression)
+        offset, batches = (max(int(page), 1) - 1) * page_rows, []
+        for batch in dataset.to_batches(columns=columns, filter=expression):
+            if offset >= batch.num_rows:
+                offset -= batch.num_rows
+                continue
+            batches.append(batch.slice(offset, page_rows - sum(part.num_rows for part in batches)))
+            offset = 0
+            if sum(part.num_rows for part in batches) >= page_rows:
+                break
+        schema = dataset.schema if columns is None else pa.schema([dataset.schema.field(column) for column in columns])
+        return pa.Table.from_batches(batches, schema=schema).to_pandas(), total
+
+    @staticmethod
+    def aggregate(root, use_case, artifact, run_ts=None, group_by=None, filters=None):
+        """Row counts per group_by value, or per column mismatch counts ( true values of boolean columns, e.g. of the
+        mismatch_mask artifact ) when group_by is not given"""
+        run_ts = DiffStore.run_info(root, use_case, run_ts)['run_ts']
+        dataset = DiffStore.dataset(root, use_case, run_ts, artifact)
+        expression = DiffStore.filter_expression(filters)
+        if group_by:
+            table = dataset.to_table(columns=group_by, filter=expression)
+            counts = table.group_by(group_by).aggregate([([], 'count_all')]).to_pandas()
+            return counts.rename(columns={'count_all': 'rows'}).sort_values('rows', ascending=False, kind='stable').reset_index(drop=True)
+        flag_columns = [field.name for field in dataset.schema if pa.types.is_boolean(field.type)]
+        counts = {'rows': 0, **{column: 0 for column in flag_columns}}
+        for batch in dataset.to_batches(columns=flag_columns, filter=expression):
+            counts['rows'] += batch.num_rows
+            for column in flag_columns:
+                counts[column] += int(np.count_nonzero(batch.column(column).to_numpy(zero_copy_only=False) == True))
+        return pd.DataFrame({'column': list(counts), 'rows': list(counts.values())})
+
+    @staticmethod
+    def render_page(root, use_case, run_ts, artifact, page=1, page_rows=PAGE_ROWS):
+        """(html table of the page, matching row count) — mismatch pages are highlighted from the mismatch mask"""
+        frame, total = DiffStore.query(root, use_case, artifact, run_ts, page=page, page_rows=page_rows)
+        column_pairs = DiffStore.run_info(root, use_case, run_ts).get('column_pairs') or []
+        if artifact != 'mismatches' or not column_pairs:
+            return frame.to_html(na_rep=""), total
+        mask, _ = DiffStore.query(root, use_case, 'mismatch_mask', run_ts, page=page, page_rows=page_rows)
+        styles = pd.DataFrame('', index=frame.index, columns=frame.columns)
+        for column, column_1, column_2 in column_pairs:
+            if column in mask.columns:
+                differs = mask[column].fillna(False).to_numpy(dtype=bool)
+                styles.loc[differs, [column_1, column_2]] = HIGHLIGHT_STYLE
+        return frame.style.apply(lambda _: styles, axis=None).hide(axis=0).to_html(), total
+
+    @staticmethod
+    def serve(root=DIFF_STORE_DIR, port=SERVER_PORT):
+        """Serves report pages as json on GET /page?use_case=..&run_ts=..&artifact=..&page=..&page_rows=.."""
+
+        class PageHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                request = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(request.query).items()}
+                try:
+                    if request.path != '/page':
+                        raise FileNotFoundError(f"Unknown path {request.path}")
+                    # Only runs listed in the store are served, run_ts never reaches a path unchecked
+                    run_ts = DiffStore.run_info(root, params['use_case'], params.get('run_ts'))['run_ts']
+                    html, total = DiffStore.render_page(root, params['use_case'], run_ts, params['artifact'],
+                                                        int(params.get('page', 1)), int(params.get('page_rows', PAGE_ROWS)))
+                    status, body = 200, {'html': html, 'rows': total}
+                except (KeyError, ValueError, FileNotFoundError) as e:
+                    status, body = 404, {'error': str(e)}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', 'null')  # Reports are opened from file://, other sites get no access
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Diff store server: {format % args}")
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), PageHandler)
+        logger.info(f"Serving diff store {root} on http://127.0.0.1:{port} ...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+def print_frame(frame, output_format):
+    if output_format == 'csv':
+        print(frame.to_csv(index=False), end='')
+    elif output_format == 'json':
+        print(frame.to_json(orient='records', date_format='iso'))
+    else:
+        print(frame.to_string(index=False))
+
+
+def run_command(args):
+    from data_fetcher import DataFetcher  # Filter / column parsing only, not needed by the recon run itself
+
+    if args.command == "runs":
+        runs = [{key: run.get(key) for key in ('use_case', 'run_ts', 'source_name', 'target_name', 'rows', 'report')}
+                for run in DiffStore.runs(args.store, args.use_case)]
+        print_frame(pd.json_normalize(runs), args.format)
+    elif args.command == "show":
+        rows, total = DiffStore.query(args.store, args.use_case, args.artifact, args.run, DataFetcher.parse_filters(args.filter),
+                                      DataFetcher.parse_columns(args.columns), args.page, args.page_rows)
+        print_frame(rows, args.format)
+        pages = max(-(-total // args.page_rows), 1)
+        logger.info(f"Page {args.page} of {pages} ( {total} matching rows ).")
+    elif args.command == "agg":
+        print_frame(DiffStore.aggregate(args.store, args.use_case, args.artifact, args.run,
+                                        DataFetcher.parse_columns(args.group_by), DataFetcher.parse_filters(args.filter)), args.format)
+    else:
+        DiffStore.serve(args.store, args.port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queries the diff store of recon runs")
+    parser.add_argument("--store", default=DIFF_STORE_DIR, help="Diff store directory")
+    parser.add_argument("--format", default="table", choices=["table", "csv", "json"])
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs_parser = commands.add_parser("runs", help="Lists stored runs")
+    runs_parser.add_argument("--use-case")
+    for command in ("show", "agg"):
+        command_parser = commands.add_parser(command, help="Pages rows of an artifact" if command == "show" else
+                                             "Counts rows per group, or mismatches per column without --group-by")
+        command_parser.add_argument("artifact", choices=ARTIFACTS)
+        command_parser.add_argument("--use-case", required=True)
+        command_parser.add_argument("--run", help="Run timestamp, latest run when not given")
+        command_parser.add_argument("--filter", help="Row filter, e.g. \"region == EU; amount > 100\"")
+        if command == "show":
+            command_parser.add_argument("--columns", help="Comma separated columns")
+            command_parser.add_argument("--page", type=int, default=1)
+            command_parser.add_argument("--page-rows", type=int, default=PAGE_ROWS)
+        else:
+            command_parser.add_argument("--group-by", help="Comma separated columns")
+    serve_parser = commands.add_parser("serve", help="Serves report pages on demand")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    try:
+        run_command(args)
+    except (FileNotFoundError, ValueError, KeyError) as e:
+        logger.error(f"Diff store query failed: {e}")
+        raise SystemExit(1)
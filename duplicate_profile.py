@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from logger_config import logger
+
+""" This module contains the duplicate key profiling stage — comparison keys of each side are hashed in one vectorised
+pass to count duplicate keys / rows, list the top offending keys and null key rows, and optionally dedupe before compare
+under the configured policy. """
+
+DEDUPE_POLICIES = ['none', 'first', 'last', 'drop']  # none keeps datacompy's in-order matching of duplicate keys
+TOP_KEYS = 10
+
+
+class DuplicateKeyProfiler:
+    @staticmethod
+    def key_columns(data, comparison_keys):
+        """Key columns of data matched case insensitive ( datacompy lower cases the compared frames in place )"""
+        by_name = {str(column).lower(): column for column in data.columns}
+        return [by_name.get(str(key).lower(), key) for key in comparison_keys]
+
+    @staticmethod
+    def key_hashes(data, key_columns):
+        return pd.util.hash_pandas_object(data[key_columns], index=False).to_numpy()
+
+    @staticmethod
+    def profile(data, comparison_keys, side, top_n=TOP_KEYS):
+        """Duplicate key figures of one side, None when the data is not available"""
+        if data is None:
+            return None
+        key_columns = DuplicateKeyProfiler.key_columns(data, comparison_keys)
+        if any(column not in data.columns for column in key_columns):
+            logger.warning(f"Comparison keys missing in {side} data, duplicate keys can not be profiled.")
+            return None
+        hashes = pd.Series(DuplicateKeyProfiler.key_hashes(data, key_columns))
+        counts = hashes.value_counts()
+        duplicated = counts[counts > 1]
+        top = duplicated.head(int(top_n))
+        positions = hashes[hashes.isin(top.index)].drop_duplicates().index.to_numpy()
+        top_keys = data.iloc[positions][key_columns].reset_index(drop=True)
+        top_keys['rows'] = hashes.iloc[positions].map(top).to_numpy()
+        return {
+            'side': side,
+            'rows': len(data),
+            'duplicate_keys': len(duplicated),
+            'duplicate_rows': int(duplicated.sum()),
+            'null_key_rows': int(data[key_columns].isna().any(axis=1).sum()),
+            'top_keys': top_keys.sort_values('rows', ascending=False, kind='stable').reset_index(drop=True)
+        }
+
+    @staticmethod
+    def top_n(config):
+        return int(float(config.get('duplicate_top_keys') or TOP_KEYS))
+
+    @staticmethod
+    def profile_pair(source_data, target_data, comparison_keys, top_n=TOP_KEYS):
+        return {side: DuplicateKeyProfiler.profile(data, comparison_keys, side, top_n)
+                for side, data in (('source', source_data), ('target', target_data))}
+
+    @staticmethod
+    def merge(pairs, top_n=TOP_KEYS):
+        """Merges profile pairs of partitions — duplicate keys always hash to the same partition, so counts add up"""
+        merged = {}
+        for side in ('source', 'target'):
+            profiles = [pair[side] for pair in pairs if pair.get(side) is not None]
+            if not profiles:
+                merged[side] = None
+                continue
+            top_keys = pd.concat([profile['top_keys'] for profile in profiles], ignore_index=True)
+            merged[side] = {
+                'side': side,
+                'rows': sum(profile['rows'] for profile in profiles),
+                'duplicate_keys': sum(profile['duplicate_keys'] for profile in profiles),
+                'duplicate_rows': sum(profile['duplicate_rows'] for profile in profiles),
+                'null_key_rows': sum(profile['null_key_rows'] for profile in profiles),
+                'top_keys': top_keys.sort_values('rows', ascending=False, kind='stable').head(int(top_n)).reset_index(drop=True)
+            }
+        return merged
+
+    @staticmethod
+    def log_profiles(profiles):
+        for profile in profiles.values():
+            if profile is None:
+                continue
+            if profile['duplicate_keys'] or profile['null_key_rows']:
+                logger.warning(f"{profile['side'].capitalize()} has {profile['duplicate_keys']} duplicate keys over "
+                               f"{profile['duplicate_rows']} rows and {profile['null_key_rows']} rows with null keys.")
+            if profile['duplicate_keys']:
+                logger.warning(f"Top duplicate {profile['side']} keys:\n{profile['top_keys'].to_string(index=False)}")
+
+    @staticmethod
+    def flags(profiles):
+        """Duplicate flags / details shown in the report"""
+        flags = {}
+        for side, suffix in (('source', 'src'), ('target', 'tgt')):
+            profile = profiles.get(side)
+            if profile is None:
+                flags[f"duplicate_flag_{suffix}"] = 'No'
+                continue
+            flags[f"duplicate_flag_{suffix}"] = 'Yes' if profile['duplicate_keys'] else 'No'
+            flags[f"duplicate_detail_{suffix}"] = (f"{profile['duplicate_keys']} keys / {profile['duplicate_rows']} rows, "
+                                                  f"{profile['null_key_rows']} null key rows")
+        return flags
+
+    @staticmethod
+    def dedupe_policy(config):
+        """Configured dedupe policy, 'none' when not set or unknown"""
+        policy = str(config.get('dedupe_policy') or 'none').strip().lower()
+        if policy not in DEDUPE_POLICIES:
+            logger.warning(f"Unknown dedupe policy '{policy}', keeping duplicate keys. Use one of {DEDUPE_POLICIES}.")
+            return 'none'
+        return policy
+
+    @staticmethod
+    def dedupe(data, comparison_keys, policy, side):
+        """Applies the dedupe policy — 'first' / 'last' keep one row per key, 'drop' removes every row of a duplicate key"""
+        if policy == 'none':
+            return data
+        hashes = pd.Series(DuplicateKeyProfiler.key_hashes(data, DuplicateKeyProfiler.key_columns(data, comparison_keys)))
+        duplicated = hashes.duplicated(keep=False if policy == 'drop' else policy).to_numpy()
+        if not duplicated.any():
+            return data
+        logger.info(f"Dedupe policy '{policy}' removed {int(np.count_nonzero(duplicated))} {side} rows with duplicate keys.")
+        return data[~duplicated].reset_index(drop=True)
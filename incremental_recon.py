@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+from datacompy.core import calculate_max_diff, columns_equal
+from duplicate_profile import DuplicateKeyProfiler
+from partitioned_recon import HashPartitioner
+from logger_config import logger
+
+""" This module contains logic for incremental ( delta ) recon — row hashes of the last run are kept per use case,
+only keys whose rows changed on either side are compared again and the results of unchanged keys are carried forward. """
+
+STATE_DIR = "./resources/recon_state"
+KEY_HASH = "__key_hash"
+KEY_HASH_VERSION = "canonical"  # Stored in the state signature, state hashed with another key encoding is not reused
+ROW_HASH = "__row_hash"
+
+
+class IncrementalReconState:
+    """Per use case state store — row hashes per side plus the diffs ( mismatch / side only rows ) of the last run"""
+
+    def __init__(self, use_case_id, comparison_keys, state_dir=STATE_DIR):
+        self.comparison_keys = comparison_keys
+        self.state_path = os.path.join(state_dir, str(use_case_id))
+
+    @staticmethod
+    def key_hashes(data, keys):
+        """64-bit hash of the key columns ( matched case insensitive ) on their canonical text — 1, 1.0 and '1' hash
+        alike, so a key keeps its hash when its dtype differs between the sides or between runs"""
+        key_columns = DuplicateKeyProfiler.key_columns(data, keys)
+        key_values = pd.DataFrame({index: HashPartitioner.canonical_key(data[column]).to_numpy()
+                                   for index, column in enumerate(key_columns)})
+        return pd.util.hash_pandas_object(key_values, index=False).to_numpy()
+
+    def row_hashes(self, data):
+        """Returns frame with key hash and hash of the whole row ( columns in sorted order ) for each row"""
+        return pd.DataFrame({
+            KEY_HASH: self.key_hashes(data, self.comparison_keys),
+            ROW_HASH: pd.util.hash_pandas_object(data[sorted(data.columns)], index=False).to_numpy()
+        })
+
+    @staticmethod
+    def signature(source_data, target_data, comparison_keys):
+        """Anything that invalidates carried forward results when it changes"""
+        return {
+            "comparison_keys": list(comparison_keys),
+            "key_hash": KEY_HASH_VERSION,
+            "source_columns": sorted(map(str, source_data.columns)),
+            "target_columns": sorted(map(str, target_data.columns)),
+            "source_dtypes": {str(col): str(dtype) for col, dtype in source_data.dtypes.items()},
+            "target_dtypes": {str(col): str(dtype) for col, dtype in target_data.dtypes.items()}
+        }
+
+    def load(self, signature):
+        """Returns previous run state or None when there is none or it was built for a different signature"""
+        meta_file = os.path.join(self.state_path, "meta.json")
+        if not os.path.exists(meta_file):
+            logger.info(f"No previous recon state found at {self.state_path}, running full recon.")
+            return None
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            if meta.get("signature") != signature:
+                logger.info("Columns, dtypes or comparison keys changed since last run, running full recon.")
+                return None
+            return {name: pd.read_pickle(os.path.join(self.state_path, f"{name}.pkl"))
+                    for name in ("source_hashes", "target_hashes", "all_mismatch", "df1_unq_rows", "df2_unq_rows")}
+        except Exception as e:
+            logger.warning(f"Could not read previous recon state at {self.state_path}, running full recon: {e}")
+            return None
+
+    def save(self, signature, source_hashes, target_hashes, comparison):
+        """Persists current row hashes and diffs, diffs carry their key hash so next run can filter them"""
+        tmp_path = f"{self.state_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        source_hashes.to_pickle(os.path.join(tmp_path, "source_hashes.pkl"))
+        target_hashes.to_pickle(os.path.join(tmp_path, "target_hashes.pkl"))
+        for name, frame in (("all_mismatch", comparison.all_mismatch()),
+                            ("df1_unq_rows", comparison.df1_unq_rows),
+                            ("df2_unq_rows", comparison.df2_unq_rows)):
+            frame = frame.copy()
+            frame[KEY_HASH] = self.key_hashes(frame, self.comparison_keys) if len(frame) else pd.Series(dtype='uint64')
+            frame.to_pickle(os.path.join(tmp_path, f"{name}.pkl"))
+        with open(os.path.join(tmp_path, "meta.json"), 'w') as f:
+            json.dump({"signature": signature}, f)
+        shutil.rmtree(self.state_path, ignore_errors=True)
+        os.replace(tmp_path, self.state_path)
+        logger.info(f"Recon state saved at {self.state_path}")
+
+    def clear(self):
+        shutil.rmtree(self.state_path, ignore_errors=True)
+
+    @staticmethod
+    def changed_keys(previous_hashes, current_hashes):
+        """Key hashes that are new, deleted or whose row hash changed"""
+        merged = previous_hashes.merge(current_hashes, on=KEY_HASH, how='outer', suffixes=('_prev', '_cur'))
+        changed = merged[merged[f"{ROW_HASH}_prev"] != merged[f"{ROW_HASH}_cur"]]
+        return pd.Index(changed[KEY_HASH].unique())
+
+
+class IncrementalComparison:
+    """Carries forward diffs of unchanged keys and adds the delta compare, exposing what ReconReportGenerator consumes"""
+
+    def __init__(self, delta_comparison, previous_state, changed_keys, intersect_count):
+        self.join_columns = delta_comparison.join_columns
+        self.abs_tol = delta_comparison.abs_tol
+        self.rel_tol = delta_comparison.rel_tol
+        self.ignore_spaces = delta_comparison.ignore_spaces
+        self.ignore_case = delta_comparison.ignore_case
+        self.df1_name = delta_comparison.df1_name
+        self.df2_name = delta_comparison.df2_name
+
+        self._all_mismatch = self.carry_forward(previous_state["all_mismatch"], delta_comparison.all_mismatch(), changed_keys)
+        self.df1_unq_rows = self.carry_forward(previous_state["df1_unq_rows"], delta_comparison.df1_unq_rows, changed_keys)
+        self.df2_unq_rows = self.carry_forward(previous_state["df2_unq_rows"], delta_comparison.df2_unq_rows, changed_keys)
+        self.column_stats = self.build_column_stats(delta_comparison.column_stats, intersect_count)
+
+    def all_mismatch(self):
+        return self._all_mismatch
+
+    @staticmethod
+    def carry_forward(previous, delta, changed_keys):
+        unchanged = previous[~previous[KEY_HASH].isin(changed_keys)].drop(columns=[KEY_HASH])
+        if unchanged.empty:
+            return delta.reset_index(drop=True)
+        if delta.empty:
+            return unchanged.reset_index(drop=True)
+        return pd.concat([unchanged, delta], ignore_index=True)
+
+    def build_column_stats(self, delta_column_stats, intersect_count):
+        """Re-derives column stats over all intersect rows — matched rows are equal on every column, so every
+        unequal / null difference lives in the merged mismatch rows"""
+        column_stats = []
+        for stat in delta_column_stats:
+            stat = dict(stat)
+            if stat['column'] in self.join_columns:
+                stat.update(match_cnt=intersect_count, unequal_cnt=0)
+            else:
+                col_1 = self._all_mismatch[f"{stat['column']}_{self.df1_name}"]
+                col_2 = self._all_mismatch[f"{stat['column']}_{self.df2_name}"]
+                unequal_cnt = int((~columns_equal(col_1, col_2, self.rel_tol, self.abs_tol,
+                                                  self.ignore_spaces, self.ignore_case)).sum())
+                stat.update(
+                    match_cnt=intersect_count - unequal_cnt,
+                    unequal_cnt=unequal_cnt,
+                    max_diff=calculate_max_diff(col_1, col_2) if len(col_1) else 0.0,
+                    null_diff=int((col_1.isnull() ^ col_2.isnull()).sum()),
+                    all_match=stat['dtype1'] == stat['dtype2'] and unequal_cnt == 0
+                )
+            column_stats.append(stat)
+        return column_stats
@@ -0,0 +1,135 @@
+import glob
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from duplicate_profile import DuplicateKeyProfiler
+from logger_config import logger
+
+""" This module contains logic for out-of-core ( partitioned ) recon — source and target are streamed in chunks,
+spilled to on-disk buckets by a hash of the comparison keys and every bucket pair is compared on its own. """
+
+NULL_KEY = "\x00<null>"  # Bucketing text of null keys, datacompy joins null keys with each other
+
+
+class HashPartitioner:
+    """Spills chunked DataFrames into N on-disk buckets using a hash of the comparison keys"""
+
+    def __init__(self, comparison_keys, partition_count, work_dir=None):
+        self.comparison_keys = comparison_keys
+        self.partition_count = partition_count
+        self.work_dir = tempfile.mkdtemp(prefix="recon_partitions_", dir=work_dir)
+        self.schemas = {}  # Empty frame per side, used when a bucket has no rows for that side
+
+    def bucket_ids(self, chunk):
+        """Returns bucket number per row, keys are hashed on their canonical text so both sides land in same bucket.
+        Key columns are matched case insensitive, like datacompy joins them"""
+        key_columns = DuplicateKeyProfiler.key_columns(chunk, self.comparison_keys)
+        key_values = pd.DataFrame({index: self.canonical_key(chunk[column]) for index, column in enumerate(key_columns)},
+                                  index=chunk.index)
+        hashes = pd.util.hash_pandas_object(key_values, index=False)
+        return (hashes % self.partition_count).astype('int64')
+
+    @staticmethod
+    def canonical_key(values):
+        """Key text hashed for bucketing — numbers as float64 ( 1, 1.0 and '1' alike ) and every kind of null as one
+        sentinel, so a key lands in the same bucket whatever dtype a side or chunk was read with"""
+        if pd.api.types.is_datetime64_any_dtype(values) or pd.api.types.is_timedelta64_dtype(values):
+            numbers = pd.Series(np.nan, index=values.index)
+        else:
+            numbers = pd.to_numeric(values.astype(object), errors='coerce').astype('float64') + 0.0  # + 0.0 folds -0.0
+        text = values.astype(str).where(numbers.isna(), numbers.astype(str))
+        return text.where(values.notna(), NULL_KEY)
+
+    def spill(self, chunks, side):
+        """Writes each chunk's rows into its bucket folder, returns total rows spilled for the side"""
+        total_rows = 0
+        for part_no, chunk in enumerate(chunks):
+            if side not in self.schemas:
+                self.schemas[side] = chunk.iloc[0:0]
+            for bucket, bucket_rows in chunk.groupby(self.bucket_ids(chunk), sort=False):
+                bucket_dir = os.path.join(self.work_dir, side, f"bucket_{bucket:05d}")
+                os.makedirs(bucket_dir, exist_ok=True)
+                bucket_rows.to_pickle(os.path.join(bucket_dir, f"part_{part_no:06d}.pkl"))
+            total_rows += len(chunk)
+        logger.info(f"Spilled {total_rows} {side} rows into {self.partition_count} buckets at {self.work_dir}")
+        return total_rows
+
+    def load_bucket(self, side, bucket):
+        """Loads all spilled parts of one bucket for a side ( empty frame if bucket has no rows )"""
+        part_files = sorted(glob.glob(os.path.join(self.work_dir, side, f"bucket_{bucket:05d}", "*.pkl")))
+        if not part_files:
+            return self.schemas[side].copy()
+        return pd.concat([pd.read_pickle(part) for part in part_files], ignore_index=True)
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class PartitionedComparison:
+    """Merged view over per-bucket datacompy comparisons, exposing the attributes ReconReportGenerator consumes.
+
+    Only the diffs ( mismatched and side only rows ) are kept across buckets, matched rows are dropped once
+    their bucket is compared, so memory stays bounded by bucket size plus the size of the differences.
+    """
+
+    def __init__(self):
+        self.join_columns = []
+        self.abs_tol = 0
+        self.rel_tol = 0
+        self.ignore_spaces = False
+        self.column_stats = []
+        self._mismatch_parts = []
+        self._df1_unq_parts = []
+        self._df2_unq_parts = []
+        self.df1_unq_rows = pd.DataFrame()
+        self.df2_unq_rows = pd.DataFrame()
+        self._all_mismatch = pd.DataFrame()
+
+    def add_bucket(self, comparison):
+        """Keeps diffs of one bucket comparison and folds its column stats into the running totals"""
+        self.join_columns = comparison.join_columns
+        self.abs_tol = comparison.abs_tol
+        self.rel_tol = comparison.rel_tol
+        self.ignore_spaces = comparison.ignore_spaces
+        mismatch = comparison.all_mismatch()
+        if not mismatch.empty:
+            self._mismatch_parts.append(mismatch)
+        if not comparison.df1_unq_rows.empty:
+            self._df1_unq_parts.append(comparison.df1_unq_rows)
+        if not comparison.df2_unq_rows.empty:
+            self._df2_unq_parts.append(comparison.df2_unq_rows)
+        self.column_stats = self.merge_column_stats(self.column_stats, comparison.column_stats)
+
+    def finalize(self):
+        """Concatenates per-bucket diffs once all buckets are compared"""
+        if self._mismatch_parts:
+            self._all_mismatch = pd.concat(self._mismatch_parts, ignore_index=True)
+        if self._df1_unq_parts:
+            self.df1_unq_rows = pd.concat(self._df1_unq_parts, ignore_index=True)
+        if self._df2_unq_parts:
+            self.df2_unq_rows = pd.concat(self._df2_unq_parts, ignore_index=True)
+        self._mismatch_parts, self._df1_unq_parts, self._df2_unq_parts = [], [], []
+
+    def all_mismatch(self):
+        return self._all_mismatch
+
+    @staticmethod
+    def merge_column_stats(merged, bucket_stats):
+        """Sums counts, keeps the largest max_diff ( NaN for empty buckets is skipped ) and ANDs all_match column by column"""
+        if not merged:
+            return [dict(stat) for stat in bucket_stats]
+        by_column = {stat['column']: stat for stat in merged}
+        for stat in bucket_stats:
+            current = by_column.get(stat['column'])
+            if current is None:
+                merged.append(dict(stat))
+                continue
+            current['match_cnt'] += stat['match_cnt']
+            current['unequal_cnt'] += stat['unequal_cnt']
+            current['null_diff'] += stat['null_diff']
+            current['max_diff'] = pd.Series([current['max_diff'], stat['max_diff']], dtype='float64').max()
+            current['all_match'] = current['all_match'] and stat['all_match']
+        return merged
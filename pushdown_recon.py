@@ -0,0 +1,287 @@
+import sqlite3
+
+import pandas as pd
+from datacompy.core import calculate_max_diff
+from logger_config import logger
+
+""" This module contains logic for push-down recon — when source and target live in the same database the join on
+comparison keys runs in the database ( FULL OUTER JOIN with per column mismatch flags ), only the aggregate counts and
+the mismatching / side only rows are sent back to the client. """
+
+PUSHDOWN_DB_TYPES = ['postgresql', 'oracle', 'mssql', 'mysql', 'sqlite']
+SRC_PRESENT = "recon_src_present"
+TGT_PRESENT = "recon_tgt_present"
+
+
+class PushdownQueryBuilder:
+    """Generates the push-down SQL from the source / target query files.
+
+    keys are (name, source column, target column) tuples, columns the same for compared non-key columns, names are
+    the lower case names datacompy would report. Result columns use positional aliases ( s_0, t_0, m_0 ... ) so
+    any source column name is safe and Oracle identifier length limits are never hit. CTE names are prefixed with
+    recon_ so they do not shadow tables the query files read from.
+    """
+
+    def __init__(self, db_type, source_query, target_query, keys, columns, source_only_columns, target_only_columns):
+        self.db_type = db_type
+        self.source_query = self.strip_query(source_query)
+        self.target_query = self.strip_query(target_query)
+        self.keys = keys
+        self.columns = columns
+        self.source_only_columns = source_only_columns
+        self.target_only_columns = target_only_columns
+
+    @staticmethod
+    def strip_query(query):
+        return query.strip().rstrip(';').strip()
+
+    def quote(self, identifier):
+        return self.quote_identifier(self.db_type, identifier)
+
+    @staticmethod
+    def quote_identifier(db_type, identifier):
+        identifier = str(identifier)
+        if db_type == 'mysql':
+            return f"`{identifier.replace('`', '``')}`"
+        if db_type == 'mssql':
+            return f"[{identifier.replace(']', ']]')}]"
+        return '"' + identifier.replace('"', '""') + '"'
+
+    @staticmethod
+    def order_by_clause(db_type, columns):
+        """ORDER BY columns with NULLs first on every database ( their default NULL position differs )"""
+        parts = []
+        for column in columns:
+            quoted = PushdownQueryBuilder.quote_identifier(db_type, column)
+            parts += [f"CASE WHEN {quoted} IS NULL THEN 0 ELSE 1 END", quoted]
+        return "ORDER BY " + ", ".join(parts)
+
+    def supports_full_outer_join(self):
+        """FULL OUTER JOIN on the null safe key condition, PostgreSQL only runs FULL JOIN on merge / hash joinable ones"""
+        if self.db_type in ('mysql', 'postgresql'):
+            return False
+        if self.db_type == 'sqlite':
+            return sqlite3.sqlite_version_info >= (3, 39, 0)
+        return True
+
+    def ctes(self):
+        return (f"WITH recon_src AS (SELECT q.*, 1 AS {SRC_PRESENT} FROM ({self.source_query}) q), "
+                f"recon_tgt AS (SELECT q.*, 1 AS {TGT_PRESENT} FROM ({self.target_query}) q)")
+
+    def projection(self):
+        select = [f"s.{SRC_PRESENT} AS in_src", f"t.{TGT_PRESENT} AS in_tgt"]
+        for i, (_, src, tgt) in enumerate(self.keys):
+            select += [f"s.{self.quote(src)} AS sk_{i}", f"t.{self.quote(tgt)} AS tk_{i}"]
+        for i, (_, src, tgt) in enumerate(self.columns):
+            s_col, t_col = f"s.{self.quote(src)}", f"t.{self.quote(tgt)}"
+            select += [f"{s_col} AS s_{i}", f"{t_col} AS t_{i}",
+                       f"CASE WHEN {s_col} = {t_col} OR ({s_col} IS NULL AND {t_col} IS NULL) THEN 0 ELSE 1 END AS m_{i}"]
+        select += [f"s.{self.quote(src)} AS so_{i}" for i, (_, src) in enumerate(self.source_only_columns)]
+        select += [f"t.{self.quote(tgt)} AS to_{i}" for i, (_, tgt) in enumerate(self.target_only_columns)]
+        return ", ".join(select)
+
+    def null_safe_equal(self, left, right):
+        """Key equality that also joins NULL keys with each other, like datacompy does"""
+        if self.db_type == 'postgresql':
+            return f"{left} IS NOT DISTINCT FROM {right}"
+        if self.db_type == 'mysql':
+            return f"{left} <=> {right}"
+        if self.db_type == 'sqlite':
+            return f"{left} IS {right}"
+        return f"({left} = {right} OR ({left} IS NULL AND {right} IS NULL))"
+
+    def joined(self):
+        """Joined rows as a third CTE, FULL OUTER JOIN is emulated with LEFT JOIN + anti LEFT JOIN where missing"""
+        condition = " AND ".join(self.null_safe_equal(f"s.{self.quote(src)}", f"t.{self.quote(tgt)}") for _, src, tgt in self.keys)
+        projection = self.projection()
+        if self.supports_full_outer_join():
+            join_sql = f"SELECT {projection} FROM recon_src s FULL OUTER JOIN recon_tgt t ON {condition}"
+        else:
+            join_sql = (f"SELECT {projection} FROM recon_src s LEFT JOIN recon_tgt t ON {condition} "
+                        f"UNION ALL SELECT {projection} FROM recon_tgt t LEFT JOIN recon_src s ON {condition} WHERE s.{SRC_PRESENT} IS NULL")
+        return f"{self.ctes()}, recon_joined AS ({join_sql})"
+
+    def any_mismatch(self):
+        return " OR ".join(f"m_{i} = 1" for i in range(len(self.columns))) or "1 = 0"
+
+    def duplicate_keys_query(self, side):
+        """Count of key values that occur more than once on one side, GROUP BY puts NULL keys in one group like the join"""
+        cte, position = ("recon_src", 1) if side == 'source' else ("recon_tgt", 2)
+        key_columns = ", ".join(self.quote(key[position]) for key in self.keys)
+        return f"{self.ctes()} SELECT COUNT(*) AS duplicate_keys FROM (SELECT {key_columns} FROM {cte} GROUP BY {key_columns} HAVING COUNT(*) > 1) d"
+
+    def summary_query(self):
+        both = "in_src = 1 AND in_tgt = 1"
+        aggregates = [
+            "SUM(CASE WHEN in_src = 1 THEN 1 ELSE 0 END) AS src_rows",
+            "SUM(CASE WHEN in_tgt = 1 THEN 1 ELSE 0 END) AS tgt_rows",
+            f"SUM(CASE WHEN {both} THEN 1 ELSE 0 END) AS common_rows",
+            f"SUM(CASE WHEN {both} AND ({self.any_mismatch()}) THEN 1 ELSE 0 END) AS mismatch_rows"
+        ]
+        for i in range(len(self.columns)):
+            aggregates += [
+                f"SUM(CASE WHEN {both} THEN m_{i} ELSE 0 END) AS unequal_{i}",
+                f"SUM(CASE WHEN {both} AND ((s_{i} IS NULL AND t_{i} IS NOT NULL) OR (s_{i} IS NOT NULL AND t_{i} IS NULL)) "
+                f"THEN 1 ELSE 0 END) AS null_diff_{i}"
+            ]
+        return f"{self.joined()} SELECT {', '.join(aggregates)} FROM recon_joined"
+
+    def diff_query(self):
+        """Mismatching and side only rows, matched rows never leave the database"""
+        return f"{self.joined()} SELECT * FROM recon_joined WHERE in_src IS NULL OR in_tgt IS NULL OR {self.any_mismatch()}"
+
+
+class PushdownComparison:
+    """Exposes the attributes ReconReportGenerator consumes, built from the push-down summary row and diff rows"""
+
+    def __init__(self, builder, summary_row, diff_batches, df1_name='df1', df2_name='df2'):
+        self.join_columns = [name for name, _, _ in builder.keys]
+        self.abs_tol = 0
+        self.rel_tol = 0
+        self.ignore_spaces = False
+        self.df1_name = df1_name
+        self.df2_name = df2_name
+        self.builder = builder
+        self.counts = {key: int(value or 0) for key, value in summary_row.items()}  # SUM over no rows is NULL
+
+        diff_rows = self.split_diff_rows(diff_batches)
+        self.diff_row_count = sum(len(rows) for rows in diff_rows.values())
+        self._all_mismatch = self.build_frame(diff_rows['mismatch'], [
+            *((name, f"sk_{i}") for i, (name, _, _) in enumerate(builder.keys)),
+            *(pair for i, (name, _, _) in enumerate(builder.columns)
+              for pair in ((f"{name}_{df1_name}", f"s_{i}"), (f"{name}_{df2_name}", f"t_{i}")))
+        ])
+        self.df1_unq_rows = self.build_frame(diff_rows['source_only'], [
+            *((name, f"sk_{i}") for i, (name, _, _) in enumerate(builder.keys)),
+            *((name, f"s_{i}") for i, (name, _, _) in enumerate(builder.columns)),
+            *((name, f"so_{i}") for i, (name, _) in enumerate(builder.source_only_columns))
+        ])
+        self.df2_unq_rows = self.build_frame(diff_rows['target_only'], [
+            *((name, f"tk_{i}") for i, (name, _, _) in enumerate(builder.keys)),
+            *((name, f"t_{i}") for i, (name, _, _) in enumerate(builder.columns)),
+            *((name, f"to_{i}") for i, (name, _) in enumerate(builder.target_only_columns))
+        ])
+        self.column_stats = self.build_column_stats(diff_rows)
+
+    @staticmethod
+    def split_diff_rows(diff_batches):
+        """Splits the diff rows into mismatch / source only / target only frames before any frame is built, so the
+        other side's missing values ( NULL ) do not turn integer columns into floats"""
+        parts = {'mismatch': [], 'source_only': [], 'target_only': []}
+        columns = []
+        for columns, rows in diff_batches:
+            columns = [str(col).lower() for col in columns]  # Oracle returns upper case aliases
+            in_src, in_tgt = columns.index('in_src'), columns.index('in_tgt')
+            grouped = {'mismatch': [], 'source_only': [], 'target_only': []}
+            for row in rows:
+                if row[in_src] is None:
+                    grouped['target_only'].append(row)
+                elif row[in_tgt] is None:
+                    grouped['source_only'].append(row)
+                else:
+                    grouped['mismatch'].append(row)
+            for name, group in grouped.items():
+                if group:
+                    parts[name].append(pd.DataFrame.from_records(group, columns=columns, coerce_float=True))
+        return {name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+                for name, frames in parts.items()}
+
+    @staticmethod
+    def build_frame(rows, column_aliases):
+        return pd.DataFrame({name: rows[alias].to_numpy() for name, alias in column_aliases},
+                            columns=[name for name, _ in column_aliases])
+
+    @staticmethod
+    def side_dtype(diff_rows, alias, parts):
+        """dtype of one side's column over the diff rows that side has, 'object' when it has none"""
+        values = [diff_rows[part][alias] for part in parts if len(diff_rows[part])]
+        return str(pd.concat(values).dtype) if values else 'object'
+
+    def all_mismatch(self):
+        return self._all_mismatch
+
+    def build_column_stats(self, diff_rows):
+        """Same shape as datacompy column_stats — counts come from the database, max_diff from the mismatching rows
+        ( matched rows have no diff ). dtypes are the ones of the returned diff rows."""
+        common_rows = self.counts['common_rows']
+        source_parts, target_parts = ('mismatch', 'source_only'), ('mismatch', 'target_only')
+        column_stats = []
+        for i, (name, _, _) in enumerate(self.builder.keys):
+            column_stats.append({'column': name, 'match_column': '', 'match_cnt': common_rows, 'unequal_cnt': 0,
+                                 'dtype1': self.side_dtype(diff_rows, f"sk_{i}", source_parts),
+                                 'dtype2': self.side_dtype(diff_rows, f"tk_{i}", target_parts),
+                                 'all_match': True, 'max_diff': 0.0, 'null_diff': 0})
+        for i, (name, _, _) in enumerate(self.builder.columns):
+            unequal_cnt = self.counts[f"unequal_{i}"]
+            col_1 = self._all_mismatch[f"{name}_{self.df1_name}"]
+            col_2 = self._all_mismatch[f"{name}_{self.df2_name}"]
+            dtype1 = self.side_dtype(diff_rows, f"s_{i}", source_parts)
+            dtype2 = self.side_dtype(diff_rows, f"t_{i}", target_parts)
+            column_stats.append({
+                'column': name,
+                'match_column': f"{name}_match",
+                'match_cnt': common_rows - unequal_cnt,
+                'unequal_cnt': unequal_cnt,
+                'dtype1': dtype1,
+                'dtype2': dtype2,
+                'all_match': dtype1 == dtype2 and unequal_cnt == 0,
+                'max_diff': calculate_max_diff(col_1, col_2) if len(col_1) else 0.0,
+                'null_diff': self.counts[f"null_diff_{i}"]
+            })
+        return column_stats
+
+    def summary(self):
+        """Summary in the shape of ReconReportGenerator.generate_summary_stats"""
+        common_rows, mismatch_rows = self.counts['common_rows'], self.counts['mismatch_rows']
+        key_count = len(self.builder.keys)
+        return {
+            "src_row_count": self.counts['src_rows'],
+            "src_col_count": key_count + len(self.builder.columns) + len(self.builder.source_only_columns),
+            "tgt_row_count": self.counts['tgt_rows'],
+            "tgt_col_count": key_count + len(self.builder.columns) + len(self.builder.target_only_columns),
+            "common_rows_count": common_rows,
+            "rows_in_src_only": self.counts['src_rows'] - common_rows,
+            "rows_in_tgt_only": self.counts['tgt_rows'] - common_rows,
+            "rows_having_mismatch": mismatch_rows,
+            "row_having_no_mismatch": common_rows - mismatch_rows,
+            "common_cols_count": key_count + len(self.builder.columns),
+            "cols_in_src_only_count": len(self.builder.source_only_columns),
+            "cols_in_tgt_only_count": len(self.builder.target_only_columns),
+            "cols_having_no_mismatch": sum(1 for col in self.column_stats if col['all_match']),
+            "cols_having_mismatch": sum(1 for col in self.column_stats if not col['all_match']),
+            "absolute_tole": str(self.abs_tol),
+            "relative_tole": str(self.rel_tol),
+            "matched_keys": str(self.join_columns),
+            "spaces_ignored": self.ignore_spaces
+        }
+
+
+class PushdownRecon:
+    @staticmethod
+    def is_eligible(config):
+        """Both sides are queries on the same database server / database of a supported type"""
+        if any(str(config.get(f"{side}_type", '')).lower() != 'database' for side in ('source', 'target')):
+            return False
+        db_type = str(config.get('source_db_type', '')).lower()
+        if db_type not in PUSHDOWN_DB_TYPES or str(config.get('target_db_type', '')).lower() != db_type:
+            return False
+        return all(str(config.get(f"source_{item}", '')).strip().lower() == str(config.get(f"target_{item}", '')).strip().lower()
+                   for item in ('host', 'port', 'database'))
+
+    @staticmethod
+    def match_columns(source_columns, target_columns, comparison_keys, mapping_dict=None):
+        """Pairs source / target columns case insensitive ( like datacompy ), after the column mapping sheet renames.
+        Returns (keys, columns, source only, target only), None for keys when a key is missing on either side."""
+        mapping_dict = mapping_dict or {}
+        source_by_name = {str(mapping_dict.get(col, col)).lower(): col for col in source_columns}
+        target_by_name = {str(col).lower(): col for col in target_columns}
+        key_names = [key.lower() for key in comparison_keys]
+        if any(key not in source_by_name or key not in target_by_name for key in key_names):
+            return None, None, None, None
+        keys = [(key, source_by_name[key], target_by_name[key]) for key in key_names]
+        columns = [(name, src, target_by_name[name]) for name, src in source_by_name.items()
+                   if name in target_by_name and name not in key_names]
+        source_only = [(name, src) for name, src in source_by_name.items() if name not in target_by_name]
+        target_only = [(name, tgt) for name, tgt in target_by_name.items() if name not in source_by_name]
+        logger.info(f"Push-down recon: {len(columns)} compared columns, {len(source_only)} source only, {len(target_only)} target only.")
+        return keys, columns, source_only, target_only
@@ -0,0 +1,233 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from recon_engine import ReconEngine
+from recon_reporter import ReconReportGenerator
+from resource_usage import current_rss_mb, peak_rss_mb, process_uptime_seconds
+from source_plugins import IMPORT_TIMES
+from logger_config import logger
+
+""" This module contains the benchmark harness for the recon pipeline — it generates synthetic source / target pairs,
+writes them in every supported file format and times fetch, compare and report stages separately. Every case runs in a
+fresh process so peak RSS belongs to that case only. Results are written as JSON to diff between commits. """
+
+BENCHMARK_DIR = "./resources/benchmarks"
+LEADING_KEY_CARDINALITY = 1000  # Distinct leading key values of a composite key when no key cardinality is given
+FILE_FORMATS = ['csv', 'xlsx', 'json', 'xml', 'fwf', 'parquet']
+
+
+class SyntheticDataGenerator:
+    """Builds a source frame and a target frame derived from it with controlled differences"""
+
+    def __init__(self, rows=100000, columns=10, key_columns=1, key_cardinality=None, mismatch_rate=0.01,
+                 duplicate_key_rate=0.0, unique_row_rate=0.01, seed=42):
+        self.rows = rows
+        self.columns = columns
+        self.key_columns = key_columns
+        self.key_cardinality = key_cardinality  # Distinct values of the ( leading ) key column, None for unique keys
+        self.mismatch_rate = mismatch_rate
+        self.duplicate_key_rate = duplicate_key_rate
+        self.unique_row_rate = unique_row_rate
+        self.rng = np.random.default_rng(seed)
+
+    def key_names(self):
+        return [f"Key_{i}" for i in range(1, self.key_columns + 1)]
+
+    def build_source(self):
+        row_ids = np.arange(self.rows)
+        data = {}
+        if self.key_columns == 1:
+            # A single key with key_cardinality values repeats every key rows / key_cardinality times
+            data['Key_1'] = row_ids if self.key_cardinality is None else row_ids % self.key_cardinality
+        else:
+            # Leading key has key_cardinality values, the remaining keys make every combination unique
+            cardinality = self.key_cardinality or LEADING_KEY_CARDINALITY
+            data['Key_1'] = row_ids % cardinality
+            for i in range(2, self.key_columns + 1):
+                data[f"Key_{i}"] = row_ids // cardinality + i
+        for i in range(1, self.columns + 1):
+            if i % 3 == 0:
+                data[f"Text_{i}"] = np.char.add("val_", self.rng.integers(0, 10000, self.rows).astype(str))
+            elif i % 3 == 1:
+                data[f"Amount_{i}"] = np.round(self.rng.random(self.rows) * 10000, 2)
+            else:
+                data[f"Count_{i}"] = self.rng.integers(0, 100000, self.rows)
+        return pd.DataFrame(data)
+
+    def build_pair(self):
+        """Returns (source, target) — target has mismatched values, dropped / added rows and source has duplicate keys"""
+        source = self.build_source()
+        target = source.copy()
+        value_columns = [col for col in source.columns if not col.startswith('Key_')]
+
+        mismatch_rows = self.rng.choice(self.rows, int(self.rows * self.mismatch_rate), replace=False)
+        if len(mismatch_rows) and value_columns:
+            mismatch_cols = self.rng.integers(0, len(value_columns), len(mismatch_rows))
+            for col_no in np.unique(mismatch_cols):
+                column = value_columns[col_no]
+                rows = mismatch_rows[mismatch_cols == col_no]
+                if pd.api.types.is_numeric_dtype(target[column]):
+                    target.loc[rows, column] = target.loc[rows, column] + 1
+                else:
+                    target.loc[rows, column] = target.loc[rows, column] + "_changed"
+
+        unique_count = int(self.rows * self.unique_row_rate)
+        if unique_count:
+            target = target.drop(index=self.rng.choice(self.rows, unique_count, replace=False))
+            extra = self.build_source().head(unique_count).copy()
+            for key in self.key_names():
+                extra[key] = extra[key] + self.rows * 10  # Keys outside the source key space
+            target = pd.concat([target, extra], ignore_index=True)
+
+        duplicate_count = int(self.rows * self.duplicate_key_rate)
+        if duplicate_count:
+            source = pd.concat([source, source.sample(duplicate_count, random_state=1)], ignore_index=True)
+
+        return source, target.reset_index(drop=True)
+
+    @staticmethod
+    def write(df, path, file_format):
+        if file_format == 'csv':
+            df.to_csv(path, index=False)
+        elif file_format == 'xlsx':
+            df.to_excel(path, index=False)
+        elif file_format == 'json':
+            df.to_json(path)
+        elif file_format == 'xml':
+            df.to_xml(path, index=False, parser='etree')
+        elif file_format == 'fwf':
+            with open(path, 'w') as f:
+                f.write(df.to_string(index=False))
+        elif file_format == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            raise ValueError(f"Unsupported benchmark format: {file_format}")
+
+
+def run_case(case):
+    """Runs fetch / compare / report for one format, called in a fresh worker process"""
+    cold_start_seconds = process_uptime_seconds()  # Interpreter start and module imports of the spawned worker
+    config = {
+        'Use_Case_Id': f"benchmark_{case['format']}",
+        'source_name': f"bench_src_{case['format']}",
+        'target_name': f"bench_tgt_{case['format']}",
+        'source_type': 'file',
+        'target_type': 'file',
+        'source_detail': case['source_path'],
+        'target_detail': case['target_path'],
+        'comparison_keys': case['keys'],
+        'row_prefilter': case['row_prefilter'],
+        'compare_backend': case['compare_backend'],
+        # Reports and diff store runs of the benchmark stay in its temp dir, out of the real report folders
+        'report_dir': os.path.join(case['work_dir'], 'recon_reports'),
+        'diff_store_dir': os.path.join(case['work_dir'], 'recon_reports', 'diff_store')
+    }
+    stages = {}
+
+    def timed(stage, func):
+        start_time = time.time()
+        result = func()
+        stages[stage] = {'seconds': round(time.time() - start_time, 4), 'rss_mb': current_rss_mb(), 'peak_rss_mb': peak_rss_mb()}
+        return result
+
+    engine = timed('fetch', lambda: ReconEngine(config, case['driver_config']))
+    comparison, prefiltered_rows = timed('compare', lambda: engine.compare_with_prefilter(engine.source_data, engine.target_data))
+    timed('report', lambda: ReconReportGenerator(comparison, engine.source_data, engine.target_data, config,
+                                                 prefiltered_rows=prefiltered_rows).recon_report())
+    return {
+        'format': case['format'],
+        'source_bytes': os.path.getsize(case['source_path']),
+        'target_bytes': os.path.getsize(case['target_path']),
+        'source_rows': len(engine.source_data),
+        'target_rows': len(engine.target_data),
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+        'cold_start_seconds': cold_start_seconds,
+        'driver_imports': dict(IMPORT_TIMES),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(generator, formats, output_path, driver_config="resources/Recon_Driver_Config.xlsx", row_prefilter='Y',
+                  compare_backend='pandas'):
+    source, target = generator.build_pair()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="recon_bench_") as work_dir:
+        # spawn + one task per child, so every case starts from a clean interpreter and gets its own peak RSS
+        context = multiprocessing.get_context('spawn')
+        for file_format in formats:
+            case = {
+                'format': file_format,
+                'source_path': os.path.join(work_dir, f"source.{file_format}"),
+                'target_path': os.path.join(work_dir, f"target.{file_format}"),
+                'keys': generator.key_names(),
+                'driver_config': driver_config,
+                'row_prefilter': row_prefilter,
+                'compare_backend': compare_backend,
+                'work_dir': work_dir
+            }
+            SyntheticDataGenerator.write(source, case['source_path'], file_format)
+            SyntheticDataGenerator.write(target, case['target_path'], file_format)
+            logger.info(f"Benchmarking {file_format} ( {len(source)} source / {len(target)} target rows )...")
+            try:
+                with context.Pool(1, maxtasksperchild=1) as pool:
+                    results.append(pool.apply(run_case, (case,)))
+            except Exception as e:
+                logger.error(f"Benchmark failed for {file_format}: {e}")
+                results.append({'format': file_format, 'error': str(e)})
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'parameters': {key: value for key, value in vars(generator).items() if key != 'rng'},
+        'compare_backend': compare_backend,
+        'results': results
+    }
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    logger.info(f"Benchmark results saved at: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks fetch / compare / report stages on synthetic data")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--key-columns", type=int, default=1)
+    parser.add_argument("--key-cardinality", type=int, default=None, help="Distinct values of the ( leading ) key column")
+    parser.add_argument("--mismatch-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-key-rate", type=float, default=0.0)
+    parser.add_argument("--unique-row-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--formats", default=",".join(FILE_FORMATS), help="Comma separated formats to benchmark")
+    parser.add_argument("--row-prefilter", default='Y', help="Y / N, row fingerprint pre-filter before compare")
+    parser.add_argument("--compare-backend", default='pandas', help="pandas / polars")
+    parser.add_argument("--output", default=None, help="Results JSON path")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(BENCHMARK_DIR, f"benchmark_{datetime.datetime.now().strftime('%Y-%m-%d_%H_%M_%S')}.json")
+    run_benchmark(
+        SyntheticDataGenerator(args.rows, args.columns, args.key_columns, args.key_cardinality, args.mismatch_rate,
+                               args.duplicate_key_rate, args.unique_row_rate, args.seed),
+        [file_format.strip().lower() for file_format in args.formats.split(',') if file_format.strip()],
+        output, row_prefilter=args.row_prefilter, compare_backend=args.compare_backend
+    )
@@ -1,28 +1,208 @@
-import datacompy
-import pandas as pd
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from checksum_precheck import ChecksumPrecheck, ReconciledComparison
+from compare_backend import get_compare_backend
+from config_loader import ConfigLoader
 from data_fetcher import DataFetcher
+from duplicate_profile import DuplicateKeyProfiler
+from incremental_recon import IncrementalReconState, IncrementalComparison, KEY_HASH, STATE_DIR
+from db_connector import DBConnector
+from db_pool import POOL_MAX_SIZE
+from partitioned_recon import HashPartitioner, PartitionedComparison
+from pushdown_recon import PushdownComparison, PushdownQueryBuilder, PushdownRecon
+from recon_metrics import ReconMetrics
 from recon_reporter import ReconReportGenerator
+from row_fingerprint import RowFingerprintFilter
+from sample_recon import KeyHashSampler
+from streaming_recon import OutOfOrderError, SortedMergeJoin
 from logger_config import logger
 
 """ This Class contains logic for recon — makes debugging simpler and will evolve over time, we can other pre recon logic / method when-ever required."""
 
 class ReconEngine:
 
-    def __init__(self, config,config_path):
+    def __init__(self, config,config_path, metrics=None):
         self.config = config
         self.config_path = config_path
-        self.source_data = DataFetcher.fetch_data(self.config, is_source=True)
-        if self.source_data is None:
-            raise DataLoadError("Source data could not be loaded. Please check the source configuration.")
-        self.target_data = DataFetcher.fetch_data(self.config, is_source=False)
-        if self.target_data is None:
-            raise DataLoadError("Target data could not be loaded. Please check the target configuration.")
+        self.config = self.projected_config(config)
+        self.metrics = metrics if metrics is not None else ReconMetrics(config)
+        self.source_data = None
+        self.target_data = None
+        self.precheck = None
+        self.duplicate_profiles = None
+        self.unique_keys = None  # Comparison keys unique on both sides after the dedupe policy was applied
+        self.sampler = KeyHashSampler.from_config(config) if config.get('recon_mode') == 'sample' else None
+        self.compare_backend = get_compare_backend(config.get('compare_backend'))
+        if self.config.get('recon_mode') == 'partitioned':
+            logger.info("Partitioned recon mode, source and target data will be streamed during recon.")
+            return
+        if self.config.get('recon_mode') == 'streaming':
+            logger.info("Streaming recon mode, source and target are merged as key ordered chunk streams during recon.")
+            return
+        if self.config.get('recon_mode') == 'pushdown':
+            if PushdownRecon.is_eligible(self.config):
+                logger.info("Push-down recon mode, source and target are compared inside the database.")
+                return
+            logger.warning("Push-down recon needs source and target queries on the same database, running full recon.")
+
+        # Incremental recon keeps row hashes over all columns, it always needs the full data
+        if (ChecksumPrecheck.enabled(self.config) and ChecksumPrecheck.sql_eligible(self.config)
+                and self.config.get('recon_mode') != 'incremental'):
+            self.precheck = self.sql_checksum_precheck()
+            if self.precheck is not None and not self.precheck['divergent_columns']:
+                return
+
+        self.load_data()
+
+    def projected_config(self, config):
+        """Config copy resolving 'auto' Source / Target Columns to the columns the recon compares — the comparison keys,
+        mapped columns and columns present on both sides — read from the header / schema / query columns of each side"""
+        auto_sides = [side for side in ('source', 'target') if str(config.get(f"{side}_columns") or '').strip().lower() == 'auto']
+        if not auto_sides:
+            return config
+        config = dict(config, **{f"{side}_columns": '' for side in auto_sides})
+        schemas = {side: DataFetcher.source_columns(config, side) for side in ('source', 'target')}
+        if None in schemas.values():
+            logger.warning("Source or target columns can not be read up front, 'auto' columns load all columns.")
+            return config
+        mapping_dict = self.load_col_mapping() or {}
+        mapping_dict = {source_col: target_col for source_col, target_col in mapping_dict.items()
+                        if source_col in schemas['source'] and target_col in schemas['target']}
+        compared_names = ({str(column).lower() for column in schemas['target']} &
+                          {str(mapping_dict.get(column, column)).lower() for column in schemas['source']})
+        for side in auto_sides:
+            rename = mapping_dict if side == 'source' else {}
+            columns = [column for column in schemas[side] if str(rename.get(column, column)).lower() in compared_names]
+            config[f"{side}_columns"] = ", ".join(str(column) for column in columns)
+            logger.info(f"Loading {len(columns)} of {len(schemas[side])} {side} columns ( 'auto', compared columns only ).")
+        return config
+
+    def load_data(self):
+        fetch_config = self.config
+        if self.precheck is not None and self.precheck['narrowable']:
+            # Only keys and columns whose checksums differ are fetched
+            fetch_config = self.narrowed_config(self.precheck)
+        sampled_sides = set()
+        if self.sampler is not None:
+            fetch_config, sampled_sides = self.sample_config(fetch_config)
+        self.source_data, self.target_data = self.fetch_source_and_target(fetch_config)
 
         # Checking if column mapping sheet exist, and apply
-        mapping_dict = self.check_and_apply_col_mapping()
-        if mapping_dict:
-            self.source_data.rename(columns=mapping_dict, inplace=True)
-            logger.info("Source DataFrame columns renamed using mapping.")
+        with self.metrics.stage('column_mapping') as stage:
+            mapping_dict = self.check_and_apply_col_mapping()
+            if mapping_dict:
+                self.source_data.rename(columns=mapping_dict, inplace=True)
+                logger.info("Source DataFrame columns renamed using mapping.")
+            stage['mapped_columns'] = len(mapping_dict or {})
+
+        if self.sampler is not None:
+            with self.metrics.stage('sample') as stage:
+                if 'source' not in sampled_sides:
+                    self.source_data = self.sample_data(self.source_data, 'source')
+                if 'target' not in sampled_sides:
+                    self.target_data = self.sample_data(self.target_data, 'target')
+                stage['rows'] = len(self.source_data) + len(self.target_data)
+
+    def sample_config(self, config):
+        """Config copy pushing the key hash sampling predicate into database queries, returns (config, sampled sides).
+        Key columns are looked up in the query columns, source keys through the column mapping sheet.
+
+        The key text the database builds ( e.g. '1.0' for a REAL key ) can differ from the text built client side, so
+        the predicate is pushed down only when both sides are queries on the same database type."""
+        config = dict(config)
+        sampled_sides = set()
+        mapping_dict = None
+        side_types = {(str(config.get(f"{side}_type", '')).lower(), str(config.get(f"{side}_db_type", '')).lower())
+                      for side in ('source', 'target')}
+        if len(side_types) != 1 or next(iter(side_types))[0] != 'database':
+            logger.info("Source and target are not queries on the same database type, both sides are sampled after the fetch.")
+            return config, sampled_sides
+        for side in ('source', 'target'):
+            if str(config.get(f"{side}_type", '')).lower() != 'database':
+                continue
+            if mapping_dict is None:
+                mapping_dict = self.load_col_mapping() or {}
+            key_columns = self.query_key_columns(config, side, mapping_dict)
+            if key_columns is None:
+                logger.warning(f"{side.capitalize()} rows are sampled after the fetch.")
+                continue
+            config[f"{side}_sample_keys"] = ", ".join(str(column) for column in key_columns)
+            sampled_sides.add(side)
+        return config, sampled_sides
+
+    def query_key_columns(self, config, side, mapping_dict):
+        """Comparison key columns as named in the side's query ( source keys through the column mapping ), None when the
+        query columns can not be read or a key is missing"""
+        try:
+            with open(config[f"{side}_query_file"], 'r') as f:
+                query = PushdownQueryBuilder.strip_query(f.read())
+            with DataFetcher.pooled_connection(config, side) as conn:
+                columns = DBConnector.query_columns(conn, query)
+        except Exception as e:
+            logger.warning(f"Could not read {side} query columns: {e}")
+            return None
+        by_name = {str(mapping_dict.get(col, col) if side == 'source' else col).lower(): col for col in columns}
+        key_columns = [by_name.get(key.lower()) for key in config['comparison_keys']]
+        if None in key_columns:
+            logger.warning(f"Comparison keys not found in {side} query columns.")
+            return None
+        return key_columns
+
+    def sample_data(self, data, side):
+        """Key hash sample of fetched data ( file / cloud sources, or queries the predicate could not be pushed into )"""
+        by_name = {str(column).lower(): column for column in data.columns}
+        key_columns = [by_name.get(key.lower()) for key in self.config['comparison_keys']]
+        if None in key_columns:
+            raise DataLoadError(f"Comparison keys {self.config['comparison_keys']} not found in {side} data, can not sample.")
+        sample = self.sampler.sample_frame(data, key_columns)
+        logger.info(f"Sampled {len(sample)} of {len(data)} {side} rows ( {self.sampler.fraction * 100:g} % of keys ).")
+        return sample
+
+    def fetch_source_and_target(self, config=None):
+        """Fetches source and target concurrently ( both are I/O bound ), first failure is raised straight away.
+
+        A fetch that is still running when the other side fails can not be interrupted, it is abandoned and its
+        result discarded instead of being waited for.
+        """
+        config = self.config if config is None else config
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recon_fetch")
+        futures = {executor.submit(self.timed_fetch, is_source, config): is_source for is_source in (True, False)}
+        fetched = {}
+        try:
+            for future in as_completed(futures):
+                is_source = futures[future]
+                data = future.result()
+                if data is None:
+                    system_type = "Source" if is_source else "Target"
+                    raise DataLoadError(f"{system_type} data could not be loaded. Please check the {system_type.lower()} configuration.")
+                fetched[is_source] = data
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if not all(future.done() for future in futures):
+                logger.warning("Abandoning in-flight fetch of the other side after fetch failure.")
+            raise
+        executor.shutdown(wait=True)
+        return fetched[True], fetched[False]
+
+    def timed_fetch(self, is_source, config):
+        system_type = "source" if is_source else "target"
+        start_time = time.time()
+        with self.metrics.stage(f"fetch_{system_type}", bytes=self.bytes_to_read(system_type)) as stage:
+            data = self.metrics.profiled(DataFetcher.fetch_data, config, is_source)
+            stage['rows'] = len(data) if data is not None else 0
+        fetch_time_ms = round((time.time() - start_time) * 1000, 2)
+        logger.info(f"Fetched {stage['rows']} {system_type} rows in {fetch_time_ms} ms.")
+        return data
+
+    def bytes_to_read(self, system_type):
+        """Size of the input file for file sources, None where it is not known up front ( database / cloud )"""
+        file_path = self.config.get(f"{system_type}_detail")
+        if str(self.config.get(f"{system_type}_type", '')).lower() == 'file' and file_path and os.path.isfile(file_path):
+            return os.path.getsize(file_path)
+        return None
 
     # def check_and_apply_col_mapping(self):
     #     mapping = self.config.get('Use_Case_Id')
@@ -49,33 +229,39 @@ class ReconEngine:
     #     except Exception as e:
     #         logger.error(f"Error loading column mappings: {e}")
     #         return None
-    def check_and_apply_col_mapping(self):
+    def load_col_mapping(self):
+        """Reads the use case mapping sheet as {source column: target column}, None when there is no sheet"""
         mapping = self.config.get('Use_Case_Id')
         try:
             logger.info(f"Checking for '{mapping}' mapping sheet in config file: {self.config_path}")
-            xl = pd.ExcelFile(self.config_path)
+            mapping_dict = ConfigLoader.load(self.config_path).mapping(mapping)
 
-            if mapping not in xl.sheet_names:
+            if mapping_dict is None:
                 logger.info(f"'{mapping}' sheet not found. No column mapping will be applied.")
                 return None
 
-            logger.info(f"Found '{mapping}' sheet. Loading mapping data...")
-            mapping_df = xl.parse(mapping).fillna('')
+            logger.info(f"Found '{mapping}' sheet with {len(mapping_dict)} column mappings.")
+            return mapping_dict
 
-            required_cols = {'Source_Column', 'Target_Column'}
-            if not required_cols.issubset(mapping_df.columns):
-                raise ValueError(f"The '{mapping}' sheet must contain 'Source_Column' and 'Target_Column' columns.")
+        except Exception as e:
+            logger.error(f"Error loading column mappings: {e}")
+            return None
+
+    def check_and_apply_col_mapping(self, source_columns=None, target_columns=None):
+        source_columns = self.source_data.columns if source_columns is None else source_columns
+        target_columns = self.target_data.columns if target_columns is None else target_columns
+        try:
+            mapping_dict = self.load_col_mapping()
+            if mapping_dict is None:
+                return None
 
             # Validate each mapping entry
             valid_mappings = {}
-            for _, row in mapping_df.iterrows():
-                source_col = row['Source_Column']
-                target_col = row['Target_Column']
-
-                if source_col not in self.source_data.columns:
+            for source_col, target_col in mapping_dict.items():
+                if source_col not in source_columns:
                     logger.warning(f"Source column '{source_col}' not found in source DataFrame. Skipping mapping.")
                     continue
-                if target_col not in self.target_data.columns:
+                if target_col not in target_columns:
                     logger.warning(f"Target column '{target_col}' not found in target DataFrame. Skipping mapping.")
                     continue
 
@@ -92,23 +278,423 @@ class ReconEngine:
             logger.error(f"Error loading OR applying column mappings: {e}")
             return None
 
+    def compare(self, source_data, target_data):
+        return self.compare_backend.compare(source_data, target_data, self.config['comparison_keys'])
+
+    def compare_with_prefilter(self, source_data, target_data):
+        """Drops rows identical on both sides ( row fingerprint ) before datacompy, returns (comparison, dropped rows)"""
+        if str(self.config.get('row_prefilter', 'Y')).strip().lower() not in ('y', 'yes', 'true', '1'):
+            return self.compare(source_data, target_data), 0
+        source_rest, target_rest, matched_count = RowFingerprintFilter.split(source_data, target_data, self.config['comparison_keys'])
+        comparison = self.compare(source_rest, target_rest)
+        RowFingerprintFilter.restore_column_stats(comparison, matched_count)
+        return comparison, matched_count
+
     def run_recon(self):
+        if self.config.get('recon_mode') == 'partitioned':
+            self.run_partitioned_recon()
+            return
+        if self.config.get('recon_mode') == 'streaming':
+            self.run_streaming_recon()
+            return
+
+        if self.precheck is not None and not self.precheck['divergent_columns']:
+            self.report_reconciled(self.precheck)
+            return
+
+        if self.config.get('recon_mode') == 'pushdown' and self.source_data is None:
+            if self.run_pushdown_recon():
+                return
+            self.load_data()
+
         if self.source_data is None or self.target_data is None:
             logger.error("## Data could not be loaded, please check configurations. ##")
             return
 
-        comparison = datacompy.Compare(
-            self.source_data, self.target_data,
-            join_columns=self.config['comparison_keys']
-        )
+        self.profile_duplicate_keys()
+
+        if self.config.get('recon_mode') == 'incremental':
+            self.run_incremental_recon()
+            return
+
+        if self.precheck is None and ChecksumPrecheck.enabled(self.config):
+            self.precheck = self.frame_checksum_precheck()
+            if self.precheck is not None and not self.precheck['divergent_columns']:
+                self.report_reconciled(self.precheck)
+                return
+
+        source_data, target_data = self.source_data, self.target_data
+        if self.precheck is not None and self.precheck['narrowable']:
+            source_data, target_data = self.narrowed_frames(self.precheck)
+
+        with self.metrics.stage('compare', rows=len(source_data) + len(target_data)) as stage:
+            comparison, prefiltered_rows = self.compare_with_prefilter(source_data, target_data)
+            stage['prefiltered_rows'] = prefiltered_rows
 
         logger.info("Reconciliation completed. Generating report...")
 
         # Generate and save the HTML report
-        report_generator = ReconReportGenerator(comparison, self.source_data, self.target_data, self.config)
+        summary, sample_stats = None, None
+        if self.precheck is not None and self.precheck['narrowable']:
+            summary = ReconReportGenerator(comparison, source_data, target_data, self.config,
+                                           prefiltered_rows=prefiltered_rows).generate_summary_stats()
+            summary = ChecksumPrecheck.apply_to_summary(summary, comparison, self.precheck)
+        if self.sampler is not None:
+            if summary is None:
+                summary = ReconReportGenerator(comparison, source_data, target_data, self.config,
+                                               prefiltered_rows=prefiltered_rows).generate_summary_stats()
+            sample_stats = self.sampler.statistics(summary, comparison.column_stats, self.config['comparison_keys'])
+        report_generator = ReconReportGenerator(comparison, self.source_data, self.target_data, self.config,
+                                                summary=summary, duplicate_profiles=self.duplicate_profiles,
+                                                prefiltered_rows=prefiltered_rows, metrics=self.metrics,
+                                                sample_stats=sample_stats)
         report_generator.recon_report()
 
         logger.info("Report generation completed successfully.")
 
+    def profile_duplicate_keys(self):
+        """Pre-compare stage hashing the comparison keys of both sides — duplicate / null key figures go to the report
+        and the configured dedupe policy is applied to the fetched frames"""
+        keys = self.config['comparison_keys']
+        with self.metrics.stage('duplicate_profile', rows=len(self.source_data) + len(self.target_data)) as stage:
+            self.duplicate_profiles = DuplicateKeyProfiler.profile_pair(
+                self.source_data, self.target_data, keys, DuplicateKeyProfiler.top_n(self.config))
+            DuplicateKeyProfiler.log_profiles(self.duplicate_profiles)
+            stage['duplicate_keys'] = sum(profile['duplicate_keys'] for profile in self.duplicate_profiles.values()
+                                          if profile is not None)
+            policy = DuplicateKeyProfiler.dedupe_policy(self.config)
+            if stage['duplicate_keys'] and policy != 'none':
+                self.source_data = DuplicateKeyProfiler.dedupe(self.source_data, keys, policy, 'source')
+                self.target_data = DuplicateKeyProfiler.dedupe(self.target_data, keys, policy, 'target')
+            self.unique_keys = (None not in self.duplicate_profiles.values()
+                                and (not stage['duplicate_keys'] or policy != 'none'))
+
+    def sql_checksum_precheck(self):
+        """Checksums both database queries in SQL before anything is fetched, returns the pre-check result or None
+        when the checksums could not be computed ( recon then runs without pre-check )"""
+        db_type = self.config['source_db_type'].lower()
+        queries = {}
+        for side in ('source', 'target'):
+            with open(self.config[f"{side}_query_file"], 'r') as f:
+                queries[side] = PushdownQueryBuilder.strip_query(f.read())
+        try:
+            with self.metrics.stage('checksum_precheck', method='sql') as stage:
+                # One connection at a time, source and target may share a pool of size 1
+                with DataFetcher.pooled_connection(self.config, 'source') as conn:
+                    source_columns = DBConnector.query_columns(conn, queries['source'])
+                with DataFetcher.pooled_connection(self.config, 'target') as conn:
+                    target_columns = DBConnector.query_columns(conn, queries['target'])
+                mapping_dict = self.check_and_apply_col_mapping(source_columns, target_columns)
+                keys, columns, source_only, target_only = PushdownRecon.match_columns(
+                    source_columns, target_columns, self.config['comparison_keys'], mapping_dict)
+                if keys is None:
+                    logger.warning("Comparison keys missing in source or target query, skipping checksum pre-check.")
+                    return None
+                profiles = {}
+                for side, side_index in (('source', 1), ('target', 2)):
+                    with DataFetcher.pooled_connection(self.config, side) as conn:
+                        profiles[side] = ChecksumPrecheck.sql_profile(
+                            conn, db_type, queries[side], [(key[0], key[side_index]) for key in keys],
+                            [(column[0], column[side_index]) for column in columns])
+                result = ChecksumPrecheck.compare(profiles['source'], profiles['target'], keys, columns, source_only, target_only)
+                stage['rows'] = profiles['source']['row_count'] + profiles['target']['row_count']
+                stage['divergent_columns'] = len(result['divergent_columns'])
+            return result
+        except Exception as e:
+            logger.warning(f"Checksum pre-check failed, running recon without it: {e}")
+            return None
+
+    def frame_checksum_precheck(self):
+        """Checksums the fetched frames, returns the pre-check result or None when not possible"""
+        try:
+            with self.metrics.stage('checksum_precheck', method='pandas',
+                                    rows=len(self.source_data) + len(self.target_data)) as stage:
+                keys, columns, source_only, target_only = PushdownRecon.match_columns(
+                    self.source_data.columns, self.target_data.columns, self.config['comparison_keys'])
+                if keys is None:
+                    logger.warning("Comparison keys missing in source or target data, skipping checksum pre-check.")
+                    return None
+                profiles = {}
+                for side, data, side_index in (('source', self.source_data, 1), ('target', self.target_data, 2)):
+                    profiles[side] = ChecksumPrecheck.frame_profile(
+                        data, [(key[0], key[side_index]) for key in keys], [(column[0], column[side_index]) for column in columns])
+                result = ChecksumPrecheck.compare(profiles['source'], profiles['target'], keys, columns, source_only, target_only)
+                stage['divergent_columns'] = len(result['divergent_columns'])
+            return result
+        except Exception as e:
+            logger.warning(f"Checksum pre-check failed, running full compare: {e}")
+            return None
+
+    def narrowed_config(self, result):
+        """Config copy projecting both queries / files to the keys and divergent columns"""
+        config = dict(self.config)
+        divergent = set(result['divergent_columns'])
+        for side, side_index in (('source', 1), ('target', 2)):
+            columns = [key[side_index] for key in result['keys']]
+            columns += [column[side_index] for column in result['columns'] if column[0] in divergent]
+            config[f"{side}_columns"] = ", ".join(str(column) for column in columns)
+        return config
+
+    def narrowed_frames(self, result):
+        """Keys and divergent columns of the fetched frames ( no-op when fetched narrowed already )"""
+        divergent = set(result['divergent_columns'])
+        frames = []
+        for data, side_index in ((self.source_data, 1), (self.target_data, 2)):
+            by_name = {str(column).lower(): column for column in data.columns}
+            names = [key[0] for key in result['keys']] + [column[0] for column in result['columns'] if column[0] in divergent]
+            frames.append(data[[by_name[name] for name in names]])
+        return frames[0], frames[1]
+
+    def report_reconciled(self, result):
+        """Report of datasets the checksum pre-check proved equal on all compared columns, no compare ran"""
+        comparison = ReconciledComparison(result)
+        summary = comparison.summary()
+        sample_stats = None
+        if self.sampler is not None:
+            sample_stats = self.sampler.statistics(summary, comparison.column_stats, self.config['comparison_keys'])
+        logger.info("Reconciliation completed by checksum pre-check. Generating report...")
+        ReconReportGenerator(comparison, None, None, self.config, summary=summary,
+                             duplicate_flags={"duplicate_flag_src": 'No', "duplicate_flag_tgt": 'No'},
+                             metrics=self.metrics, sample_stats=sample_stats).recon_report()
+        logger.info("Report generation completed successfully.")
+
+    def run_partitioned_recon(self):
+        """Out-of-core recon — both sides are spilled to hash buckets on comparison keys and compared bucket by bucket,
+        so peak memory is bounded by bucket size rather than dataset size."""
+        partition_count = int(float(self.config.get('partition_count') or 16))
+        chunk_size = int(float(self.config.get('chunk_size') or 100000))
+        partitioner = HashPartitioner(self.config['comparison_keys'], partition_count, self.config.get('partition_dir') or None)
+
+        try:
+            source_chunks, target_chunks = self.chunk_streams(self.config, chunk_size)
+
+            # Chunks are fetched lazily while spilling, so the spill stages include the fetch of each side
+            with self.metrics.stage('fetch_spill_source', bytes=self.bytes_to_read('source')) as stage:
+                stage['rows'] = self.metrics.profiled(partitioner.spill, source_chunks, 'source')
+            with self.metrics.stage('fetch_spill_target', bytes=self.bytes_to_read('target')) as stage:
+                stage['rows'] = self.metrics.profiled(partitioner.spill, target_chunks, 'target')
+
+            bucket_pairs = ((partitioner.load_bucket('source', bucket), partitioner.load_bucket('target', bucket))
+                            for bucket in range(partition_count))
+            with self.metrics.stage('compare', partitions=partition_count) as stage:
+                comparison, summaries, duplicate_profiles = self.compare_batches(bucket_pairs, stage, "Bucket", partition_count)
+        finally:
+            partitioner.cleanup()
+
+        logger.info("Partitioned reconciliation completed. Generating report...")
+        self.report_batches(comparison, summaries, duplicate_profiles)
+
+    def run_streaming_recon(self):
+        """Sorted merge recon — both sides are read as chunk streams ordered by the comparison keys ( database queries
+        get an ORDER BY, files must be sorted already ) and compared key range by key range, memory holds a few chunks
+        per side plus the differences. Out of order input is reported and the recon runs partitioned instead."""
+        chunk_size = int(float(self.config.get('chunk_size') or 100000))
+        try:
+            source_chunks, target_chunks = self.chunk_streams(self.ordered_config(), chunk_size)
+            merge_join = SortedMergeJoin(source_chunks, target_chunks, self.config['comparison_keys'], chunk_size)
+            # Chunks are fetched while merging, so the compare stage includes the fetch of both sides
+            with self.metrics.stage('compare', method='sorted_merge') as stage:
+                comparison, summaries, duplicate_profiles = self.compare_batches(merge_join.batches(), stage, "Key range")
+        except (OutOfOrderError, TypeError) as e:
+            # TypeError: keys of the two sides can not be ordered against each other ( e.g. text vs numbers )
+            logger.error(f"Streaming recon not possible, {e}. Running partitioned recon instead.")
+            self.metrics.record('out_of_order', 0, side=getattr(e, 'side', None), row=getattr(e, 'row', None))
+            self.run_partitioned_recon()
+            return
+
+        logger.info(f"Streaming reconciliation completed ( {merge_join.rows_read()[0]} source / "
+                    f"{merge_join.rows_read()[1]} target rows ). Generating report...")
+        self.report_batches(comparison, summaries, duplicate_profiles)
+
+    def ordered_config(self):
+        """Config copy adding an ORDER BY on the comparison keys ( NULLs first ) to database queries"""
+        config = dict(self.config)
+        mapping_dict = None
+        for side in ('source', 'target'):
+            if str(config.get(f"{side}_type", '')).lower() != 'database':
+                logger.info(f"{side.capitalize()} data is streamed as is, it must be ordered by the comparison keys ( NULLs first ).")
+                continue
+            if mapping_dict is None:
+                mapping_dict = self.load_col_mapping() or {}
+            key_columns = self.query_key_columns(config, side, mapping_dict)
+            if key_columns is None:
+                raise DataLoadError(f"Comparison keys not found in the {side} query columns, can not order the {side} query.")
+            config[f"{side}_order_by"] = ", ".join(str(column) for column in key_columns)
+        return config
+
+    def chunk_streams(self, config, chunk_size):
+        """(source chunks, target chunks) of the chunked fetch, source chunks renamed by the column mapping"""
+        # Both streams keep their connection open while peeked, a pool of one connection would block the second side
+        if int(float(config.get('db_pool_size') or POOL_MAX_SIZE)) == 1:
+            config = dict(config, db_pool_size='0')
+        source_chunks, source_head = self.peek_chunks(DataFetcher.fetch_data_chunks(config, True, chunk_size))
+        if source_head is None:
+            raise DataLoadError("Source data could not be loaded. Please check the source configuration.")
+        target_chunks, target_head = self.peek_chunks(DataFetcher.fetch_data_chunks(config, False, chunk_size))
+        if target_head is None:
+            raise DataLoadError("Target data could not be loaded. Please check the target configuration.")
+
+        with self.metrics.stage('column_mapping') as stage:
+            mapping_dict = self.check_and_apply_col_mapping(source_head.columns, target_head.columns)
+            if mapping_dict:
+                source_chunks = (chunk.rename(columns=mapping_dict) for chunk in source_chunks)
+                logger.info("Source chunks columns renamed using mapping.")
+            stage['mapped_columns'] = len(mapping_dict or {})
+        return source_chunks, target_chunks
+
+    def compare_batches(self, batch_pairs, stage, batch_name, batch_count=None):
+        """Compares (source, target) batches holding disjoint key sets ( hash buckets or key ranges ), returns the
+        merged comparison with the batch summaries and duplicate key profiles. Diffs of every batch stay in memory
+        until the report is written, report writers and the diff store take the whole merged comparison"""
+        comparison = PartitionedComparison()
+        summaries, duplicate_profiles = [], []
+        stage['rows'] = 0
+        for batch_no, (source_batch, target_batch) in enumerate(batch_pairs, start=1):
+            if source_batch.empty and target_batch.empty:
+                continue
+
+            batch_comparison, prefiltered_rows = self.compare_with_prefilter(source_batch, target_batch)
+            batch_report = ReconReportGenerator(batch_comparison, source_batch, target_batch, self.config,
+                                                prefiltered_rows=prefiltered_rows)
+            summaries.append(batch_report.generate_summary_stats())
+            batch_report.detect_duplicates()
+            duplicate_profiles.append(batch_report.duplicate_profiles)
+            comparison.add_bucket(batch_comparison)
+            stage['rows'] += len(source_batch) + len(target_batch)
+            batch_label = f"{batch_no}/{batch_count}" if batch_count else batch_no
+            logger.info(f"{batch_name} {batch_label} compared: {len(source_batch)} source rows, {len(target_batch)} target rows.")
+        comparison.finalize()
+        if not summaries:
+            raise DataLoadError("Source and target data are both empty, nothing to reconcile.")
+        return comparison, summaries, duplicate_profiles
+
+    def report_batches(self, comparison, summaries, duplicate_profiles):
+        summary = ReconReportGenerator.merge_summary_stats(summaries, comparison.column_stats)
+        self.duplicate_profiles = DuplicateKeyProfiler.merge(duplicate_profiles, DuplicateKeyProfiler.top_n(self.config))
+        DuplicateKeyProfiler.log_profiles(self.duplicate_profiles)
+        report_generator = ReconReportGenerator(comparison, None, None, self.config,
+                                                summary=summary,
+                                                duplicate_profiles=self.duplicate_profiles,
+                                                metrics=self.metrics)
+        report_generator.recon_report()
+
+        logger.info("Report generation completed successfully.")
+
+    def run_incremental_recon(self):
+        """Delta recon — only keys whose rows changed on either side since the last run are compared, results of
+        unchanged keys are carried forward so the report still covers the full data set."""
+        keys = self.config['comparison_keys']
+        state = IncrementalReconState(self.config['Use_Case_Id'], keys, self.config.get('state_dir') or STATE_DIR)
+
+        if not self.unique_keys:
+            logger.warning("Comparison keys are not unique, incremental recon needs unique keys. Running full recon.")
+            state.clear()
+            with self.metrics.stage('compare', rows=len(self.source_data) + len(self.target_data)):
+                comparison = self.compare(self.source_data, self.target_data)
+            ReconReportGenerator(comparison, self.source_data, self.target_data, self.config, metrics=self.metrics,
+                                 duplicate_profiles=self.duplicate_profiles).recon_report()
+            logger.info("Report generation completed successfully.")
+            return
+
+        with self.metrics.stage('row_hashes', rows=len(self.source_data) + len(self.target_data)):
+            source_hashes = state.row_hashes(self.source_data)
+            target_hashes = state.row_hashes(self.target_data)
+            signature = state.signature(self.source_data, self.target_data, keys)
+            previous_state = state.load(signature)
+
+        if previous_state is None:
+            with self.metrics.stage('compare', rows=len(self.source_data) + len(self.target_data)):
+                comparison = self.compare(self.source_data, self.target_data)
+            report_generator = ReconReportGenerator(comparison, self.source_data, self.target_data, self.config,
+                                                    metrics=self.metrics, duplicate_profiles=self.duplicate_profiles)
+        else:
+            changed_keys = state.changed_keys(previous_state['source_hashes'], source_hashes).union(
+                state.changed_keys(previous_state['target_hashes'], target_hashes))
+            logger.info(f"{len(changed_keys)} keys changed since last run, comparing only those rows.")
+
+            source_delta = self.source_data[source_hashes[KEY_HASH].isin(changed_keys).to_numpy()]
+            target_delta = self.target_data[target_hashes[KEY_HASH].isin(changed_keys).to_numpy()]
+            with self.metrics.stage('compare', rows=len(source_delta) + len(target_delta)):
+                delta_comparison = self.compare(source_delta, target_delta)
+
+            intersect_count = int(source_hashes[KEY_HASH].isin(target_hashes[KEY_HASH]).sum())
+            comparison = IncrementalComparison(delta_comparison, previous_state, changed_keys, intersect_count)
+
+            # Column level figures come from the delta compare ( same columns ), row level ones from carried results
+            summary = ReconReportGenerator(delta_comparison, self.source_data, self.target_data, self.config).generate_summary_stats()
+            summary.update({
+                "common_rows_count": intersect_count,
+                "rows_in_src_only": len(comparison.df1_unq_rows),
+                "rows_in_tgt_only": len(comparison.df2_unq_rows),
+                "rows_having_mismatch": len(comparison.all_mismatch()),
+                "row_having_no_mismatch": intersect_count - len(comparison.all_mismatch()),
+                "cols_having_no_mismatch": sum(1 for col in comparison.column_stats if col['all_match']),
+                "cols_having_mismatch": sum(1 for col in comparison.column_stats if not col['all_match'])
+            })
+            report_generator = ReconReportGenerator(comparison, self.source_data, self.target_data, self.config,
+                                                    summary=summary, duplicate_profiles=self.duplicate_profiles,
+                                                    metrics=self.metrics)
+
+        logger.info("Reconciliation completed. Generating report...")
+        report_generator.recon_report()
+        state.save(signature, source_hashes, target_hashes, comparison)
+
+        logger.info("Report generation completed successfully.")
+
+    def run_pushdown_recon(self):
+        """Compares source and target queries of the same database with a SQL FULL OUTER JOIN on comparison keys,
+        only aggregate counts and the mismatching / side only rows are fetched. Returns False when the recon has to
+        run client side instead ( duplicate or missing keys ), nothing is reported then."""
+        with open(self.config['source_query_file'], 'r') as f:
+            source_query = PushdownQueryBuilder.strip_query(f.read())
+        with open(self.config['target_query_file'], 'r') as f:
+            target_query = PushdownQueryBuilder.strip_query(f.read())
+        db_type = self.config['source_db_type'].lower()
+        fetch_size = int(float(self.config.get('db_fetch_size') or 50000))
+
+        with DataFetcher.pooled_connection(self.config, 'source') as conn:
+            if conn is None:
+                raise DataLoadError(f"Could not connect to {db_type} database for push-down recon")
+            with self.metrics.stage('column_mapping') as stage:
+                source_columns = DBConnector.query_columns(conn, source_query)
+                target_columns = DBConnector.query_columns(conn, target_query)
+                mapping_dict = self.check_and_apply_col_mapping(source_columns, target_columns)
+                stage['mapped_columns'] = len(mapping_dict or {})
+            keys, columns, source_only, target_only = PushdownRecon.match_columns(
+                source_columns, target_columns, self.config['comparison_keys'], mapping_dict)
+            if keys is None:
+                logger.warning("Comparison keys missing in source or target query, running full recon.")
+                return False
+            builder = PushdownQueryBuilder(db_type, source_query, target_query, keys, columns, source_only, target_only)
+
+            # A join on non unique keys multiplies rows, datacompy's duplicate handling needs the client side recon
+            for side in ('source', 'target'):
+                if int(DBConnector.fetch_row(conn, builder.duplicate_keys_query(side))['duplicate_keys'] or 0):
+                    logger.warning(f"Comparison keys are not unique in {side}, push-down recon needs unique keys. Running full recon.")
+                    return False
+
+            with self.metrics.stage('pushdown_summary'):
+                summary_row = DBConnector.fetch_row(conn, builder.summary_query())
+            with self.metrics.stage('pushdown_diff') as stage:
+                comparison = PushdownComparison(builder, summary_row,
+                                                DBConnector.stream_rows(conn, db_type, builder.diff_query(), fetch_size))
+                stage['rows'] = comparison.diff_row_count
+        logger.info(f"Push-down recon fetched {comparison.diff_row_count} mismatching / side only rows.")
+
+        logger.info("Reconciliation completed. Generating report...")
+        ReconReportGenerator(comparison, None, None, self.config, summary=comparison.summary(),
+                             duplicate_flags={"duplicate_flag_src": 'No', "duplicate_flag_tgt": 'No'},
+                             metrics=self.metrics).recon_report()
+        logger.info("Report generation completed successfully.")
+        return True
+
+    @staticmethod
+    def peek_chunks(chunks):
+        """Returns (chunk iterator, first chunk) so column names are known before the stream is consumed"""
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return iter(()), None
+        return itertools.chain([first_chunk], chunks), first_chunk
+
 class DataLoadError(Exception):
     pass
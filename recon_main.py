@@ -1,59 +1,121 @@
+import argparse
+
 import pandas as pd
 from config_loader import ConfigLoader
-from recon_engine import ReconEngine, DataLoadError
-import time
+from recon_scheduler import ReconScheduler
 from logger_config import logger
 
 """ This module contains logic for recon orchestration ( looping ) for multiple data sets ( source and target systems ) """
 
+# (config key, driver config column, default) — required columns have no default, optional ones fall back to the
+# default when missing or blank
+CONFIG_COLUMNS = [
+    ('Use_Case_Id', 'Use Case', None),
+    ('source_name', 'Source Name', None),
+    ('source_type', 'Source Type', None),
+    ('source_detail', 'Source Detail', None),
+    ('source_db_type', 'Source DB Type', None),
+    ('source_host', 'Source Host', None),
+    ('source_port', 'Source Port', None),
+    ('source_database', 'Source Database', None),
+    ('source_user', 'Source User ID', None),
+    ('source_password', 'Source Password', None),
+    ('source_query_file', 'Source Query File', None),
+    ('target_name', 'Target Name', None),
+    ('target_type', 'Target Type', None),
+    ('target_detail', 'Target Detail', None),
+    ('target_db_type', 'Target DB Type', None),
+    ('target_host', 'Target Host', None),
+    ('target_port', 'Target Port', None),
+    ('target_database', 'Target Database', None),
+    ('target_user', 'Target User ID', None),
+    ('target_password', 'Target Password', None),
+    ('target_query_file', 'Target Query File', None),
+    ('comparison_keys', 'Comparison Keys', None),
+    ('recon_mode', 'Recon Mode', 'full'),
+    ('partition_count', 'Partition Count', '16'),
+    ('chunk_size', 'Chunk Size', '100000'),
+    ('partition_dir', 'Partition Dir', ''),
+    ('sample_percent', 'Sample Percent', '1'),
+    ('sample_confidence', 'Sample Confidence', '0.95'),
+    ('db_fetch_size', 'DB Fetch Size', '50000'),
+    ('db_pool_size', 'DB Pool Size', '4'),
+    ('db_pool_idle_seconds', 'DB Pool Idle Seconds', '300'),
+    ('io_workers', 'IO Workers', '8'),
+    ('source_columns', 'Source Columns', ''),
+    ('target_columns', 'Target Columns', ''),
+    ('source_filter', 'Source Filter', ''),
+    ('target_filter', 'Target Filter', ''),
+    ('source_partition_by', 'Source Partition By', ''),
+    ('target_partition_by', 'Target Partition By', ''),
+    ('adx_page_rows', 'ADX Page Rows', '250000'),
+    ('snapshot_cache', 'Snapshot Cache', 'N'),
+    ('cache_ttl_hours', 'Cache TTL Hours', '24'),
+    ('cache_max_mb', 'Cache Max MB', '2048'),
+    ('row_prefilter', 'Row Prefilter', 'Y'),
+    ('compare_backend', 'Compare Backend', 'pandas'),
+    ('checksum_precheck', 'Checksum Precheck', 'N'),
+    ('dedupe_policy', 'Dedupe Policy', 'none'),
+    ('duplicate_top_keys', 'Duplicate Top Keys', '10'),
+    ('diff_store_dir', 'Diff Store Dir', ''),
+    ('diff_store_port', 'Diff Store Port', '8765'),
+    ('xlsx_report', 'XLSX Report', 'Y'),
+    ('source_xml_row_path', 'Source XML Row Path', ''),
+    ('target_xml_row_path', 'Target XML Row Path', ''),
+    ('source_xml_attributes', 'Source XML Attributes', 'N'),
+    ('target_xml_attributes', 'Target XML Attributes', 'N'),
+    ('source_dtypes', 'Source Dtypes', ''),
+    ('target_dtypes', 'Target Dtypes', ''),
+    ('source_categoricals', 'Source Categoricals', ''),
+    ('target_categoricals', 'Target Categoricals', ''),
+    ('source_date_formats', 'Source Date Formats', ''),
+    ('target_date_formats', 'Target Date Formats', ''),
+    ('arrow_ingest', 'Arrow Ingest', 'N'),
+    ('priority', 'Priority', '0'),
+    ('weight', 'Weight', '1'),
+    ('metrics_textfile_dir', 'Metrics Textfile Dir', ''),
+    ('profile', 'Profile', 'N'),
+]
+PORT_COLUMNS = {'source_port': 'Source Port', 'target_port': 'Target Port'}  # Blank ports are '' instead of 'nan'
+
+
+def text_column(config_df, column, default=None):
+    """Stripped text of a driver config column, default for missing / blank cells of optional columns"""
+    if column not in config_df.columns:
+        return pd.Series(default, index=config_df.index, dtype=object)
+    values = config_df[column]
+    text = values.astype(str).str.strip()
+    if default is None:
+        return text
+    return text.where(values.notna() & (text != ''), default)
+
+
+def build_configs(config_df):
+    """Builds one config dict per driver config row, column by column instead of field by field per row"""
+    columns = {}
+    for key, column, default in CONFIG_COLUMNS:
+        columns[key] = text_column(config_df, column, default)
+    for key, column in PORT_COLUMNS.items():
+        columns[key] = columns[key].where(config_df[column].notna(), '')
+    columns['comparison_keys'] = columns['comparison_keys'].map(lambda keys: [key.strip() for key in keys.split(',')])
+    columns['recon_mode'] = columns['recon_mode'].str.lower()
+    return pd.DataFrame(columns, index=config_df.index).to_dict('records')
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs reconciliation for every use case in the driver config")
+    parser.add_argument("--config", default="resources/Recon_Driver_Config.xlsx", help="Driver config workbook path")
+    parser.add_argument("--max-workers", type=int, default=1, help="Use cases run concurrently ( 1 = sequential, in-process )")
+    args = parser.parse_args()
+
     logger.info("## Starting Recon Engine...! ##")
     pd.set_option("display.max_columns", None)
 
-    driver_config_file_path = "resources/Recon_Driver_Config.xlsx"
+    driver_config_file_path = args.config
     config_df = ConfigLoader.read_config(driver_config_file_path)
 
-    for _, row in config_df.iterrows():
-        try:
-            config = {
-                'Use_Case_Id': str(row['Use Case']).strip(),
-                'source_name': str(row['Source Name']).strip(),
-                'source_type': str(row['Source Type']).strip(),
-                'source_detail': str(row['Source Detail']).strip(),
-                'source_db_type': str(row['Source DB Type']).strip(),
-                'source_host': str(row['Source Host']).strip(),
-                'source_port': str(row['Source Port']).strip() if pd.notna(row['Source Port']) else '',
-                'source_database': str(row['Source Database']).strip(),
-                'source_user': str(row['Source User ID']).strip(),
-                'source_password': str(row['Source Password']).strip(),
-                'source_query_file': str(row['Source Query File']).strip(),
-                'target_name': str(row['Target Name']).strip(),
-                'target_type': str(row['Target Type']).strip(),
-                'target_detail': str(row['Target Detail']).strip(),
-                'target_db_type': str(row['Target DB Type']).strip(),
-                'target_host': str(row['Target Host']).strip(),
-                'target_port': str(row['Target Port']).strip() if pd.notna(row['Target Port']) else '',
-                'target_database': str(row['Target Database']).strip(),
-                'target_user': str(row['Target User ID']).strip(),
-                'target_password': str(row['Target Password']).strip(),
-                'target_query_file': str(row['Target Query File']).strip(),
-                'comparison_keys': [key.strip() for key in str(row['Comparison Keys']).split(',')]
-            }
-
-            logger.info(f"## Starting reconciliation for {config['source_name']} vs {config['target_name']} ##")
-
-            start_time = time.time()
-            recon_engine = ReconEngine(config,driver_config_file_path)
-            recon_engine.run_recon()
-            end_time = time.time()
-
-            execution_time_ms = round((end_time - start_time) * 1000, 2)
-            logger.info(f"## Recon completed for {config['source_name']} vs {config['target_name']} in {execution_time_ms} ms ##")
-
-        except DataLoadError as e:
-            logger.error(" Source or Target Data loading issues, please check configuration file:", str(e))
-
-        except Exception as e:
-            logger.error(f"Error processing reconciliation for {row.get('Source Name', 'Unknown')} vs {row.get('Target Name', 'Unknown')}: {e}")
+    configs = build_configs(config_df)
+
+    ReconScheduler(driver_config_file_path, args.max_workers).run(configs)
 
     logger.info("## Recon Engine Completed for All Configurations! ##")
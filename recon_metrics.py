@@ -0,0 +1,215 @@
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from resource_usage import current_rss_mb, peak_rss_mb
+from logger_config import logger
+
+""" This module contains stage level metrics for a recon run ( fetch per side, column mapping, compare, summary, html,
+xlsx ) — emitted as JSON lines and optionally as a Prometheus textfile, plus the opt-in cProfile / tracemalloc hook. """
+
+METRICS_DIR = "./resources/recon_reports/metrics"
+METRICS_FILE = "recon_metrics.jsonl"
+PROFILE_DIR = "./resources/recon_reports/metrics/profiles"
+PROFILE_TOP_N = 25
+
+
+class ReconMetrics:
+    """Collects stage records of one use case run, stages may be recorded from the fetch threads"""
+
+    def __init__(self, config):
+        self.config = config
+        self.use_case_id = str(config.get('Use_Case_Id'))
+        self.run_id = f"{self.use_case_id}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{os.getpid()}"
+        self.stages = []
+        self._lock = threading.Lock()
+        self.profile_modes = self.parse_profile_modes(config.get('profile'))
+        self._profiles = []
+
+    def __getstate__(self):
+        """Copies / pickles ( e.g. pandas Styler deep copying the reporter ) leave out the lock and live profilers"""
+        state = self.__dict__.copy()
+        del state['_lock'], state['_profiles']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._profiles = []
+
+    @staticmethod
+    def parse_profile_modes(value):
+        """'cprofile', 'tracemalloc', 'both' or 'Y' ( = both ), anything else disables profiling"""
+        value = str(value or '').strip().lower()
+        if value in ('y', 'yes', 'true', '1', 'both'):
+            return {'cprofile', 'tracemalloc'}
+        return {mode.strip() for mode in value.split(',')} & {'cprofile', 'tracemalloc'}
+
+    def record(self, stage, seconds, **fields):
+        entry = {
+            'stage': stage,
+            'seconds': round(seconds, 4),
+            'rss_mb': current_rss_mb(),
+            'peak_rss_mb': peak_rss_mb()
+        }
+        entry.update({key: value for key, value in fields.items() if value is not None})
+        with self._lock:
+            self.stages.append(entry)
+
+    @contextmanager
+    def stage(self, stage, **fields):
+        """Times the block as one stage, the yielded dict takes extra fields ( rows, bytes ) known only at the end"""
+        start_time = time.time()
+        status = 'success'
+        try:
+            yield fields
+        except Exception:
+            status = 'failed'
+            raise
+        finally:
+            self.record(stage, time.time() - start_time, status=status, **fields)
+
+    @contextmanager
+    def profile(self):
+        """Opt-in cProfile / tracemalloc around the whole use case ( 'Profile' driver config column )"""
+        if not self.profile_modes:
+            yield
+            return
+        profiler = None
+        started_tracemalloc = False
+        if 'tracemalloc' in self.profile_modes and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            started_tracemalloc = True
+        if 'cprofile' in self.profile_modes:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.save_profile(profiler)
+            if started_tracemalloc:
+                self.save_tracemalloc()
+                tracemalloc.stop()
+
+    def profiled(self, func, *args):
+        """Runs func under its own cProfile when profiling — cProfile only sees the thread it was enabled in,
+        so work on the fetch threads is profiled separately and merged into the use case profile"""
+        if 'cprofile' not in self.profile_modes:
+            return func(*args)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            with self._lock:
+                self._profiles.append(profiler)
+
+    def save_profile(self, profiler):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stats = pstats.Stats(profiler)
+            for thread_profiler in self._profiles:
+                stats.add(thread_profiler)
+            profile_path = os.path.join(PROFILE_DIR, f"{self.run_id}.prof")
+            stats.dump_stats(profile_path)
+            output = io.StringIO()
+            stats.stream = output
+            stats.sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+            logger.info(f"cProfile saved at: {profile_path} ( open with pstats / snakeviz ), top {PROFILE_TOP_N} by cumulative time:\n{output.getvalue()}")
+        except Exception as e:
+            logger.error(f"Failed to save cProfile output: {e}")
+
+    def save_tracemalloc(self):
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            top_lines = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP_N]
+            self.record('tracemalloc', 0, traced_current_mb=round(current / 1024 / 1024, 2),
+                        traced_peak_mb=round(peak / 1024 / 1024, 2))
+            logger.info(f"tracemalloc peak {round(peak / 1024 / 1024, 2)} MB, top {PROFILE_TOP_N} allocations still held:\n" +
+                        "\n".join(str(line) for line in top_lines))
+        except Exception as e:
+            logger.error(f"Failed to capture tracemalloc statistics: {e}")
+
+    def save(self, status='Success'):
+        """Appends one JSON line per stage to METRICS_FILE and writes the Prometheus textfile when configured"""
+        timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+        common = {
+            'run_id': self.run_id,
+            'use_case': self.use_case_id,
+            'source_name': self.config.get('source_name'),
+            'target_name': self.config.get('target_name'),
+            'recon_mode': self.config.get('recon_mode') or 'full',
+            'pid': os.getpid(),
+            'timestamp': timestamp,
+            'run_status': status
+        }
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            lines = "".join(json.dumps({**common, **entry}, default=str) + "\n" for entry in self.stages)
+            # Single append per run, concurrent use case processes do not interleave their lines
+            with open(os.path.join(METRICS_DIR, METRICS_FILE), 'a') as f:
+                f.write(lines)
+            logger.info("Stage timings: " + ", ".join(f"{entry['stage']}={round(entry['seconds'] * 1000, 2)} ms"
+                                                      for entry in self.stages))
+        except Exception as e:
+            logger.error(f"Failed to save recon metrics: {e}")
+
+        textfile_dir = self.config.get('metrics_textfile_dir')
+        if textfile_dir:
+            self.save_prometheus_textfile(textfile_dir, status)
+
+    @staticmethod
+    def stage_totals(stages):
+        """One entry per stage name — a stage recorded more than once ( per chunk / partition fetches ) has its
+        seconds, rows and bytes summed and its peak RSS maxed, a repeated label set is not a valid exposition"""
+        totals = {}
+        for entry in stages:
+            total = totals.setdefault(entry['stage'], {})
+            for field in ('seconds', 'rows', 'bytes'):
+                if entry.get(field) is not None:
+                    total[field] = round(total.get(field, 0) + entry[field], 4)
+            if entry.get('peak_rss_mb') is not None:
+                total['peak_rss_mb'] = max(total.get('peak_rss_mb', 0), entry['peak_rss_mb'])
+        return totals
+
+    def save_prometheus_textfile(self, textfile_dir, status):
+        """node_exporter textfile collector format, one file per use case replaced atomically"""
+        use_case = self.use_case_id.replace('\\', '\\\\').replace('"', '\\"')
+        gauges = {
+            'recon_stage_seconds': ('seconds', 'Wall time of the recon stage in seconds'),
+            'recon_stage_rows': ('rows', 'Rows processed by the recon stage'),
+            'recon_stage_bytes': ('bytes', 'Bytes read by the recon stage'),
+            'recon_stage_peak_rss_megabytes': ('peak_rss_mb', 'Process peak RSS at the end of the recon stage')
+        }
+        totals = self.stage_totals(self.stages)
+        lines = []
+        for metric, (field, help_text) in gauges.items():
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            for stage, entry in totals.items():
+                if entry.get(field) is not None:
+                    lines.append(f'{metric}{{use_case="{use_case}",stage="{stage}"}} {entry[field]}')
+        lines += ["# HELP recon_last_run_success 1 when the last run of the use case succeeded",
+                  "# TYPE recon_last_run_success gauge",
+                  f'recon_last_run_success{{use_case="{use_case}"}} {1 if status == "Success" else 0}',
+                  "# HELP recon_last_run_timestamp_seconds Unix time of the last run of the use case",
+                  "# TYPE recon_last_run_timestamp_seconds gauge",
+                  f'recon_last_run_timestamp_seconds{{use_case="{use_case}"}} {int(time.time())}']
+        try:
+            os.makedirs(textfile_dir, exist_ok=True)
+            file_name = re.sub(r'[^A-Za-z0-9_.-]', '_', self.use_case_id)
+            textfile_path = os.path.join(textfile_dir, f"recon_{file_name}.prom")
+            tmp_path = f"{textfile_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, textfile_path)  # Collector never reads a half written file
+        except Exception as e:
+            logger.error(f"Failed to write Prometheus textfile: {e}")
@@ -1,27 +1,73 @@
+import os
+
+import numpy as np
 import pandas as pd
 import datetime
+import json
+
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+from diff_store import DiffStore, PAGE_ROWS, SERVER_PORT
+from duplicate_profile import DuplicateKeyProfiler
+from recon_metrics import ReconMetrics
 from logger_config import logger  # Import global logger
 
+REPORT_DIR = "./resources/recon_reports"  # html / xlsx reports go to <report dir>/html and <report dir>/xlsx
+REPORT_CHUNK_ROWS = 10000  # Rows written to xlsx per chunk
+XLSX_MAX_ROWS = 1048576  # Rows of an xlsx sheet ( header included ), further rows spill to the next sheet
+HTML_PAGE_ROWS = PAGE_ROWS  # Rows of each diff table embedded in the html report, further pages come from the diff store
+
 
 class ReconReportGenerator:
-    def __init__(self, comparison, source_data, target_data, config):
+    def __init__(self, comparison, source_data, target_data, config, summary=None, duplicate_flags=None, prefiltered_rows=0,
+                 metrics=None, sample_stats=None, duplicate_profiles=None):
         self.comparison = comparison
+        self.metrics = metrics if metrics is not None else ReconMetrics(config)
+        self.prefiltered_rows = prefiltered_rows  # Identical rows dropped before datacompy, counted as matched common rows
         self.source_data = source_data
         self.target_data = target_data
         self.config = config
+        self.summary = summary  # Pre-computed summary / duplicate flags, e.g. merged from partitioned recon
+        self.duplicate_flags = duplicate_flags
+        self.duplicate_profiles = duplicate_profiles  # Duplicate key profiles per side, profiled from the data when None
+        self.sample_stats = sample_stats  # Mismatch rates with confidence intervals of a sampled recon
+        self.run_time = datetime.datetime.now()
+        self.diff_store_run = None  # (store root, use case, run_ts) once the diffs are persisted
+        self._all_mismatch = None
+
+    def all_mismatch(self):
+        """comparison.all_mismatch() re-computes the mismatch frame on every call, compute it once per report"""
+        if self._all_mismatch is None:
+            self._all_mismatch = self.comparison.all_mismatch()
+        return self._all_mismatch
 
     def recon_report(self):
         """Main method that generates the reconciliation report."""
-        summary_data = self.generate_summary_stats()
-        duplicate_flags = self.detect_duplicates()
-        styled_html = self.generate_styled_html()
-        filename = self.generate_report_filename()
+        with self.metrics.stage('summary_stats') as stage:
+            summary_data = self.summary if self.summary is not None else self.generate_summary_stats()
+            duplicate_flags = self.duplicate_flags if self.duplicate_flags is not None else self.detect_duplicates()
+            stage['rows'] = len(self.all_mismatch())
+
+        with self.metrics.stage('diff_store') as stage:
+            stage['rows'] = self.save_diff_store(summary_data, duplicate_flags)
+
+        with self.metrics.stage('html_render') as stage:
+            styled_html = self.generate_styled_html()
+            filename = self.generate_report_filename()
 
-        template_content = self.load_template()
-        populated_report = self.populate_template(template_content, summary_data, duplicate_flags, styled_html)
+            template_content = self.load_template()
+            populated_report = self.populate_template(template_content, summary_data, duplicate_flags, styled_html)
 
-        self.save_html_report(filename, populated_report)
-        self.save_xlsx_reports("./resources/recon_reports/xlsx/comprehensive_recon_report.xlsx")
+            self.save_html_report(filename, populated_report)
+            stage['bytes'] = os.path.getsize(filename)
+
+        if str(self.config.get('xlsx_report') or 'Y').strip().upper() != 'Y':
+            return
+        xlsx_path = self.generate_report_filename('xlsx')
+        with self.metrics.stage('xlsx_write') as stage:
+            self.save_xlsx_reports(xlsx_path)
+            stage['rows'] = len(self.all_mismatch()) + len(self.comparison.df1_unq_rows) + len(self.comparison.df2_unq_rows)
+            stage['bytes'] = os.path.getsize(xlsx_path) if os.path.exists(xlsx_path) else None
 
     def generate_summary_stats(self):
         df_col_stats = self.comparison.column_stats
@@ -30,11 +76,11 @@ class ReconReportGenerator:
             "src_col_count": len(self.source_data.columns),
             "tgt_row_count": self.target_data.shape[0],
             "tgt_col_count": len(self.target_data.columns),
-            "common_rows_count": self.comparison.intersect_rows.shape[0],
+            "common_rows_count": self.comparison.intersect_rows.shape[0] + self.prefiltered_rows,
             "rows_in_src_only": self.comparison.df1_unq_rows.shape[0],
             "rows_in_tgt_only": self.comparison.df2_unq_rows.shape[0],
-            "rows_having_mismatch": self.comparison.all_mismatch().shape[0],
-            "row_having_no_mismatch": self.comparison.intersect_rows.shape[0] - self.comparison.all_mismatch().shape[0],
+            "rows_having_mismatch": self.all_mismatch().shape[0],
+            "row_having_no_mismatch": self.comparison.intersect_rows.shape[0] + self.prefiltered_rows - self.all_mismatch().shape[0],
             "common_cols_count": len(self.comparison.intersect_columns()),
             "cols_in_src_only_count": len(self.comparison.df1_unq_columns()),
             "cols_in_tgt_only_count": len(self.comparison.df2_unq_columns()),
@@ -47,45 +93,39 @@ class ReconReportGenerator:
         }
         return summary
 
+    @staticmethod
+    def merge_summary_stats(summaries, column_stats):
+        """Merges per-partition summaries — row counts are summed, column counts come from the merged column stats"""
+        merged = dict(summaries[0])
+        for key in ["src_row_count", "tgt_row_count", "common_rows_count", "rows_in_src_only",
+                    "rows_in_tgt_only", "rows_having_mismatch", "row_having_no_mismatch"]:
+            merged[key] = sum(summary[key] for summary in summaries)
+        merged["cols_having_no_mismatch"] = sum(1 for col in column_stats if col['all_match'])
+        merged["cols_having_mismatch"] = sum(1 for col in column_stats if not col['all_match'])
+        return merged
+
     def detect_duplicates(self):
-        comparison_keys_lower = [key.lower() for key in self.config['comparison_keys']]
-        dupe_row_in_src_count = 0
-        dupe_row_in_tgt_count = 0
-
-        if not self.comparison.df1_unq_rows.empty:
-            dupe_row_in_src = pd.merge(self.comparison.df1_unq_rows, self.comparison.intersect_rows,
-                                       on=comparison_keys_lower, how='inner')
-            dupe_row_in_src_count = dupe_row_in_src.shape[0]
-
-        if not self.comparison.df2_unq_rows.empty:
-            dupe_row_in_tgt = pd.merge(self.comparison.df2_unq_rows, self.comparison.intersect_rows,
-                                       on=comparison_keys_lower, how='inner')
-            dupe_row_in_tgt_count = dupe_row_in_tgt.shape[0]
-
-        return {
-            "duplicate_flag_src": 'Yes' if dupe_row_in_src_count > 0 else 'No',
-            "duplicate_flag_tgt": 'Yes' if dupe_row_in_tgt_count > 0 else 'No'
-        }
+        """Duplicate flags from the duplicate key profiles, the keys of source / target data are hashed when no
+        profiles were passed"""
+        if self.duplicate_profiles is None:
+            self.duplicate_profiles = DuplicateKeyProfiler.profile_pair(
+                self.source_data, self.target_data, self.config['comparison_keys'], DuplicateKeyProfiler.top_n(self.config))
+        return DuplicateKeyProfiler.flags(self.duplicate_profiles)
 
     def generate_styled_html(self):
         """Generates an HTML-styled DataFrame highlighting mismatches."""
-        all_mismatch = self.comparison.all_mismatch()
-        if all_mismatch.shape[0] >500:
-            logger.info("Mismatched rows are greater than 500 rows. please refer xlsx report to analyse detailed differences...")
-        styled_df = all_mismatch.head(500).style.apply(self.highlight_diff, axis=1)
+        all_mismatch = self.all_mismatch()
+        if all_mismatch.shape[0] > HTML_PAGE_ROWS:
+            logger.info(f"Mismatched rows are greater than {HTML_PAGE_ROWS} rows. Further pages are loaded from the diff store...")
+        styled_df = all_mismatch.head(HTML_PAGE_ROWS).style.apply(self.highlight_diff, axis=None)
         return styled_df.hide(axis=0)._repr_html_()
 
-    def generate_styled_diff_df(self):
-        """Generates styled DataFrame highlighting mismatches."""
-        all_mismatch = self.comparison.all_mismatch()
-        styled_df = all_mismatch.head(500).style.apply(self.highlight_diff, axis=1)
-        return styled_df
-
-    def generate_report_filename(self):
-        now = datetime.datetime.now()
-        date_str = now.strftime("%Y-%m-%d")
-        time_str = now.strftime("%H_%M_%S")
-        return f"./resources/recon_reports/html/recon_report_{self.config['source_name']}_{self.config['target_name']}_{date_str}_{time_str}.html"
+    def generate_report_filename(self, extension='html'):
+        date_str = self.run_time.strftime("%Y-%m-%d")
+        time_str = self.run_time.strftime("%H_%M_%S")
+        report_dir = self.config.get('report_dir') or REPORT_DIR
+        return os.path.join(report_dir, extension, f"recon_report_{self.config['source_name']}_{self.config['target_name']}"
+                                                   f"_{date_str}_{time_str}.{extension}")
 
     def load_template(self):
         """Loads the HTML template for the reconciliation report."""
@@ -101,9 +141,12 @@ class ReconReportGenerator:
             "#relative_tole#": summary["relative_tole"],
             "#matched_keys#": summary["matched_keys"],
             "#Columns with un-eq values / types#": df_col_with_uneq_values_types.to_html(),
-            "#Rows with un-eq values#": styled_html,
-            "#Rows Only In Src#": self.comparison.df1_unq_rows.to_html(),
-            "#Rows Only In Tgt#": self.comparison.df2_unq_rows.to_html(),
+            "#Rows with un-eq values#": self.diff_section_html('mismatches', styled_html, len(self.all_mismatch())),
+            "#Rows Only In Src#": self.diff_section_html('source_only', self.first_page_html(self.comparison.df1_unq_rows),
+                                                         len(self.comparison.df1_unq_rows)),
+            "#Rows Only In Tgt#": self.diff_section_html('target_only', self.first_page_html(self.comparison.df2_unq_rows),
+                                                         len(self.comparison.df2_unq_rows)),
+            "#Diff Store#": self.diff_store_json(),
             "#Summary Chart#": str([summary["src_row_count"], summary["src_col_count"],
                                     summary["tgt_row_count"], summary["tgt_col_count"]]),
             "#Row Summary#": str([summary["common_rows_count"], summary["rows_in_src_only"],
@@ -114,7 +157,11 @@ class ReconReportGenerator:
                                      summary["cols_having_mismatch"]]),
             "#duplicate_flag_src#": duplicate_flags["duplicate_flag_src"],
             "#duplicate_flag_tgt#": duplicate_flags["duplicate_flag_tgt"],
-            "#spaces_ignored#": str(summary["spaces_ignored"])
+            "#duplicate_detail_src#": duplicate_flags.get("duplicate_detail_src", "Not profiled"),
+            "#duplicate_detail_tgt#": duplicate_flags.get("duplicate_detail_tgt", "Not profiled"),
+            "#Duplicate Keys#": self.generate_duplicate_keys_html(),
+            "#spaces_ignored#": str(summary["spaces_ignored"]),
+            "#Sample Statistics#": self.generate_sample_stats_html()
         }
 
         for key, value in replacements.items():
@@ -122,31 +169,190 @@ class ReconReportGenerator:
 
         return template
 
+    def duplicate_key_tables(self):
+        """(sheet name, top duplicate keys) of the sides having duplicate keys"""
+        profiles = self.duplicate_profiles or {}
+        return [(f"{suffix}_duplicate_keys", profiles[side]['top_keys'])
+                for side, suffix in (('source', 'src'), ('target', 'tgt'))
+                if profiles.get(side) is not None and profiles[side]['duplicate_keys']]
+
+    def generate_duplicate_keys_html(self):
+        """Top duplicate keys section, empty when the keys are unique"""
+        tables = self.duplicate_key_tables()
+        if not tables:
+            return ""
+        sections = "".join(f'        <h4> {"Src" if name.startswith("src") else "Tgt"} </h4>\n'
+                           f'        <div class="scrollable">\n{top_keys.to_html(index=False, na_rep="")}\n        </div>\n'
+                           for name, top_keys in tables)
+        return f'<div class="last_bottom">\n        <h3> Top Duplicate Keys </h3>\n{sections}    </div>'
+
+    def generate_sample_stats_html(self):
+        """Sample statistics section, empty for full ( not sampled ) recons"""
+        if self.sample_stats is None:
+            return ""
+        sampler_note = (f"{float(self.config.get('sample_percent') or 1):g} % of keys, "
+                        f"{float(self.config.get('sample_confidence') or 0.95) * 100:g} % confidence intervals")
+        return (f'<div class="last_bottom">\n        <h3> Sampled Recon - Estimated Mismatch Rates ( {sampler_note} ) </h3>\n'
+                f'        <div class="scrollable">\n{self.sample_stats.to_html(index=False, na_rep="")}\n        </div>\n    </div>')
+
     def save_html_report(self, filename, content):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
         with open(filename, 'w') as file:
             file.write(content)
 
-    def highlight_diff(self, row):
-        """Highlights mismatched cells."""
-        styles = [''] * len(row)
-        for i in range(len(self.config['comparison_keys']), len(row)-1, 2):
-            if row.iloc[i] != row.iloc[i + 1]:
-                styles[i] = 'background-color: #FF6347'
-                styles[i + 1] = 'background-color: #FF6347'
-        return styles
+    @staticmethod
+    def first_page_html(df, page_rows=HTML_PAGE_ROWS):
+        return df.head(page_rows).to_html()
+
+    def diff_section_html(self, artifact, table_html, total_rows):
+        """First page of a diff table with a pager, the pager loads further pages from the diff store page server"""
+        pages = max(-(-total_rows // HTML_PAGE_ROWS), 1)
+        if pages == 1:
+            return f'<div id="diff_{artifact}">\n{table_html}\n</div>'
+        note = "" if self.diff_store_run is not None else "Diff store not written, only the first page is available."
+        return (f'<div id="diff_{artifact}">\n{table_html}\n</div>\n'
+                f'<div class="pager" id="pager_{artifact}" data-page="1" data-pages="{pages}">\n'
+                f'    <button onclick="loadDiffPage(\'{artifact}\', -1)">Previous</button>\n'
+                f'    <span class="pager-label">Page 1 of {pages}</span> ( {total_rows} rows )\n'
+                f'    <button onclick="loadDiffPage(\'{artifact}\', 1)">Next</button>\n'
+                f'    <span class="pager-note">{note}</span>\n</div>')
+
+    def diff_store_json(self):
+        """Diff store location of this run for the pager script of the report"""
+        root, use_case, run_ts = self.diff_store_run or (None, None, None)
+        return json.dumps({'store': root, 'use_case': use_case, 'run_ts': run_ts, 'page_rows': HTML_PAGE_ROWS,
+                           'server': f"http://127.0.0.1:{self.config.get('diff_store_port') or SERVER_PORT}"})
+
+    def mismatch_mask_frame(self, df):
+        """Key columns of the mismatched rows plus one boolean column per compared column, True where it differs"""
+        key_count = len(self.config['comparison_keys'])
+        mask = self.highlight_mask(df)
+        frame = df.iloc[:, :key_count].reset_index(drop=True)
+        for column, i, _ in self.mismatch_columns(df):
+            frame[column] = mask.iloc[:, i].to_numpy(dtype=bool)
+        return frame
+
+    def mismatch_columns(self, df):
+        """(compared column, df1 column position, df2 column position) of all_mismatch"""
+        suffix = f"_{getattr(self.comparison, 'df1_name', 'df1')}"
+        return [(str(df.columns[i])[:-len(suffix)] if str(df.columns[i]).endswith(suffix) else str(df.columns[i]), i, j)
+                for i, j in self.mismatch_column_pairs(df)]
+
+    def save_diff_store(self, summary, duplicate_flags):
+        """Persists the diffs of this run to the diff store, returns the rows written ( None when not written )"""
+        if not DiffStore.available():
+            logger.warning("pyarrow is not installed, diffs are not persisted to the diff store.")
+            return None
+        try:
+            all_mismatch = self.all_mismatch()
+            root = DiffStore.root(self.config)
+            use_case = self.config.get('Use_Case_Id')
+            run_ts = DiffStore.new_run_ts(root, use_case, self.run_time)
+            artifacts = {
+                'mismatches': all_mismatch,
+                'mismatch_mask': self.mismatch_mask_frame(all_mismatch),
+                'source_only': self.comparison.df1_unq_rows,
+                'target_only': self.comparison.df2_unq_rows,
+                'column_stats': pd.DataFrame.from_dict(self.comparison.column_stats)
+            }
+            run_info = {
+                'source_name': self.config.get('source_name'),
+                'target_name': self.config.get('target_name'),
+                'key_columns': [str(column) for column in all_mismatch.columns[:len(self.config['comparison_keys'])]],
+                'column_pairs': [(column, str(all_mismatch.columns[i]), str(all_mismatch.columns[j]))
+                                 for column, i, j in self.mismatch_columns(all_mismatch)],
+                'summary': summary,
+                'duplicate_flags': duplicate_flags,
+                'report': self.generate_report_filename()
+            }
+            run_dir = DiffStore.write_run(root, use_case, run_ts, artifacts, run_info)
+            self.diff_store_run = (root, str(use_case), run_ts)
+            logger.info(f"Diffs saved to the diff store at: {run_dir}")
+            return sum(len(frame) for frame in artifacts.values())
+        except Exception as e:
+            logger.error(f"Failed to save diffs to the diff store: {e}")
+            return None
+
+    def mismatch_column_pairs(self, df):
+        """(df1 column position, df2 column position) pairs of all_mismatch, which lists keys first then value pairs"""
+        return [(i, i + 1) for i in range(len(self.config['comparison_keys']), len(df.columns) - 1, 2)]
+
+    def highlight_mask(self, df):
+        """Boolean frame, True where the df1 / df2 values of a column pair differ ( both null counts as equal )"""
+        mask = pd.DataFrame(False, index=df.index, columns=df.columns)
+        for i, j in self.mismatch_column_pairs(df):
+            # Categoricals ( categorical schema hints ) only compare with identical categories
+            col_1, col_2 = (col if not isinstance(col.dtype, pd.CategoricalDtype) else col.astype(object)
+                            for col in (df.iloc[:, i], df.iloc[:, j]))
+            differs = (col_1 != col_2).to_numpy() & ~(col_1.isna() & col_2.isna()).to_numpy()
+            mask.iloc[:, i] = differs
+            mask.iloc[:, j] = differs
+        return mask
+
+    def highlight_diff(self, df):
+        """Highlights mismatched cells, whole frame at once ( Styler.apply with axis=None )."""
+        return pd.DataFrame(np.where(self.highlight_mask(df), 'background-color: #FF6347', ''),
+                            index=df.index, columns=df.columns)
 
     def save_xlsx_reports(self, output_path):
+        """Writes xlsx report row by row in xlsxwriter constant_memory mode, memory stays flat whatever the diff size.
+        All mismatched rows are written, highlighting is done with conditional formats."""
         try:
-            all_mismatch = self.comparison.all_mismatch()
-            styled_diff_dataframe = self.generate_styled_diff_df()
-            with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+            all_mismatch = self.all_mismatch()
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True,
+                                                         'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+            try:
+                header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
                 if len(all_mismatch)>0:
-                    styled_diff_dataframe.to_excel(writer, sheet_name='all_mismatched_rows', index=False)
+                    for worksheet, row_count in self.write_sheet(workbook, 'all_mismatched_rows', all_mismatch, header_format):
+                        self.add_mismatch_highlighting(workbook, worksheet, all_mismatch, row_count)
                 if hasattr(self.comparison, 'df1_unq_rows') and len(self.comparison.df1_unq_rows)>0:
-                    self.comparison.df1_unq_rows.to_excel(writer, sheet_name='src_unique_rows', index=False)
+                    self.write_sheet(workbook, 'src_unique_rows', self.comparison.df1_unq_rows, header_format)
                 if hasattr(self.comparison, 'df2_unq_rows') and len(self.comparison.df2_unq_rows)>0:
-                    self.comparison.df2_unq_rows.to_excel(writer, sheet_name='tgt_unique_rows', index=False)
+                    self.write_sheet(workbook, 'tgt_unique_rows', self.comparison.df2_unq_rows, header_format)
+                for sheet_name, top_keys in self.duplicate_key_tables():
+                    self.write_sheet(workbook, sheet_name, top_keys, header_format)
+                if self.sample_stats is not None:
+                    self.write_sheet(workbook, 'sample_statistics', self.sample_stats, header_format)
+            finally:
+                workbook.close()
             logger.info(f"Comparison report saved at: {output_path}")
         except Exception as e:
             logger.error(f"Failed to save report: {e}")
 
+    @staticmethod
+    def write_sheet(workbook, sheet_name, df, header_format):
+        """Streams df into a new sheet in chunks of REPORT_CHUNK_ROWS, rows must be written in order in constant_memory mode.
+        Rows beyond one sheet spill to sheet_name_2, sheet_name_3 .., returns (worksheet, row count) of every sheet"""
+        sheet_rows = XLSX_MAX_ROWS - 1
+        sheets = []
+        for sheet_no, sheet_start in enumerate(range(0, max(len(df), 1), sheet_rows), start=1):
+            suffix = f"_{sheet_no}" if sheet_no > 1 else ""
+            worksheet = workbook.add_worksheet(sheet_name[:31 - len(suffix)] + suffix)  # Sheet names are 31 chars at most
+            worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+            sheet_df = df.iloc[sheet_start:sheet_start + sheet_rows]
+            row_no = 1
+            for start in range(0, len(sheet_df), REPORT_CHUNK_ROWS):
+                chunk = sheet_df.iloc[start:start + REPORT_CHUNK_ROWS]
+                values = chunk.astype(object).where(chunk.notna(), None)  # NaN / NaT are written as blank cells
+                for row_values in values.itertuples(index=False, name=None):
+                    worksheet.write_row(row_no, 0, row_values)
+                    row_no += 1
+            sheets.append((worksheet, len(sheet_df)))
+        if len(sheets) > 1:
+            logger.info(f"{len(df)} rows of '{sheet_name}' exceed one xlsx sheet, written to {len(sheets)} sheets.")
+        return sheets
+
+    def add_mismatch_highlighting(self, workbook, worksheet, df, row_count):
+        """One conditional format rule per column pair instead of per cell styles, covers the row_count mismatched rows
+        of the sheet. EXACT compares case sensitive ( like the recon ) and treats 5 / 5.0 and blank / blank as equal."""
+        highlight_format = workbook.add_format({'bg_color': '#FF6347'})
+        last_row = row_count
+        for i, j in self.mismatch_column_pairs(df):
+            first_col, second_col = xl_col_to_name(i), xl_col_to_name(j)
+            worksheet.conditional_format(1, i, last_row, j, {
+                'type': 'formula',
+                'criteria': f'=NOT(EXACT(${first_col}2,${second_col}2))',
+                'format': highlight_format
+            })
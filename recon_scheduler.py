@@ -0,0 +1,176 @@
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+from recon_engine import ReconEngine, DataLoadError
+from recon_metrics import ReconMetrics
+from resource_usage import process_uptime_seconds
+from source_plugins import IMPORT_TIMES
+from logger_config import logger
+
+""" This module contains logic for scheduling multiple use cases ( driver config rows ) on a bounded process pool """
+
+RUN_SUMMARY_DIR = "./resources/recon_reports/run_summary"
+POOL_RESTARTS = 2  # Rebuilds of a broken process pool, a use case that keeps killing its worker fails after these
+_first_use_case = True  # The first use case run by a process reports its cold start
+
+
+def cold_start_seconds():
+    """Process uptime when its first use case starts ( interpreter start and module imports ), None afterwards"""
+    global _first_use_case
+    if not _first_use_case:
+        return None
+    _first_use_case = False
+    return process_uptime_seconds()
+
+
+def run_use_case(config, driver_config_file_path):
+    """Runs one use case end to end, never raises so a failing row can not take the pool down"""
+    result = {
+        'Use Case': config.get('Use_Case_Id'),
+        'Source Name': config.get('source_name'),
+        'Target Name': config.get('target_name'),
+        'Priority': config.get('priority'),
+        'Weight': config.get('weight'),
+        'Worker PID': os.getpid(),
+        'Status': 'Success',
+        'Error': ''
+    }
+    logger.info(f"## Starting reconciliation for {config['source_name']} vs {config['target_name']} ##")
+    start_time = time.time()
+    metrics = ReconMetrics(config)
+    cold_start = cold_start_seconds()
+    if cold_start is not None:
+        metrics.record('cold_start', cold_start)
+        logger.info(f"Process cold start ( interpreter and module imports ) took {round(cold_start * 1000, 2)} ms.")
+    imported_before = set(IMPORT_TIMES)
+    try:
+        with metrics.profile():
+            recon_engine = ReconEngine(config, driver_config_file_path, metrics)
+            recon_engine.run_recon()
+    except DataLoadError as e:
+        logger.error(f"Source or Target Data loading issues, please check configuration file: {e}")
+        result.update({'Status': 'Failed', 'Error': str(e)})
+    except Exception as e:
+        logger.error(f"Error processing reconciliation for {config['source_name']} vs {config['target_name']}: {e}")
+        result.update({'Status': 'Failed', 'Error': str(e)})
+
+    result['Wall Time (ms)'] = round((time.time() - start_time) * 1000, 2)
+    result['Cold Start (ms)'] = round(cold_start * 1000, 2) if cold_start is not None else None
+    driver_imports = {module: seconds for module, seconds in IMPORT_TIMES.items() if module not in imported_before}
+    result['Driver Import (ms)'] = round(sum(driver_imports.values()) * 1000, 2)
+    if driver_imports:
+        metrics.record('driver_import', sum(driver_imports.values()), modules=sorted(driver_imports))
+    metrics.record('total', time.time() - start_time, status=result['Status'].lower())
+    metrics.save(result['Status'])
+    outcome = 'completed' if result['Status'] == 'Success' else 'failed'
+    logger.info(f"## Recon {outcome} for {config['source_name']} vs {config['target_name']} in {result['Wall Time (ms)']} ms ##")
+    return result
+
+
+class ReconScheduler:
+    """Runs use cases concurrently — higher 'priority' first, then heavier 'weight' first so long jobs start early"""
+
+    def __init__(self, driver_config_file_path, max_workers=1):
+        self.driver_config_file_path = driver_config_file_path
+        self.max_workers = max(1, int(max_workers))
+
+    @staticmethod
+    def order_configs(configs):
+        return sorted(configs, key=lambda config: (-ReconScheduler.sort_value(config, 'priority', 0),
+                                                   -ReconScheduler.sort_value(config, 'weight', 1)))
+
+    @staticmethod
+    def sort_value(config, field, default):
+        """Numeric Priority / Weight of a use case, default when blank and 0 when not a number"""
+        value = config.get(field)
+        if value is None or str(value).strip() == '':
+            return default
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            logger.warning(f"{field.capitalize()} '{value}' of use case {config.get('Use_Case_Id')} is not a number, using 0.")
+            return 0
+
+    def run(self, configs):
+        configs = self.order_configs(configs)
+        logger.info(f"Scheduling {len(configs)} use cases with max {self.max_workers} worker(s)...")
+        start_time = time.time()
+
+        if self.max_workers == 1:
+            # Run in-process, keeps single use case runs / debugging as simple as before
+            results = [run_use_case(config, self.driver_config_file_path) for config in configs]
+        else:
+            results = self.run_in_pool(configs)
+
+        total_time_ms = round((time.time() - start_time) * 1000, 2)
+        self.save_run_summary(results, total_time_ms)
+        return results
+
+    def run_in_pool(self, configs):
+        """Runs configs on the pool, a pool broken by a dead worker is rebuilt up to POOL_RESTARTS times for the use
+        cases it had not finished"""
+        results = []
+        pending = configs
+        for restart in range(POOL_RESTARTS + 1):
+            broken = self.run_pool_round(pending, results)
+            if not broken:
+                break
+            if restart < POOL_RESTARTS:
+                logger.warning(f"Process pool broken, rebuilding it to resubmit {len(broken)} unfinished use case(s)...")
+            else:
+                for config, error in broken:
+                    results.append(self.failed_result(config, f"Worker process terminated abruptly: {error}"))
+            pending = [config for config, _ in broken]
+        return results
+
+    def run_pool_round(self, configs, results):
+        """Runs configs on a new pool, appending their results — returns ( config, error ) of the use cases lost to a
+        broken pool, in submission order"""
+        broken = []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(run_use_case, config, self.driver_config_file_path): index
+                       for index, config in enumerate(configs)}
+            for future in as_completed(futures):
+                config = configs[futures[future]]
+                try:
+                    results.append(future.result())
+                except BrokenProcessPool as e:
+                    # A worker died hard ( e.g. killed for memory ), remaining futures fail fast instead of hanging
+                    logger.error(f"Worker process terminated abruptly while running {config.get('Use_Case_Id')}: {e}")
+                    broken.append((futures[future], config, e))
+                except Exception as e:
+                    logger.error(f"Error processing reconciliation for {config.get('source_name')} vs {config.get('target_name')}: {e}")
+                    results.append(self.failed_result(config, str(e)))
+        return [(config, error) for _, config, error in sorted(broken, key=lambda item: item[0])]
+
+    @staticmethod
+    def failed_result(config, error):
+        return {
+            'Use Case': config.get('Use_Case_Id'),
+            'Source Name': config.get('source_name'),
+            'Target Name': config.get('target_name'),
+            'Priority': config.get('priority'),
+            'Weight': config.get('weight'),
+            'Worker PID': None,
+            'Status': 'Failed',
+            'Error': error,
+            'Wall Time (ms)': None,
+            'Cold Start (ms)': None,
+            'Driver Import (ms)': None
+        }
+
+    def save_run_summary(self, results, total_time_ms):
+        """Writes consolidated run summary ( one row per use case ) as csv and logs the totals"""
+        try:
+            os.makedirs(RUN_SUMMARY_DIR, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H_%M_%S")
+            summary_path = os.path.join(RUN_SUMMARY_DIR, f"run_summary_{timestamp}.csv")
+            pd.DataFrame(results).to_csv(summary_path, index=False)
+            failed = sum(1 for result in results if result['Status'] != 'Success')
+            logger.info(f"Run summary saved at: {summary_path} ( {len(results) - failed} succeeded, {failed} failed, total {total_time_ms} ms )")
+        except Exception as e:
+            logger.error(f"Failed to save run summary: {e}")
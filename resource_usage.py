@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # Optional, used where the resource module is not available ( Windows )
+except ImportError:
+    psutil = None
+
+""" This module contains helpers to read process memory usage ( RSS ) for load / stage level logging """
+
+
+def peak_rss_mb():
+    """Process high-water RSS in MB, None when it can not be read on this platform"""
+    try:
+        # Linux VmHWM belongs to this process image, ru_maxrss is carried over from the parent across fork / exec
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except (OSError, ValueError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return round(peak / 1024 / 1024, 2) if sys.platform == 'darwin' else round(peak / 1024, 2)
+    if psutil is not None:
+        memory_info = psutil.Process(os.getpid()).memory_info()
+        return round(getattr(memory_info, 'peak_wset', memory_info.rss) / 1024 / 1024, 2)
+    return None
+
+
+def current_rss_mb():
+    """Current RSS in MB, None when it can not be read on this platform"""
+    if psutil is not None:
+        return round(psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024, 2)
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 2)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def frame_memory_mb(df):
+    """Deep memory usage of a DataFrame in MB"""
+    return round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+
+
+def process_uptime_seconds():
+    """Seconds since this process started ( interpreter start, imports ), None when it can not be read on this platform"""
+    try:
+        # Field 22 of /proc/self/stat is the start time in clock ticks after boot, the text before ')' may hold spaces
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return round(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 4)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if psutil is not None:
+        return round(time.time() - psutil.Process(os.getpid()).create_time(), 4)
+    return None
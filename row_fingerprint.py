@@ -0,0 +1,98 @@
+import pandas as pd
+from logger_config import logger
+
+""" This module contains the row fingerprint pre-filter — rows whose key and 64-bit hash over all compared columns
+are equal on both sides are dropped before datacompy, only mismatching or side only keys reach the detailed compare. """
+
+KEY_HASH = "__key_hash"
+ROW_HASH = "__row_hash"
+
+
+class RowFingerprintFilter:
+    @staticmethod
+    def compared_columns(source_data, target_data, comparison_keys):
+        """Non-key columns present on both sides ( matched case insensitive like datacompy ), in a stable order"""
+        keys_lower = {key.lower() for key in comparison_keys}
+        target_by_lower = {str(col).lower(): col for col in target_data.columns}
+        return sorted(
+            ((col, target_by_lower[str(col).lower()]) for col in source_data.columns
+             if str(col).lower() in target_by_lower and str(col).lower() not in keys_lower),
+            key=lambda pair: str(pair[0]).lower()
+        )
+
+    @staticmethod
+    def hashable_values(source_data, target_data, column_pairs):
+        """Compared columns of both sides, numeric columns with different dtypes ( e.g. int vs float with nulls ) are
+        hashed as float64 on both sides, the same way datacompy compares them numerically"""
+        source_values = source_data[[src for src, _ in column_pairs]]
+        target_values = target_data[[tgt for _, tgt in column_pairs]]
+        for src, tgt in column_pairs:
+            src_dtype, tgt_dtype = source_data[src].dtype, target_data[tgt].dtype
+            if src_dtype != tgt_dtype and all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+                                              for dtype in (src_dtype, tgt_dtype)):
+                source_values = source_values.assign(**{src: source_data[src].astype('float64')})
+                target_values = target_values.assign(**{tgt: target_data[tgt].astype('float64')})
+        return source_values, target_values
+
+    @staticmethod
+    def typed_values(values):
+        """Object columns are hashed on their string form, so each value is tagged with its Python type — a date and
+        the text '2024-01-01' ( or Decimal('1.0') and '1.0' ) must not fingerprint alike, datacompy reports them"""
+        object_columns = [col for col in values.columns if values[col].dtype == object]
+        if not object_columns:
+            return values
+        values = values.copy()
+        for col in object_columns:
+            values[col] = values[col].map(lambda value: value if pd.isna(value) else f"{type(value).__name__}\x1f{value}")
+        return values
+
+    @staticmethod
+    def fingerprints(data, keys, values):
+        frame = pd.DataFrame({
+            KEY_HASH: pd.util.hash_pandas_object(RowFingerprintFilter.typed_values(data[keys]), index=False).to_numpy(),
+            ROW_HASH: (pd.util.hash_pandas_object(RowFingerprintFilter.typed_values(values), index=False).to_numpy()
+                       if len(values.columns) else 0)
+        })
+        frame['unique_key'] = ~frame[KEY_HASH].duplicated(keep=False)
+        return frame
+
+    @staticmethod
+    def split(source_data, target_data, comparison_keys):
+        """Returns (source rows to compare, target rows to compare, count of rows dropped as exact matches).
+
+        Only keys that are unique on both sides are dropped, so datacompy's duplicate handling is untouched. Columns
+        whose dtypes differ in a non numeric way simply hash differently and those rows are kept for the compare.
+        """
+        target_by_lower = {str(col).lower(): col for col in target_data.columns}
+        target_keys = [target_by_lower.get(key.lower()) for key in comparison_keys]
+        if None in target_keys or not set(comparison_keys).issubset(source_data.columns):
+            return source_data, target_data, 0  # Let datacompy report the missing join columns
+        if any(source_data[src].dtype != target_data[tgt].dtype for src, tgt in zip(comparison_keys, target_keys)):
+            logger.info("Comparison key dtypes differ between source and target, skipping row fingerprint pre-filter.")
+            return source_data, target_data, 0
+
+        column_pairs = RowFingerprintFilter.compared_columns(source_data, target_data, comparison_keys)
+        source_values, target_values = RowFingerprintFilter.hashable_values(source_data, target_data, column_pairs)
+        source_prints = RowFingerprintFilter.fingerprints(source_data, comparison_keys, source_values)
+        target_prints = RowFingerprintFilter.fingerprints(target_data, target_keys, target_values)
+
+        matched = source_prints[source_prints['unique_key']].merge(
+            target_prints[target_prints['unique_key']], on=[KEY_HASH, ROW_HASH], how='inner')[KEY_HASH]
+        if matched.empty:
+            return source_data, target_data, 0
+
+        source_rest = source_data[~source_prints[KEY_HASH].isin(matched).to_numpy()]
+        target_rest = target_data[~target_prints[KEY_HASH].isin(matched).to_numpy()]
+        logger.info(f"Row fingerprint pre-filter: {len(matched)} identical rows skipped, "
+                    f"{len(source_rest)} source / {len(target_rest)} target rows left for detailed compare.")
+        return source_rest, target_rest, len(matched)
+
+    @staticmethod
+    def restore_column_stats(comparison, matched_count):
+        """Adds the pre-filtered rows back as matches to datacompy column stats ( identical rows have no diff )"""
+        if not matched_count:
+            return
+        for stat in comparison.column_stats:
+            stat['match_cnt'] += matched_count
+            if pd.isna(stat['max_diff']):
+                stat['max_diff'] = 0.0
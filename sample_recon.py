@@ -0,0 +1,111 @@
+import hashlib
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from checksum_precheck import ChecksumPrecheck
+from pushdown_recon import PushdownQueryBuilder
+from logger_config import logger
+
+""" This module contains logic for the sampling recon mode — both sides keep only the rows whose comparison key hashes
+into the first buckets, so the samples line up key for key. For database sources the sampling predicate is part of the
+query. Mismatch rates of the sample are reported with confidence intervals and scaled up to full data estimates. """
+
+SAMPLE_BUCKETS = 10000  # Key hash buckets, sample percent resolution is 0.01 %
+
+
+def sample_bucket(text):
+    """Bucket of a key text — first 32 bits of its MD5, registered as recon_sample_bucket() on SQLite connections"""
+    return int(hashlib.md5(str(text).encode('utf-8')).hexdigest()[:8], 16) % SAMPLE_BUCKETS
+
+
+class KeyHashSampler:
+    def __init__(self, percent=1, confidence=0.95):
+        self.threshold = min(SAMPLE_BUCKETS, max(1, round(float(percent or 1) * SAMPLE_BUCKETS / 100)))
+        self.fraction = self.threshold / SAMPLE_BUCKETS
+        self.confidence = float(confidence or 0.95)
+        self.z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+
+    @staticmethod
+    def from_config(config):
+        return KeyHashSampler(config.get('sample_percent') or 1, config.get('sample_confidence') or 0.95)
+
+    @staticmethod
+    def key_text(data, key_columns):
+        """Key values as length prefixed '2:v1 2:v2' text ( without the spaces ), the same text the database side
+        builds — integral floats ( ints with NULLs read from files ) are written without decimals"""
+        text = None
+        for column in key_columns:
+            values = data[column]
+            if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+                values = values.astype('Int64')
+            part = ChecksumPrecheck.part_text(values)
+            text = part if text is None else text + part
+        return text
+
+    def sample_frame(self, data, key_columns):
+        buckets = np.fromiter((sample_bucket(text) for text in self.key_text(data, key_columns)),
+                              dtype=np.int64, count=len(data))
+        return data[buckets < self.threshold].reset_index(drop=True)
+
+    def bucket_sql(self, db_type, key_columns):
+        text = ChecksumPrecheck.key_text_sql(db_type, [PushdownQueryBuilder.quote_identifier(db_type, column)
+                                                       for column in key_columns])
+        if db_type == 'postgresql':
+            return f"(('x' || substr(md5({text}), 1, 8))::bit(32)::bigint % {SAMPLE_BUCKETS})"
+        if db_type == 'oracle':
+            return f"MOD(TO_NUMBER(SUBSTR(RAWTOHEX(STANDARD_HASH({text}, 'MD5')), 1, 8), 'XXXXXXXX'), {SAMPLE_BUCKETS})"
+        if db_type == 'mssql':
+            # Hashed as VARCHAR so the bytes are the same as the UTF-8 text hashed client side ( for ASCII keys )
+            return f"(CAST(SUBSTRING(HASHBYTES('MD5', CAST({text} AS VARCHAR(MAX))), 1, 4) AS BIGINT) % {SAMPLE_BUCKETS})"
+        if db_type == 'mysql':
+            return f"(CONV(SUBSTRING(MD5({text}), 1, 8), 16, 10) % {SAMPLE_BUCKETS})"
+        return f"recon_sample_bucket({text})"
+
+    def sample_query(self, conn, db_type, query, key_columns):
+        """Wraps query with the sampling predicate, only the sampled rows leave the database"""
+        if db_type == 'sqlite':
+            conn.create_function('recon_sample_bucket', 1, sample_bucket, deterministic=True)
+        return (f"SELECT * FROM ({PushdownQueryBuilder.strip_query(query)}) q "
+                f"WHERE {self.bucket_sql(db_type, key_columns)} < {self.threshold}")
+
+    def wilson_interval(self, count, size):
+        """Wilson score interval of the proportion count / size, stays within [0, 1] for rare mismatches"""
+        if size == 0:
+            return None, None, None
+        rate = count / size
+        z2 = self.z ** 2
+        denominator = 1 + z2 / size
+        centre = (rate + z2 / (2 * size)) / denominator
+        half_width = self.z * math.sqrt(rate * (1 - rate) / size + z2 / (4 * size ** 2)) / denominator
+        return rate, max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+    def statistics(self, summary, column_stats, key_columns):
+        """Mismatch rates of the sample with confidence intervals, counts are scaled up by the sample fraction"""
+        measures = [('Rows having mismatch', summary['rows_having_mismatch'], summary['common_rows_count']),
+                    ('Rows in Src not in Tgt', summary['rows_in_src_only'], summary['src_row_count']),
+                    ('Rows in Tgt not in Src', summary['rows_in_tgt_only'], summary['tgt_row_count'])]
+        keys = {str(key).lower() for key in key_columns}
+        measures += [(f"Column {col['column']} mismatch", col['unequal_cnt'], col['match_cnt'] + col['unequal_cnt'])
+                     for col in column_stats if str(col['column']).lower() not in keys]
+
+        rows = []
+        for measure, count, size in measures:
+            rate, low, high = self.wilson_interval(count, size)
+            estimated_size = size / self.fraction
+            rows.append({
+                'Measure': measure,
+                'Sample Count': count,
+                'Sample Size': size,
+                'Rate %': None if rate is None else round(rate * 100, 4),
+                'CI Low %': None if low is None else round(low * 100, 4),
+                'CI High %': None if high is None else round(high * 100, 4),
+                'Est. Full Count': round(count / self.fraction),
+                'Est. Full Low': None if low is None else round(low * estimated_size),
+                'Est. Full High': None if high is None else round(high * estimated_size)
+            })
+        stats = pd.DataFrame(rows)
+        logger.info(f"Sampled recon ( {self.fraction * 100:g} % of keys ), mismatch rates with {self.confidence * 100:g} % "
+                    f"confidence intervals:\n{stats.to_string(index=False)}")
+        return stats
@@ -0,0 +1,139 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+from logger_config import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Cache is optional, fetches work as before without pyarrow
+    pa = None
+    feather = None
+
+""" This module contains logic for the on-disk snapshot cache of fetched DataFrames ( Arrow IPC / Feather files ).
+
+Every snapshot is keyed by a fingerprint of what was fetched — file path + mtime + size for files, query text +
+connection target for databases. File mtime is the snapshot creation time ( TTL ) and atime is the last hit ( LRU ). """
+
+CACHE_DIR = "./resources/cache/snapshots"
+
+
+class SnapshotCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl_hours=24, max_size_mb=2048):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = float(ttl_hours) * 3600
+        self.max_size_bytes = float(max_size_mb) * 1024 * 1024
+
+    @staticmethod
+    def enabled(config):
+        return str(config.get('snapshot_cache', '')).strip().lower() in ('y', 'yes', 'true', '1') and feather is not None
+
+    @staticmethod
+    def from_config(config):
+        return SnapshotCache(config.get('cache_dir') or CACHE_DIR,
+                             config.get('cache_ttl_hours') or 24,
+                             config.get('cache_max_mb') or 2048)
+
+    @staticmethod
+    def fingerprint(config, system_type):
+        """Returns fingerprint for the source / target described in config, None when the type is not cacheable"""
+        system_source = str(config.get(f"{system_type}_type", "")).lower()
+        # Load options change the resulting DataFrame, so they are part of the key
+        parts = {key: str(config.get(f"{system_type}_{key}", ""))
+                 for key in ("type", "columns", "filter", "dtypes", "categoricals", "date_formats", "xml_row_path", "xml_attributes")}
+        parts['arrow_ingest'] = str(config.get('arrow_ingest', ""))
+        if config.get(f"{system_type}_sample_keys"):
+            parts.update(sample_keys=str(config.get(f"{system_type}_sample_keys")), sample_percent=str(config.get('sample_percent')))
+
+        if system_source == 'file':
+            file_path = config.get(f"{system_type}_detail")
+            if not file_path or not os.path.exists(file_path):
+                return None
+            stat = os.stat(file_path)
+            parts.update(path=os.path.abspath(file_path), mtime=stat.st_mtime_ns, size=stat.st_size)
+        elif system_source == 'database':
+            query_file = config.get(f"{system_type}_query_file")
+            if not query_file or not os.path.exists(query_file):
+                return None
+            with open(query_file, 'r') as f:
+                parts['query'] = f.read()
+            parts.update({key: str(config.get(f"{system_type}_{key}", ""))
+                          for key in ("db_type", "host", "port", "database", "user")})
+        else:
+            return None
+
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def snapshot_path(self, fingerprint):
+        return os.path.join(self.cache_dir, f"{fingerprint}.arrow")
+
+    def load(self, fingerprint):
+        """Returns cached DataFrame ( memory-mapped read ) or None on miss / expiry"""
+        path = self.snapshot_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        created = os.stat(path).st_mtime
+        if time.time() - created > self.ttl_seconds:
+            logger.info(f"Snapshot {fingerprint[:12]} expired, removing it.")
+            self.remove(path)
+            return None
+        try:
+            start_time = time.time()
+            data = feather.read_table(path, memory_map=True).to_pandas()
+            os.utime(path, (time.time(), created))  # Record hit for LRU, keep mtime as creation time
+            logger.info(f"Loaded {len(data)} rows from snapshot {fingerprint[:12]} in {round((time.time() - start_time) * 1000, 2)} ms.")
+            return data
+        except Exception as e:
+            logger.warning(f"Could not read snapshot {path}, ignoring it: {e}")
+            self.remove(path)
+            return None
+
+    def store(self, fingerprint, data):
+        """Writes DataFrame as uncompressed Arrow IPC ( memory-mappable ), then evicts to stay within size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.snapshot_path(fingerprint)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(data.reset_index(drop=True), preserve_index=False)
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)  # Atomic, parallel use cases never see a half written snapshot
+            now = time.time()
+            os.utime(path, (now, now))  # Same clock as the LRU hits ( filesystem timestamps can lag time.time() )
+            logger.info(f"Stored {len(data)} rows as snapshot {fingerprint[:12]}.")
+        except Exception as e:
+            logger.warning(f"Could not store snapshot for {fingerprint[:12]}: {e}")
+            self.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes expired snapshots, then least recently used ones until the cache fits max size"""
+        snapshots = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.arrow")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if time.time() - stat.st_mtime > self.ttl_seconds:
+                self.remove(path)
+            else:
+                snapshots.append((stat.st_atime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in snapshots)
+        for _, size, path in sorted(snapshots):
+            if total_size <= self.max_size_bytes:
+                break
+            logger.info(f"Evicting snapshot {os.path.basename(path)} ( LRU, cache over {self.max_size_bytes / 1024 / 1024} MB ).")
+            self.remove(path)
+            total_size -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,76 @@
+import importlib
+import sys
+import threading
+import time
+from importlib.metadata import entry_points
+
+from logger_config import logger
+
+""" This module contains the source plugin registry of DataFetcher — every source type ( file, database, adls, adx ) is a
+plugin registered by name, and driver modules are imported on first use only, so a file to file recon does not pay for
+( or need ) database and cloud drivers. Third-party packages add source types with register_source_plugin() or an entry
+point in the 'recon.source_plugins' group. """
+
+ENTRY_POINT_GROUP = "recon.source_plugins"
+IMPORT_TIMES = {}  # Driver module -> import seconds, for modules imported on first use in this process
+SOURCE_PLUGINS = {}
+_import_lock = threading.Lock()
+
+
+class DataLoadError(Exception):
+    pass
+
+
+def import_driver(module_name, purpose=None):
+    """Imports a driver module on first use and records its import time, the ImportError says which source needs it"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with _import_lock:
+        start_time = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            raise ImportError(f"Module '{module_name}' is needed for {purpose or module_name} sources, please install it: {e}") from e
+        if module_name not in IMPORT_TIMES:
+            IMPORT_TIMES[module_name] = round(time.perf_counter() - start_time, 4)
+            logger.info(f"Imported {module_name} on first use in {round(IMPORT_TIMES[module_name] * 1000, 2)} ms.")
+    return module
+
+
+class SourcePlugin:
+    """Base of the source type plugins — fetch() returns the data of one side ( system_type 'source' / 'target' ) or
+    None when it could not be loaded, fetch_chunks() returns a chunk generator or None when the data can not be streamed
+    ( DataFetcher then loads it fully and slices ), columns() returns the column names without loading the data or None
+    when they are not known up front"""
+
+    @classmethod
+    def fetch(cls, config, system_type):
+        raise NotImplementedError
+
+    @classmethod
+    def fetch_chunks(cls, config, system_type, chunk_size):
+        return None
+
+    @classmethod
+    def columns(cls, config, system_type):
+        return None
+
+
+def register_source_plugin(name, plugin):
+    """Registers plugin for the source type name ( 'Source Type' / 'Target Type' driver config columns )"""
+    SOURCE_PLUGINS[str(name).strip().lower()] = plugin
+
+
+def get_source_plugin(name):
+    """Plugin registered for the source type, entry points are looked up only for unknown types, None when not found"""
+    name = str(name or '').strip().lower()
+    if name not in SOURCE_PLUGINS:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name.lower() == name:
+                try:
+                    register_source_plugin(name, entry_point.load())
+                except Exception as e:
+                    logger.error(f"Source plugin '{name}' could not be loaded from {entry_point.value}: {e}")
+                break
+    return SOURCE_PLUGINS.get(name)
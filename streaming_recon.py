@@ -0,0 +1,165 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+""" This module contains logic for the streaming ( sorted merge ) recon — source and target are read as chunk streams
+ordered by the comparison keys and cut into key ranges: every key below the smallest last key buffered on a side that
+is still being read is complete on both sides, so that range is compared and dropped. Memory holds a few chunks per
+side plus the differences. NULL keys sort first, like the ORDER BY added to database queries. """
+
+
+class OutOfOrderError(Exception):
+    """Raised when a chunk stream is not ordered by the comparison keys"""
+
+    def __init__(self, side, row, previous_key, key):
+        self.side = side
+        self.row = row
+        super().__init__(f"{side.capitalize()} rows are not ordered by the comparison keys: row {row} has key {key} "
+                         f"after key {previous_key}")
+
+
+class KeyOrder:
+    """Lexicographic order of composite keys, NULLs first"""
+
+    @staticmethod
+    def sort_key(values):
+        """Comparable form of one key tuple, (0,) for NULL and (1, value) otherwise"""
+        return tuple((0,) if pd.isna(value) else (1, value) for value in values)
+
+    @staticmethod
+    def compare(left, right, op):
+        """op on the positions where both sides are not NULL, False elsewhere"""
+        both = (left.notna() & right.notna()).to_numpy()
+        result = np.zeros(len(left), dtype=bool)
+        if both.any():
+            result[both] = op(left[both].to_numpy(), right[both].to_numpy())
+        return result
+
+    @staticmethod
+    def less_than(keys, boundary):
+        """Mask of the rows of keys ( DataFrame of key columns ) ordered before the boundary sort key"""
+        result = np.zeros(len(keys), dtype=bool)
+        equal_so_far = np.ones(len(keys), dtype=bool)
+        for column, token in zip(keys.columns, boundary):
+            values = keys[column]
+            is_null = values.isna().to_numpy()
+            if token == (0,):
+                # Nothing sorts before NULL, only NULLs are equal to it
+                equal_so_far &= is_null
+                continue
+            bound = pd.Series(token[1], index=values.index, dtype=object)
+            result |= equal_so_far & (is_null | KeyOrder.compare(values, bound, operator.lt))
+            equal_so_far &= KeyOrder.compare(values, bound, operator.eq)
+        return result
+
+    @staticmethod
+    def descending_rows(keys):
+        """Positions i where row i - 1 is ordered after row i"""
+        previous, current = keys.iloc[:-1].reset_index(drop=True), keys.iloc[1:].reset_index(drop=True)
+        greater = np.zeros(len(current), dtype=bool)
+        equal_so_far = np.ones(len(current), dtype=bool)
+        for column in keys.columns:
+            previous_null, current_null = previous[column].isna().to_numpy(), current[column].isna().to_numpy()
+            column_greater = (~previous_null & current_null) | KeyOrder.compare(previous[column], current[column], operator.gt)
+            greater |= equal_so_far & column_greater
+            equal_so_far &= (previous_null & current_null) | KeyOrder.compare(previous[column], current[column], operator.eq)
+        return np.flatnonzero(greater) + 1
+
+
+class SortedChunkStream:
+    """Chunk stream of one side, checks that keys never go down within and across chunks"""
+
+    def __init__(self, chunks, comparison_keys, side):
+        self.chunks = iter(chunks)
+        self.comparison_keys = comparison_keys
+        self.side = side
+        self.key_columns = None
+        self.schema = pd.DataFrame()  # Empty frame with the columns of the side, kept for sides without rows
+        self.last_keys = None  # Key columns of the last row read, checked against the next chunk
+        self.rows_read = 0
+        self.exhausted = False
+
+    def resolve_key_columns(self, chunk):
+        by_name = {str(column).lower(): column for column in chunk.columns}
+        key_columns = [by_name.get(str(key).lower()) for key in self.comparison_keys]
+        if None in key_columns:
+            raise KeyError(f"Comparison keys {self.comparison_keys} not found in {self.side} data")
+        return key_columns
+
+    def next_chunk(self):
+        """Next non-empty chunk, None once the stream is exhausted"""
+        for chunk in self.chunks:
+            if self.key_columns is None:
+                self.key_columns = self.resolve_key_columns(chunk)
+                self.schema = chunk.iloc[0:0]
+            if chunk.empty:
+                continue
+            chunk = chunk.reset_index(drop=True)
+            keys = chunk[self.key_columns]
+            checked = keys if self.last_keys is None else pd.concat([self.last_keys, keys], ignore_index=True)
+            descending = KeyOrder.descending_rows(checked)
+            if len(descending):
+                position = descending[0]
+                offset = 0 if self.last_keys is None else 1
+                raise OutOfOrderError(self.side, self.rows_read + position - offset + 1,
+                                      tuple(checked.iloc[position - 1]), tuple(checked.iloc[position]))
+            self.last_keys = keys.iloc[-1:]
+            self.rows_read += len(chunk)
+            return chunk
+        self.exhausted = True
+        return None
+
+
+class SortedMergeJoin:
+    """Cuts two key ordered chunk streams into (source, target) batches covering the same key range"""
+
+    def __init__(self, source_chunks, target_chunks, comparison_keys, batch_rows=100000):
+        self.streams = [SortedChunkStream(source_chunks, comparison_keys, 'source'),
+                        SortedChunkStream(target_chunks, comparison_keys, 'target')]
+        self.batch_rows = batch_rows
+
+    @staticmethod
+    def append(buffer, chunk):
+        return chunk if buffer is None or buffer.empty else pd.concat([buffer, chunk], ignore_index=True)
+
+    def read(self, index, buffers):
+        chunk = self.streams[index].next_chunk()
+        if chunk is not None:
+            buffers[index] = self.append(buffers[index], chunk)
+
+    def batches(self):
+        """Yields (source batch, target batch) pairs — key ranges are complete on both sides, so every key group
+        ( duplicates too ) lands in exactly one batch and keeps its row order"""
+        buffers = [None, None]
+        for index in (0, 1):
+            self.read(index, buffers)
+        buffers = [buffer if buffer is not None else stream.schema for buffer, stream in zip(buffers, self.streams)]
+
+        while True:
+            for index in (0, 1):
+                if buffers[index].empty and not self.streams[index].exhausted:
+                    self.read(index, buffers)
+            open_sides = [index for index in (0, 1) if not self.streams[index].exhausted]
+            if not open_sides:
+                if not (buffers[0].empty and buffers[1].empty):
+                    yield buffers[0], buffers[1]
+                return
+
+            # Keys below the smallest last key of the open sides can not show up again on either side
+            tails = {index: KeyOrder.sort_key(buffers[index][self.streams[index].key_columns].iloc[-1])
+                     for index in open_sides}
+            boundary = min(tails.values())
+            masks = [KeyOrder.less_than(buffer[stream.key_columns], boundary) if stream.key_columns is not None
+                     else np.zeros(len(buffer), dtype=bool) for buffer, stream in zip(buffers, self.streams)]
+            if sum(int(mask.sum()) for mask in masks) < self.batch_rows:
+                for index in open_sides:
+                    if tails[index] == boundary:
+                        self.read(index, buffers)
+                continue
+
+            yield buffers[0][masks[0]], buffers[1][masks[1]]
+            buffers = [buffer[~mask].reset_index(drop=True) for buffer, mask in zip(buffers, masks)]
+
+    def rows_read(self):
+        return self.streams[0].rows_read, self.streams[1].rows_read
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recon_reporter
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "Recon_Driver_Config.xlsx")
+SUMMARY_KEYS = ["common_rows_count", "rows_in_src_only", "rows_in_tgt_only", "rows_having_mismatch"]
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    """Summaries the engine reports, instead of writing html / xlsx / diff store reports"""
+    captured = []
+
+    def capture(self):
+        summary = self.summary if self.summary is not None else self.generate_summary_stats()
+        captured.append({key: summary[key] for key in SUMMARY_KEYS})
+
+    monkeypatch.setattr(recon_reporter.ReconReportGenerator, "recon_report", capture)
+    return captured
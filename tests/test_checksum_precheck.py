@@ -0,0 +1,46 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from checksum_precheck import ChecksumPrecheck
+from sample_recon import KeyHashSampler
+
+KEYS = [('k1', 'k1'), ('k2', 'k2')]
+
+
+def database(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (k1 TEXT, k2 TEXT, v INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)", rows)
+    return conn
+
+
+def sql_profile(rows):
+    return ChecksumPrecheck.sql_profile(database(rows), 'sqlite', "SELECT * FROM t", KEYS, [('v', 'v')])
+
+
+def frame_profile(rows):
+    return ChecksumPrecheck.frame_profile(pd.DataFrame(rows, columns=['k1', 'k2', 'v']), KEYS, [('v', 'v')])
+
+
+@pytest.mark.parametrize('profile', [sql_profile, frame_profile])
+@pytest.mark.parametrize('source, target', [
+    ([('a|b', 'c', 1)], [('a', 'b|c', 1)]),  # Separator inside a key part
+    ([(None, 'c', 1)], [('~null~', 'c', 1)]),  # NULL and the null sentinel text
+    ([('1:a', 'b', 1)], [('1', 'a1:b', 1)])  # Text that looks like a length prefix
+])
+def test_composite_keys_do_not_collide(profile, source, target):
+    source_profile, target_profile = profile(source), profile(target)
+    assert source_profile['key_hash'] != target_profile['key_hash']
+    assert source_profile['columns']['v']['hash'] != target_profile['columns']['v']['hash']
+
+
+def test_sample_key_text_matches_sql():
+    rows = [(f"a|{i}", f"{i % 7}|b" if i % 5 else None, i) for i in range(500)] + [('é|x', ' y ', 0)]
+    conn = database(rows)
+    sampler = KeyHashSampler(percent=30)
+    sampled = pd.read_sql_query(sampler.sample_query(conn, 'sqlite', "SELECT * FROM t", ['k1', 'k2']), conn)
+    expected = sampler.sample_frame(pd.DataFrame(rows, columns=['k1', 'k2', 'v']), ['k1', 'k2'])
+    assert 0 < len(sampled) < len(rows)
+    assert sorted(sampled['v']) == sorted(expected['v'])
@@ -0,0 +1,169 @@
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_connector import CloudConnector
+
+pytest.importorskip("azure.kusto.data.helpers")  # Typed frames use the Kusto converters
+
+COLUMN_TYPES = {'id': 'long', 'name': 'string', 'ts': 'datetime', 'amount': 'real'}
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+class Column:
+    def __init__(self, column_name, column_type):
+        self.column_name, self.column_type = column_name, column_type
+
+
+class Table:
+    def __init__(self, columns, rows):
+        self.columns, self.raw_rows = columns, iter(rows)
+
+
+class Response:
+    def __init__(self, table):
+        self.table = table
+
+    def iter_primary_results(self):
+        return iter([self.table])
+
+
+class MockKustoClient:
+    """Local stand-in of KustoClient, runs the query shapes CloudConnector sends on a DataFrame"""
+
+    def __init__(self, data):
+        self.data = data
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def execute_streaming_query(self, database, query):
+        with self._lock:
+            self.queries.append(query)
+        data = self.data
+        for operator in query.split("\n| ")[1:]:
+            if operator == "count":
+                return self.response({'Count': 'long'}, [[len(data)]])
+            bounds = re.match(r"summarize min_value = min\(\['(\w+)'\]\), max_value = max\(\['(\w+)'\]\)", operator)
+            if bounds:
+                values = data[bounds.group(1)]
+                low, high = values.min(), values.max()
+                if COLUMN_TYPES[bounds.group(1)] == 'datetime':
+                    low, high = low.strftime(TIME_FORMAT), high.strftime(TIME_FORMAT)
+                column_type = COLUMN_TYPES[bounds.group(1)]
+                return self.response({'min_value': column_type, 'max_value': column_type}, [[low, high]])
+            if operator.startswith("extend recon_range = case("):
+                cases = re.findall(r"(.*?), (-?\d+)(?:, |\)$)", operator[len("extend recon_range = case("):])
+                ranges = pd.Series(-1, index=data.index)
+                for predicate, index in reversed(cases):
+                    ranges[self.where(data, predicate)] = int(index)
+                data = data.assign(recon_range=ranges)
+                continue
+            if operator == "summarize row_count = count() by recon_range":
+                counts = data.groupby('recon_range').size()
+                return self.response({'recon_range': 'long', 'row_count': 'long'}, [[int(k), int(v)] for k, v in counts.items()])
+            data = data[self.where(data, operator[len("where "):])]
+        rows = [[None if pd.isna(value) else value.strftime(TIME_FORMAT) if isinstance(value, pd.Timestamp) else value
+                 for value in row] for row in data[list(COLUMN_TYPES)].itertuples(index=False)]
+        return self.response(COLUMN_TYPES, rows)
+
+    @staticmethod
+    def response(column_types, rows):
+        return Response(Table([Column(name, column_type) for name, column_type in column_types.items()], rows))
+
+    @staticmethod
+    def where(data, predicate):
+        hashed = re.match(r"hash\((.*), (\d+)\) == (\d+)$", predicate)
+        if hashed:
+            source, count, index = hashed.group(1), int(hashed.group(2)), int(hashed.group(3))
+            columns = re.findall(r"\['(\w+)'\]", source) or list(COLUMN_TYPES)
+            hashes = pd.util.hash_pandas_object(data[columns].astype(str), index=False).to_numpy()
+            return pd.Series(hashes % count == index, index=data.index)
+        mask = pd.Series(False, index=data.index)
+        for alternative in predicate.split(" or "):
+            matches = pd.Series(True, index=data.index)
+            for condition in alternative.split(" and "):
+                null_check = re.match(r"isnull\(\['(\w+)'\]\)", condition)
+                if null_check:
+                    matches &= data[null_check.group(1)].isna()
+                    continue
+                column, comparison, literal = re.match(r"\['(\w+)'\] (>=|<) (.*)", condition).groups()
+                timestamp = re.match(r"datetime\((.*)\)", literal)
+                value = pd.Timestamp(timestamp.group(1)) if timestamp else float(literal)
+                matches &= data[column] >= value if comparison == '>=' else data[column] < value
+            mask |= matches
+        return mask
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(7)
+    rows = 2000
+    frame = pd.DataFrame({
+        'id': np.arange(rows),
+        'name': [f"n{i}" for i in range(rows)],
+        'ts': pd.Timestamp('2024-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 10 ** 6, rows), unit='s'),
+        # Skewed, most values fall into the first of equal width ranges
+        'amount': np.where(np.arange(rows) < 1700, rng.random(rows) * 0.01, rng.random(rows))
+    })
+    frame.loc[[3, 500], 'ts'] = pd.NaT
+    frame.loc[7, 'amount'] = np.nan
+    frame.loc[11, 'ts'] = frame['ts'].max()  # Several rows on the top boundary
+    return frame
+
+
+def fetch(client, partition_by=None, page_rows=300):
+    chunks = list(CloudConnector.fetch_adx_chunks('https://mock', 'db', 'Table', None, None, None, chunk_size=200,
+                                                  page_rows=page_rows, max_workers=3, partition_by=partition_by, client=client))
+    return pd.concat(chunks, ignore_index=True), chunks
+
+
+def assert_every_row_once(frame, data):
+    assert sorted(frame['id'].tolist()) == data['id'].tolist()
+    assert frame['ts'].isna().sum() == data['ts'].isna().sum()
+
+
+def test_single_query_when_result_fits(data):
+    client = MockKustoClient(data)
+    frame, chunks = fetch(client, page_rows=len(data))
+    assert client.queries == ["Table\n| count", "Table"]
+    assert max(len(chunk) for chunk in chunks) == 200
+    assert_every_row_once(frame, data)
+
+
+def test_range_partitions_cover_nulls_and_top_boundary(data):
+    client = MockKustoClient(data)
+    frame, _ = fetch(client, partition_by='ts')
+    partition_queries = [query for query in client.queries if "\n| where" in query]
+    assert any("isnull(['ts'])" in query for query in partition_queries)
+    # The last range has no upper bound, so rows at the max value are kept
+    assert any(re.search(r"\| where \['ts'\] >= datetime\([^)]*\)($|\n)", query) for query in partition_queries)
+    assert_every_row_once(frame, data)
+
+
+def test_skewed_ranges_are_split_into_hash_partitions(data):
+    client = MockKustoClient(data)
+    queries = CloudConnector.adx_partition_queries(client, 'db', 'Table', 300, 'amount')
+    sizes = [len(pd.concat(CloudConnector.adx_frames(client, 'db', query))) for query in queries]
+    assert any("hash(tostring(pack_all())" in query for query in queries)
+    assert sum(sizes) == len(data)
+    assert max(sizes) < 2 * 300  # Hash partitions are only roughly even
+
+    frame, _ = fetch(MockKustoClient(data), partition_by='amount')
+    assert_every_row_once(frame, data)
+
+
+def test_hash_partitions_of_columns(data):
+    frame, _ = fetch(MockKustoClient(data), partition_by='id, name')
+    assert_every_row_once(frame, data)
+
+
+def test_empty_result_is_a_typed_frame(data):
+    chunks = list(CloudConnector.fetch_adx_chunks('https://mock', 'db', 'Table;', None, None, None,
+                                                  client=MockKustoClient(data.iloc[0:0])))
+    assert len(chunks) == 1 and chunks[0].empty
+    assert list(chunks[0].columns) == list(COLUMN_TYPES)
+    assert str(chunks[0]['ts'].dtype) == 'datetime64[ns, UTC]'
+    assert str(chunks[0]['amount'].dtype) == 'Float64'
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from conftest import CONFIG_PATH
+from recon_engine import ReconEngine
+
+
+def run_recon(summaries, tmp_path, mode, comparison_key='Store_ID'):
+    config = {'Use_Case_Id': 'incremental_test', 'source_name': 's', 'target_name': 't',
+              'comparison_keys': [comparison_key], 'source_type': 'file', 'target_type': 'file',
+              'source_detail': str(tmp_path / "s.csv"), 'target_detail': str(tmp_path / "t.csv"),
+              'recon_mode': mode, 'state_dir': str(tmp_path / "state")}
+    ReconEngine(config, CONFIG_PATH).run_recon()
+    return summaries[-1]
+
+
+def write_sides(tmp_path, target_values):
+    # Float keys on the source side, int keys on the target side
+    pd.DataFrame({'Store_ID': [float(i) for i in range(10)], 'v': range(10)}).to_csv(tmp_path / "s.csv", index=False)
+    pd.DataFrame({'Store_ID': range(10), 'v': target_values}).to_csv(tmp_path / "t.csv", index=False)
+
+
+def test_mixed_key_dtypes_across_runs(tmp_path, summaries):
+    write_sides(tmp_path, list(range(10)))
+    full = run_recon(summaries, tmp_path, 'full')
+    assert full['common_rows_count'] == 10
+    assert run_recon(summaries, tmp_path, 'incremental') == full  # First run, no state yet
+    assert run_recon(summaries, tmp_path, 'incremental') == full  # Everything carried forward
+
+    write_sides(tmp_path, [0, 1, 2, 3, 4, 5, 6, 7, 8, -9])
+    full = run_recon(summaries, tmp_path, 'full')
+    assert full['rows_having_mismatch'] == 1
+    assert run_recon(summaries, tmp_path, 'incremental') == full
+
+
+def test_key_case_differs_from_columns(tmp_path, summaries):
+    write_sides(tmp_path, list(range(10)))
+    full = run_recon(summaries, tmp_path, 'full', comparison_key='STORE_id')
+    run_recon(summaries, tmp_path, 'incremental', comparison_key='STORE_id')
+    assert run_recon(summaries, tmp_path, 'incremental', comparison_key='STORE_id') == full
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from conftest import CONFIG_PATH
+from recon_engine import ReconEngine
+
+
+def run_modes(summaries, source_path, target_path, chunk_size):
+    config = {'Use_Case_Id': 'partitioned_parity_test', 'source_name': 's', 'target_name': 't',
+              'comparison_keys': ['Store_ID'], 'source_type': 'file', 'target_type': 'file',
+              'source_detail': source_path, 'target_detail': target_path, 'row_prefilter': 'N',
+              'partition_count': '4', 'chunk_size': str(chunk_size)}
+    for mode in ('full', 'partitioned'):
+        ReconEngine(dict(config, recon_mode=mode), CONFIG_PATH).run_recon()
+    return summaries[-2], summaries[-1]
+
+
+def test_int_and_float_keys_share_buckets(tmp_path, summaries):
+    # Source keys read as float ( a null key in a later chunk ), target keys as int
+    source = pd.DataFrame({'Store_ID': np.arange(1, 301, dtype=float), 'v': np.arange(300)})
+    source.loc[299, 'Store_ID'] = np.nan
+    target = pd.DataFrame({'Store_ID': np.arange(1, 301), 'v': np.arange(300)})
+    target.loc[10, 'v'] = -1
+    source.to_csv(tmp_path / "s.csv", index=False)
+    target.to_csv(tmp_path / "t.csv", index=False)
+
+    full, partitioned = run_modes(summaries, str(tmp_path / "s.csv"), str(tmp_path / "t.csv"), chunk_size=100)
+    assert partitioned == full
+    assert full['common_rows_count'] == 299
+
+
+def test_null_keys_match_like_full_recon(tmp_path, summaries):
+    pd.DataFrame({'Store_ID': [1.0, 2.0, 3.0, None], 'v': [10, 20, 30, 40]}).to_csv(tmp_path / "s.csv", index=False)
+    (tmp_path / "t.csv").write_text("Store_ID,v\n1,10\n2,21\n3,30\n,40\n")  # Int keys in the first chunk
+
+    full, partitioned = run_modes(summaries, str(tmp_path / "s.csv"), str(tmp_path / "t.csv"), chunk_size=2)
+    assert partitioned == full
+    assert full['common_rows_count'] == 4
+
+
+def test_key_case_differs_from_columns(tmp_path, summaries):
+    pd.DataFrame({'Store_ID': range(20), 'v': range(20)}).to_csv(tmp_path / "s.csv", index=False)
+    pd.DataFrame({'store_id': range(5, 25), 'v': range(5, 25)}).to_csv(tmp_path / "t.csv", index=False)
+    config = {'Use_Case_Id': 'partitioned_parity_test', 'source_name': 's', 'target_name': 't',
+              'comparison_keys': ['STORE_ID'], 'source_type': 'file', 'target_type': 'file',
+              'source_detail': str(tmp_path / "s.csv"), 'target_detail': str(tmp_path / "t.csv"),
+              'partition_count': '4', 'chunk_size': '7'}
+    for mode in ('full', 'partitioned'):
+        ReconEngine(dict(config, recon_mode=mode), CONFIG_PATH).run_recon()
+    assert summaries[-1] == summaries[-2]
+    assert summaries[-1]['common_rows_count'] == 15
@@ -0,0 +1,65 @@
+import sqlite3
+
+import datacompy
+import pandas as pd
+import pytest
+
+from db_connector import DBConnector
+from pushdown_recon import PushdownComparison, PushdownQueryBuilder, PushdownRecon
+from recon_reporter import ReconReportGenerator
+
+ROW_COUNT_KEYS = ["src_row_count", "tgt_row_count", "common_rows_count", "rows_in_src_only", "rows_in_tgt_only",
+                  "rows_having_mismatch", "row_having_no_mismatch", "common_cols_count", "cols_in_src_only_count",
+                  "cols_in_tgt_only_count"]
+
+
+@pytest.fixture
+def sides():
+    # NULL keys join each other like in datacompy, NULL values are unequal to values and equal to NULLs
+    source = pd.DataFrame({'id': [1, 2, 3, 4, None, 6], 'amount': [10.0, None, 30.0, 40.0, 50.0, None],
+                           'name': ['a', 'b', None, 'd', 'n', None], 'src_extra': [1, 2, 3, 4, 5, 6]})
+    target = pd.DataFrame({'ID': [1, 2, 3, 5, None, 6], 'Amount': [10.0, 20.0, 30.0, 50.0, 51.0, None],
+                           'Name': ['a', 'b', 'c', 'e', 'n', None]})
+    return source, target
+
+
+def pushdown(source, target, keys):
+    conn = sqlite3.connect(":memory:")
+    source.to_sql('src', conn, index=False)
+    target.to_sql('tgt', conn, index=False)
+    source_query, target_query = "SELECT * FROM src", "SELECT * FROM tgt"
+    key_columns, columns, source_only, target_only = PushdownRecon.match_columns(
+        DBConnector.query_columns(conn, source_query), DBConnector.query_columns(conn, target_query), keys)
+    builder = PushdownQueryBuilder('sqlite', source_query, target_query, key_columns, columns, source_only, target_only)
+    summary_row = DBConnector.fetch_row(conn, builder.summary_query())
+    comparison = PushdownComparison(builder, summary_row, DBConnector.stream_rows(conn, 'sqlite', builder.diff_query(), 2))
+    conn.close()
+    return comparison
+
+
+def sorted_frame(frame, columns):
+    return frame[columns].sort_values(columns[0], na_position='first').reset_index(drop=True)
+
+
+def test_pushdown_matches_full_recon(sides):
+    source, target = sides
+    comparison = pushdown(source, target, ['id'])
+    full = datacompy.Compare(source.copy(), target.copy(), join_columns=['id'])
+    full_summary = ReconReportGenerator(full, source, target, {}).generate_summary_stats()
+
+    summary = comparison.summary()
+    assert {key: summary[key] for key in ROW_COUNT_KEYS} == {key: full_summary[key] for key in ROW_COUNT_KEYS}
+    assert summary['common_rows_count'] == 5  # Including the NULL key
+
+    mismatch_columns = ['id', 'amount_df1', 'amount_df2', 'name_df1', 'name_df2']
+    pd.testing.assert_frame_equal(sorted_frame(comparison.all_mismatch(), mismatch_columns),
+                                  sorted_frame(full.all_mismatch(), mismatch_columns), check_dtype=False)
+    for pushdown_rows, full_rows, columns in ((comparison.df1_unq_rows, full.df1_unq_rows, ['id', 'amount', 'name', 'src_extra']),
+                                              (comparison.df2_unq_rows, full.df2_unq_rows, ['id', 'amount', 'name'])):
+        pd.testing.assert_frame_equal(sorted_frame(pushdown_rows, columns), sorted_frame(full_rows, columns), check_dtype=False)
+
+    full_stats = {stat['column']: stat for stat in full.column_stats}
+    for stat in comparison.column_stats:
+        assert (stat['match_cnt'], stat['unequal_cnt'], stat['null_diff']) == \
+               (full_stats[stat['column']]['match_cnt'], full_stats[stat['column']]['unequal_cnt'],
+                full_stats[stat['column']]['null_diff'])